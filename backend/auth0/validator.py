@@ -1,4 +1,7 @@
+import hashlib
 import requests
+import threading
+import time
 from functools import lru_cache
 from jose import jwt, JWTError, jwk
 from cryptography import x509
@@ -17,6 +20,15 @@ from .config import (
 
 security = HTTPBearer()
 
+# Per-token TTL cache: clients send the same Bearer token on every request,
+# so the RSA signature check only needs to run once per token per window.
+# Keys are blake2b digests (bounded size, no raw JWTs held in memory) and
+# entries never outlive the token's own exp claim.
+_TOKEN_CACHE: dict = {}
+_TOKEN_CACHE_LOCK = threading.Lock()
+_TOKEN_CACHE_TTL = 300.0  # segundos
+_TOKEN_CACHE_MAX = 10_000
+
 
 @lru_cache(maxsize=1)
 def get_jwks():
@@ -51,6 +63,10 @@ def verify_auth0_token(token: str) -> dict:
     """
     Verify and decode Auth0 JWT token
 
+    Results are cached per token for up to 5 minutes (capped at the
+    token's own expiry), so repeated requests with the same Bearer token
+    skip the JWKS lookup and RSA verification.
+
     Args:
         token: The JWT token from Authorization header
 
@@ -60,6 +76,36 @@ def verify_auth0_token(token: str) -> dict:
     Raises:
         HTTPException: If token is invalid
     """
+    digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    agora = time.time()
+
+    with _TOKEN_CACHE_LOCK:
+        entrada = _TOKEN_CACHE.get(digest)
+        if entrada is not None:
+            expira, payload = entrada
+            if expira > agora:
+                return payload
+            del _TOKEN_CACHE[digest]
+
+    payload = _verify_auth0_token_uncached(token)
+
+    # Never serve a cached payload past the token's own exp claim
+    expira = agora + _TOKEN_CACHE_TTL
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expira = min(expira, float(exp))
+
+    if expira > agora:
+        with _TOKEN_CACHE_LOCK:
+            if len(_TOKEN_CACHE) >= _TOKEN_CACHE_MAX:
+                _TOKEN_CACHE.clear()
+            _TOKEN_CACHE[digest] = (expira, payload)
+
+    return payload
+
+
+def _verify_auth0_token_uncached(token: str) -> dict:
+    """Full JWKS lookup + RSA verification (the cache-miss path)"""
     try:
         print(f"\n[JWT-VALIDATOR] Starting JWT verification...")
         print(f"[JWT-VALIDATOR] Token length: {len(token)}")
@@ -45,6 +45,11 @@ connect_args: Dict[str, Any] = {}
 if DB_SSL_CA:
     connect_args["ssl"] = {"ca": DB_SSL_CA}
 
+# Engine síncrono (pymysql) servindo endpoints `def`, que o FastAPI roda
+# no threadpool — o event loop não bloqueia em I/O de banco. Em rajadas,
+# o checkout LIFO reaproveita as mesmas conexões quentes e deixa as
+# excedentes ociosas expirarem pelo pool_recycle, em vez de manter as
+# 20+40 vivas em rodízio.
 engine = create_engine(
     url,
     pool_pre_ping=True,
@@ -52,6 +57,7 @@ engine = create_engine(
     max_overflow=40,
     pool_recycle=3600,
     pool_timeout=30,
+    pool_use_lifo=True,
     connect_args=connect_args,  # type: ignore[arg-type]
     echo=False,
 )
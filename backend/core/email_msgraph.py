@@ -263,10 +263,15 @@ def send_mail(subject: str, html_body: str, to: List[str], cc: Optional[List[str
         # Ensure structure
         attach_list = []
         for a in attachments:
-            # expect dict with name, contentType, contentBytes (base64 string)
+            # expect dict with name, contentType and either contentBytes
+            # (base64 string) or "bytes" (raw); raw bytes are encoded here,
+            # on the email worker thread, instead of on the request thread
             name = a.get("name")
             contentType = a.get("contentType") or a.get("mime") or "application/octet-stream"
             contentBytes = a.get("contentBytes") or a.get("content")
+            raw = a.get("bytes")
+            if not contentBytes and raw:
+                contentBytes = base64.b64encode(raw).decode("ascii")
             if not name or not contentBytes:
                 continue
             attach_list.append({
@@ -0,0 +1,105 @@
+"""
+Instrumentação leve de latência e contadores, sem dependências externas
+
+Mantém, em memória de processo, histogramas de duração por rota HTTP e
+por evento interno (ex.: recálculo de SLA), além de contadores simples
+(ex.: hits/misses de cache). O snapshot é exposto em /api/metrics/latency
+para apontar qual endpoint concentra a latência de cauda.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+# Limites dos buckets de duração, em segundos
+_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_http_stats: Dict[str, Dict[str, Any]] = {}
+_eventos: Dict[str, Dict[str, Any]] = {}
+_contadores: Dict[str, int] = {}
+
+
+def _novo_histograma() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "soma_s": 0.0,
+        "max_s": 0.0,
+        "buckets": [0] * (len(_BUCKETS) + 1),
+    }
+
+
+def _observar_em(hist: Dict[str, Any], duracao_s: float) -> None:
+    hist["count"] += 1
+    hist["soma_s"] += duracao_s
+    if duracao_s > hist["max_s"]:
+        hist["max_s"] = duracao_s
+    for i, limite in enumerate(_BUCKETS):
+        if duracao_s <= limite:
+            hist["buckets"][i] += 1
+            break
+    else:
+        hist["buckets"][-1] += 1
+
+
+def normalizar_rota(path: str) -> str:
+    """Colapsa segmentos numéricos (ids) para agrupar rotas parametrizadas"""
+    partes = [
+        "{id}" if parte.isdigit() else parte
+        for parte in path.split("/")
+    ]
+    return "/".join(partes)
+
+
+def registrar_http(metodo: str, path: str, duracao_s: float) -> None:
+    """Registra a duração de uma requisição HTTP"""
+    chave = f"{metodo} {normalizar_rota(path)}"
+    with _lock:
+        hist = _http_stats.get(chave)
+        if hist is None:
+            hist = _http_stats[chave] = _novo_histograma()
+        _observar_em(hist, duracao_s)
+
+
+def observar(nome: str, duracao_s: float) -> None:
+    """Registra a duração de um evento interno nomeado"""
+    with _lock:
+        hist = _eventos.get(nome)
+        if hist is None:
+            hist = _eventos[nome] = _novo_histograma()
+        _observar_em(hist, duracao_s)
+
+
+def incrementar(nome: str, valor: int = 1) -> None:
+    """Incrementa um contador nomeado (ex.: cache hit/miss)"""
+    with _lock:
+        _contadores[nome] = _contadores.get(nome, 0) + valor
+
+
+def _exportar_histograma(hist: Dict[str, Any]) -> Dict[str, Any]:
+    rotulos = [f"<={limite}s" for limite in _BUCKETS] + [f">{_BUCKETS[-1]}s"]
+    return {
+        "count": hist["count"],
+        "media_s": round(hist["soma_s"] / hist["count"], 4) if hist["count"] else 0.0,
+        "max_s": round(hist["max_s"], 4),
+        "buckets": dict(zip(rotulos, hist["buckets"])),
+    }
+
+
+def snapshot() -> Dict[str, Any]:
+    """Retorna uma cópia das métricas acumuladas desde o início do processo"""
+    with _lock:
+        return {
+            "http": {
+                rota: _exportar_histograma(hist)
+                for rota, hist in sorted(_http_stats.items())
+            },
+            "eventos": {
+                nome: _exportar_histograma(hist)
+                for nome, hist in sorted(_eventos.items())
+            },
+            "contadores": dict(sorted(_contadores.items())),
+            "desde_inicio_s": round(time.monotonic() - _INICIO_MONO, 1),
+        }
+
+
+_INICIO_MONO = time.monotonic()
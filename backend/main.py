@@ -6,7 +6,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import StreamingResponse, Response, FileResponse
+from fastapi.responses import StreamingResponse, Response, FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from fastapi.middleware.cors import CORSMiddleware
@@ -22,6 +22,8 @@ from typing import Any, List, Dict
 import uuid
 from sqlalchemy.orm import Session
 from core.db import get_db, engine
+from core import observability
+import time as _time
 from ti.models.media import Media
 from ti.scripts.create_performance_indices import create_indices
 
@@ -42,7 +44,9 @@ except Exception as e:
     print(f"⚠️  [EMAIL] Erro ao verificar configuração: {e}")
 
 # Create the FastAPI application (HTTP)
-_http = FastAPI(title="Evoque API - TI", version="1.0.0")
+# orjson como serializador padrão: payloads grandes (dashboard SLA, listas
+# de chamados/logs) serializam várias vezes mais rápido que o json da stdlib
+_http = FastAPI(title="Evoque API - TI", version="1.0.0", default_response_class=ORJSONResponse)
 
 # ── VERSÃO: 2026-02-18-v4 ────────────────────────────────────────────────────
 # Endpoints SLA registrados IMEDIATAMENTE após criação do app
@@ -57,7 +61,7 @@ def api_version():
     return {"version": "2026-02-18-v4", "sla_endpoint": "registrado"}
 
 @_http.get("/api/sla/dashboard", tags=["SLA"])
-async def sla_dashboard(
+def sla_dashboard(
     data_inicio: _Optional[_datetime] = _Q(None),
     data_fim: _Optional[_datetime] = _Q(None),
     db=Depends(get_db),
@@ -71,10 +75,17 @@ async def sla_dashboard(
         raise HTTPException(status_code=500, detail=f"Erro SLA: {str(_e)}")
 
 @_http.get("/api/sla/dashboard/resumo", tags=["SLA"])
-async def sla_dashboard_resumo(db=Depends(get_db)):
+def sla_dashboard_resumo(request: Request, response: Response, db=Depends(get_db)):
     try:
         from modules.sla.service import SlaService
+        from modules.sla.router import gerar_etag_resumo
         data = SlaService(db).obter_dashboard()
+        # ETag fraco sobre o instante de cálculo: polls idênticos viram 304
+        etag = gerar_etag_resumo(data.get("ultima_atualizacao"))
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "max-age=10"
         return {k: data.get(k) for k in [
             "percentual_cumprimento", "percentual_em_risco", "percentual_vencidos",
             "chamados_em_risco", "chamados_vencidos", "chamados_pausados",
@@ -85,7 +96,7 @@ async def sla_dashboard_resumo(db=Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Erro SLA resumo: {str(_e)}")
 
 @_http.get("/api/sla/chamado/{chamado_id}", tags=["SLA"])
-async def sla_chamado(chamado_id: int, db=Depends(get_db)):
+def sla_chamado(chamado_id: int, db=Depends(get_db)):
     try:
         from modules.sla.service import SlaService
         result = SlaService(db).calcular_sla_chamado(chamado_id)
@@ -98,7 +109,7 @@ async def sla_chamado(chamado_id: int, db=Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Erro SLA chamado: {str(_e)}")
 
 @_http.post("/api/sla/chamado/{chamado_id}/pausar", tags=["SLA"])
-async def sla_pausar(chamado_id: int, status: str = _Q(...), db=Depends(get_db)):
+def sla_pausar(chamado_id: int, status: str = _Q(...), db=Depends(get_db)):
     try:
         from modules.sla.service import SlaService
         result = SlaService(db).pausar_sla_chamado(chamado_id, status)
@@ -295,6 +306,20 @@ async def log_auth_requests(request: Request, call_next):
         print(f"[MIDDLEWARE] ❌ Exception occurred: {type(e).__name__}: {str(e)}")
         raise
 
+
+# Middleware de instrumentação: histograma de latência por rota (ver core/observability)
+@_http.middleware("http")
+async def medir_latencia(request: Request, call_next):
+    inicio = _time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        if request.url.path.startswith("/api"):
+            observability.registrar_http(
+                request.method, request.url.path, _time.perf_counter() - inicio
+            )
+
+
 @_http.get("/api/ping")
 def ping():
     return {"message": "pong"}
@@ -790,6 +815,20 @@ async def startup_event():
     except Exception as e:
         print(f"[STARTUP] ⚠️  Failed to register event loop: {e}")
 
+    try:
+        from ti.api.chamados import ensure_schema
+        await asyncio.to_thread(ensure_schema)
+        print(f"[STARTUP] ✓ Schema de chamados verificado")
+    except Exception as e:
+        print(f"[STARTUP] ⚠️  Failed to ensure chamados schema: {e}")
+
+    try:
+        from ti.api.chamados import purge_expired_loop
+        asyncio.create_task(purge_expired_loop())
+        print(f"[STARTUP] ✓ Purga periódica do metrics_cache_db agendada")
+    except Exception as e:
+        print(f"[STARTUP] ⚠️  Failed to schedule cache purge: {e}")
+
 
 @_http.on_event("shutdown")
 async def shutdown_event():
@@ -20,11 +20,16 @@ class SlaCache:
     
     def _init_cache(self):
         """Inicializa estruturas do cache"""
-        self._feriados: Optional[List] = None
+        self._feriados: Optional[Dict] = None  # feriados ativos por ano
         self._feriados_timestamp: Optional[datetime] = None
         self._configs: Optional[Dict] = None
         self._configs_timestamp: Optional[datetime] = None
+        self._horarios: Optional[Dict] = None  # jornada por dia da semana
+        self._horarios_timestamp: Optional[datetime] = None
         self._ttl_minutes = 60  # TTL padrão de 60 minutos
+        # Revisão do calendário: incrementada sempre que feriados/horários
+        # são invalidados, para consumidores detectarem dados derivados velhos
+        self._revisao = 0
     
     def _is_valid(self, timestamp: Optional[datetime]) -> bool:
         """Verifica se o cache ainda é válido"""
@@ -34,7 +39,7 @@ class SlaCache:
     
     # ========== Feriados ==========
     
-    def get_feriados(self) -> Optional[List]:
+    def get_feriados(self) -> Optional[Dict]:
         """Retorna feriados do cache se válido"""
         if self._is_valid(self._feriados_timestamp):
             logger.debug("Cache de feriados HIT")
@@ -42,7 +47,7 @@ class SlaCache:
         logger.debug("Cache de feriados MISS")
         return None
     
-    def set_feriados(self, feriados: List) -> None:
+    def set_feriados(self, feriados: Dict) -> None:
         """Armazena feriados no cache"""
         self._feriados = feriados
         self._feriados_timestamp = datetime.now()
@@ -52,6 +57,7 @@ class SlaCache:
         """Invalida cache de feriados"""
         self._feriados = None
         self._feriados_timestamp = None
+        self._revisao += 1
         logger.info("Cache de feriados invalidado")
     
     # ========== Configurações ==========
@@ -76,12 +82,40 @@ class SlaCache:
         self._configs_timestamp = None
         logger.info("Cache de configs invalidado")
     
+    # ========== Horários Comerciais ==========
+
+    def get_horarios(self) -> Optional[Dict]:
+        """Retorna horários comerciais do cache se válido"""
+        if self._is_valid(self._horarios_timestamp):
+            logger.debug("Cache de horários HIT")
+            return self._horarios
+        logger.debug("Cache de horários MISS")
+        return None
+
+    def set_horarios(self, horarios: Dict) -> None:
+        """Armazena horários comerciais no cache"""
+        self._horarios = horarios
+        self._horarios_timestamp = datetime.now()
+        logger.info(f"Cache de horários atualizado: {len(horarios)} registros")
+
+    def invalidate_horarios(self) -> None:
+        """Invalida cache de horários comerciais"""
+        self._horarios = None
+        self._horarios_timestamp = None
+        self._revisao += 1
+        logger.info("Cache de horários invalidado")
+
+    def get_revisao(self) -> int:
+        """Revisão atual do calendário (feriados + horários comerciais)"""
+        return self._revisao
+
     # ========== Geral ==========
-    
+
     def invalidate_all(self) -> None:
         """Invalida todo o cache"""
         self.invalidate_feriados()
         self.invalidate_configs()
+        self.invalidate_horarios()
         logger.info("Cache completamente invalidado")
     
     def get_status(self) -> Dict[str, Any]:
@@ -98,5 +132,11 @@ class SlaCache:
                 "count": len(self._configs) if self._configs else 0,
                 "valid": self._is_valid(self._configs_timestamp),
                 "ttl_minutes": self._ttl_minutes
+            },
+            "horarios": {
+                "cached": self._horarios is not None,
+                "count": len(self._horarios) if self._horarios else 0,
+                "valid": self._is_valid(self._horarios_timestamp),
+                "ttl_minutes": self._ttl_minutes
             }
         }
@@ -5,11 +5,35 @@ Suporta Redis se disponível, fallback para memória
 """
 import json
 import logging
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from abc import ABC, abstractmethod
 import hashlib
 
+# Redis é opcional: se instalado e SLA_REDIS_URL definido, o cache passa a
+# ser compartilhado entre os workers (senão cada processo tem o seu)
+try:
+    import redis as _redis
+except ImportError:
+    _redis = None
+
+# orjson (já dependência do projeto) serializa mais rápido que o json padrão
+try:
+    import orjson as _orjson
+
+    def _dumps(obj) -> bytes:
+        return _orjson.dumps(obj, default=str)
+
+    _loads = _orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, default=str).encode()
+
+    _loads = json.loads
+
 logger = logging.getLogger("sla.cache")
 
 
@@ -27,46 +51,106 @@ class CacheBackend(ABC):
     @abstractmethod
     def delete(self, key: str):
         pass
-    
+
     @abstractmethod
     def clear(self):
         pass
 
+    def get_com_estado(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Obtém valor mesmo expirado (stale-while-revalidate).
+
+        Retorna (valor, fresco) ou None quando nem o valor stale existe mais.
+        Backends que não guardam valores stale degradam para o get comum.
+        """
+        valor = self.get(key)
+        if valor is None:
+            return None
+        return valor, True
+
+    def set_many(self, itens: List[Tuple[str, Any, int]]):
+        """
+        Armazena vários pares (key, value, ttl_seconds) de uma vez.
+
+        Backends remotos sobrescrevem para enviar tudo em um round-trip;
+        o padrão só itera sobre set().
+        """
+        for key, value, ttl_seconds in itens:
+            self.set(key, value, ttl_seconds)
+
+
+@dataclass(slots=True)
+class _EntradaCache:
+    """
+    Entrada do MemoryCache.
+
+    slots=True elimina o __dict__ por entrada: com milhares de SLAs
+    individuais cacheados, o overhead fixo por item cai pela metade.
+    """
+    value: Any
+    expires_at: datetime
+    hard_expires_at: datetime
+    created_at: datetime
+    last_accessed: datetime
+
 
 class MemoryCache(CacheBackend):
-    """Cache em memória com TTL"""
-    
+    """Cache em memória com TTL em duas camadas (fresco / stale)"""
+
+    # Um valor vencido continua servível por este fator do TTL original
+    # (15 min frescos -> 2h de stale) enquanto o refresh roda em background
+    HARD_TTL_FACTOR = 8
+
     def __init__(self):
-        self._storage: Dict[str, Dict[str, Any]] = {}
+        self._storage: Dict[str, _EntradaCache] = {}
         self._hits = 0
         self._misses = 0
-    
+
     def get(self, key: str) -> Optional[Any]:
         """Obtém valor do cache se não expirou"""
-        if key not in self._storage:
+        entry = self._storage.get(key)
+        if entry is None:
             self._misses += 1
             return None
-        
-        entry = self._storage[key]
-        
+
         # Verifica expiração
-        if entry["expires_at"] < datetime.utcnow():
+        if entry.expires_at < datetime.utcnow():
+            if entry.hard_expires_at < datetime.utcnow():
+                del self._storage[key]
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        entry.last_accessed = datetime.utcnow()
+        return entry.value
+
+    def get_com_estado(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """Obtém valor fresco ou stale: (valor, fresco) ou None se hard-expirado"""
+        entry = self._storage.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        agora = datetime.utcnow()
+        if entry.hard_expires_at < agora:
             del self._storage[key]
             self._misses += 1
             return None
-        
+
         self._hits += 1
-        entry["last_accessed"] = datetime.utcnow()
-        return entry["value"]
-    
+        entry.last_accessed = agora
+        return entry.value, entry.expires_at >= agora
+
     def set(self, key: str, value: Any, ttl_seconds: int = 900):
         """Armazena valor com TTL (padrão 15 minutos)"""
-        self._storage[key] = {
-            "value": value,
-            "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds),
-            "created_at": datetime.utcnow(),
-            "last_accessed": datetime.utcnow()
-        }
+        agora = datetime.utcnow()
+        self._storage[key] = _EntradaCache(
+            value=value,
+            expires_at=agora + timedelta(seconds=ttl_seconds),
+            hard_expires_at=agora + timedelta(seconds=ttl_seconds * self.HARD_TTL_FACTOR),
+            created_at=agora,
+            last_accessed=agora,
+        )
         logger.debug(f"Cache set: {key} (TTL: {ttl_seconds}s)")
     
     def delete(self, key: str):
@@ -93,6 +177,126 @@ class MemoryCache(CacheBackend):
         }
 
 
+class RedisCache(CacheBackend):
+    """
+    Cache compartilhado entre workers via Redis.
+
+    Cada valor é um envelope {"v": valor, "f": fresco_até} serializado com
+    orjson; o TTL do Redis é o hard TTL (fator igual ao do MemoryCache), e
+    a fronteira fresco/stale fica dentro do envelope. Assim o refresh de um
+    worker aquece todos, e o stale-while-revalidate funciona igual.
+
+    Nota: datetimes viram strings ISO na serialização — os payloads
+    cacheados são JSON destinado à resposta HTTP, então isso é inócuo.
+    """
+
+    def __init__(self, url: str):
+        if _redis is None:
+            raise RuntimeError("pacote redis não instalado")
+        self._client = _redis.Redis.from_url(url)
+        self._client.ping()
+        self._hits = 0
+        self._misses = 0
+
+    def _obter_envelope(self, key: str) -> Optional[Dict]:
+        raw = self._client.get(key)
+        if raw is None:
+            return None
+        return _loads(raw)
+
+    def get(self, key: str) -> Optional[Any]:
+        envelope = self._obter_envelope(key)
+        if envelope is None or envelope["f"] < datetime.utcnow().isoformat():
+            self._misses += 1
+            return None
+        self._hits += 1
+        return envelope["v"]
+
+    def get_com_estado(self, key: str) -> Optional[Tuple[Any, bool]]:
+        envelope = self._obter_envelope(key)
+        if envelope is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return envelope["v"], envelope["f"] >= datetime.utcnow().isoformat()
+
+    @staticmethod
+    def _envelopar(value: Any, ttl_seconds: int) -> bytes:
+        return _dumps({
+            "v": value,
+            "f": (datetime.utcnow() + timedelta(seconds=ttl_seconds)).isoformat(),
+        })
+
+    def set(self, key: str, value: Any, ttl_seconds: int = 900):
+        self._client.set(
+            key, self._envelopar(value, ttl_seconds),
+            ex=ttl_seconds * MemoryCache.HARD_TTL_FACTOR
+        )
+
+    def set_many(self, itens: List[Tuple[str, Any, int]]):
+        """Envia todas as escritas em um único round-trip (pipeline)"""
+        pipe = self._client.pipeline(transaction=False)
+        for key, value, ttl_seconds in itens:
+            pipe.set(
+                key, self._envelopar(value, ttl_seconds),
+                ex=ttl_seconds * MemoryCache.HARD_TTL_FACTOR
+            )
+        pipe.execute()
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def clear(self):
+        chaves = list(self._client.scan_iter(match="sla:*"))
+        if chaves:
+            self._client.delete(*chaves)
+        logger.info("Cache Redis limpo (prefixo sla:)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self._hits + self._misses
+        hit_rate = (self._hits / total * 100) if total > 0 else 0
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": f"{hit_rate:.1f}%",
+            "backend": "redis",
+        }
+
+
+class _LoteCache(CacheBackend):
+    """
+    Backend transitório usado por CacheManager.batch().
+
+    Acumula as escritas feitas dentro do bloco e as envia de uma vez ao
+    backend real via set_many (um pipeline no Redis). Leituras e deletes
+    passam direto — escritas ainda não enviadas não são visíveis.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self._backend = backend
+        self._itens: List[Tuple[str, Any, int]] = []
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._backend.get(key)
+
+    def get_com_estado(self, key: str) -> Optional[Tuple[Any, bool]]:
+        return self._backend.get_com_estado(key)
+
+    def set(self, key: str, value: Any, ttl_seconds: int = 900):
+        self._itens.append((key, value, ttl_seconds))
+
+    def delete(self, key: str):
+        self._backend.delete(key)
+
+    def clear(self):
+        self._backend.clear()
+
+    def enviar(self):
+        if self._itens:
+            self._backend.set_many(self._itens)
+            self._itens = []
+
+
 class CacheManager:
     """Gerenciador de cache para SLA"""
     
@@ -115,55 +319,65 @@ class CacheManager:
         return key
     
     # ==================== Métricas Gerais ====================
-    
+
+    # As chaves de métricas/dashboard usam o período canônico em dias
+    # (7/30/60/90), não as datas: com datas na chave, a virada do dia
+    # invalidava estruturalmente tudo que o scheduler tinha acabado de
+    # escrever. As datas concretas da janela viajam dentro do valor
+    # (periodo_inicio/periodo_fim), gravadas pelo serviço de métricas.
+
     def get_metricas_gerais(
         self,
-        data_inicio: str,
-        data_fim: str
-    ) -> Optional[Dict]:
-        """Obtém métricas gerais do cache"""
-        key = self._make_key("metricas_gerais", data_inicio, data_fim)
+        periodo_dias: int,
+        com_estado: bool = False
+    ) -> Optional[Any]:
+        """Obtém métricas gerais do cache; com_estado retorna (valor, fresco)"""
+        key = self._make_key("metricas_gerais", periodo_dias)
+        if com_estado:
+            return self.backend.get_com_estado(key)
         return self.backend.get(key)
-    
+
     def set_metricas_gerais(
         self,
-        data_inicio: str,
-        data_fim: str,
+        periodo_dias: int,
         metricas: Dict
     ):
         """Armazena métricas gerais"""
-        key = self._make_key("metricas_gerais", data_inicio, data_fim)
+        key = self._make_key("metricas_gerais", periodo_dias)
         metricas["cached_at"] = datetime.utcnow().isoformat()
         self.backend.set(key, metricas, self.TTL_METRICAS_GERAIS)
-        logger.info(f"Métricas gerais cacheadas: {data_inicio} a {data_fim}")
-    
+        logger.info(f"Métricas gerais cacheadas: {periodo_dias} dias")
+
     # ==================== Métricas por Prioridade ====================
-    
+
     def get_metricas_por_prioridade(
         self,
-        data_inicio: str,
-        data_fim: str
-    ) -> Optional[list]:
-        """Obtém métricas por prioridade do cache"""
-        key = self._make_key("metricas_prioridade", data_inicio, data_fim)
+        periodo_dias: int,
+        com_estado: bool = False
+    ) -> Optional[Any]:
+        """Obtém métricas por prioridade do cache; com_estado retorna (valor, fresco)"""
+        key = self._make_key("metricas_prioridade", periodo_dias)
+        if com_estado:
+            return self.backend.get_com_estado(key)
         return self.backend.get(key)
-    
+
     def set_metricas_por_prioridade(
         self,
-        data_inicio: str,
-        data_fim: str,
+        periodo_dias: int,
         metricas: list
     ):
         """Armazena métricas por prioridade"""
-        key = self._make_key("metricas_prioridade", data_inicio, data_fim)
+        key = self._make_key("metricas_prioridade", periodo_dias)
         self.backend.set(key, metricas, self.TTL_METRICAS_PRIORIDADE)
         logger.info(f"Métricas por prioridade cacheadas: {len(metricas)} prioridades")
     
     # ==================== Chamados em Risco ====================
     
-    def get_chamados_em_risco(self) -> Optional[list]:
-        """Obtém chamados em risco do cache"""
+    def get_chamados_em_risco(self, com_estado: bool = False) -> Optional[Any]:
+        """Obtém chamados em risco do cache; com_estado retorna (valor, fresco)"""
         key = self._make_key("chamados_em_risco")
+        if com_estado:
+            return self.backend.get_com_estado(key)
         return self.backend.get(key)
     
     def set_chamados_em_risco(self, chamados: list):
@@ -174,9 +388,11 @@ class CacheManager:
     
     # ==================== Chamados Vencidos ====================
     
-    def get_chamados_vencidos(self) -> Optional[list]:
-        """Obtém chamados vencidos do cache"""
+    def get_chamados_vencidos(self, com_estado: bool = False) -> Optional[Any]:
+        """Obtém chamados vencidos do cache; com_estado retorna (valor, fresco)"""
         key = self._make_key("chamados_vencidos")
+        if com_estado:
+            return self.backend.get_com_estado(key)
         return self.backend.get(key)
     
     def set_chamados_vencidos(self, chamados: list):
@@ -189,24 +405,41 @@ class CacheManager:
     
     def get_dashboard(
         self,
-        data_inicio: str,
-        data_fim: str
-    ) -> Optional[Dict]:
-        """Obtém dashboard do cache"""
-        key = self._make_key("dashboard", data_inicio, data_fim)
+        periodo_dias: int,
+        com_estado: bool = False
+    ) -> Optional[Any]:
+        """Obtém dashboard do cache; com_estado retorna (valor, fresco)"""
+        key = self._make_key("dashboard", periodo_dias)
+        if com_estado:
+            return self.backend.get_com_estado(key)
         return self.backend.get(key)
-    
+
     def set_dashboard(
         self,
-        data_inicio: str,
-        data_fim: str,
+        periodo_dias: int,
         dashboard: Dict
     ):
         """Armazena dashboard"""
-        key = self._make_key("dashboard", data_inicio, data_fim)
+        key = self._make_key("dashboard", periodo_dias)
         dashboard["cached_at"] = datetime.utcnow().isoformat()
         self.backend.set(key, dashboard, self.TTL_DASHBOARD)
-        logger.info(f"Dashboard cacheado: {data_inicio} a {data_fim}")
+        # Pré-serializa UMA vez na escrita: o endpoint devolve o JSON pronto
+        # sem pagar um encode por request (o payload não muda por 15 min)
+        self.backend.set(
+            key + ":json", _dumps(dashboard).decode(), self.TTL_DASHBOARD
+        )
+        logger.info(f"Dashboard cacheado: {periodo_dias} dias")
+
+    def get_dashboard_json(
+        self,
+        periodo_dias: int,
+        com_estado: bool = False
+    ) -> Optional[Any]:
+        """Obtém o dashboard já serializado (string JSON)"""
+        key = self._make_key("dashboard", periodo_dias) + ":json"
+        if com_estado:
+            return self.backend.get_com_estado(key)
+        return self.backend.get(key)
     
     # ==================== Feriados ====================
     
@@ -247,9 +480,39 @@ class CacheManager:
         sla_info["cached_at"] = datetime.utcnow().isoformat()
         self.backend.set(key, sla_info, 300)  # 5 minutos
         logger.debug(f"SLA chamado {chamado_id} cacheado")
+
+    def get_many_sla_chamados(self, chamado_ids) -> Dict[int, Dict]:
+        """Obtém os SLAs cacheados de vários chamados de uma vez"""
+        encontrados: Dict[int, Dict] = {}
+        for chamado_id in chamado_ids:
+            valor = self.backend.get(self._make_key("sla_chamado", str(chamado_id)))
+            if valor is not None:
+                encontrados[chamado_id] = valor
+        return encontrados
+
+    def set_many_sla_chamados(self, slas: Dict[int, Dict]):
+        """Armazena os SLAs de vários chamados (mesmo TTL do individual)"""
+        cached_at = datetime.utcnow().isoformat()
+        for chamado_id, sla_info in slas.items():
+            sla_info["cached_at"] = cached_at
+            self.backend.set(self._make_key("sla_chamado", str(chamado_id)), sla_info, 300)
+        logger.debug(f"SLA de {len(slas)} chamados cacheado em lote")
     
     # ==================== Operações Gerais ====================
-    
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa os set_* feitos dentro do bloco em um único envio ao backend
+        — um round-trip no Redis; no cache em memória o custo é o mesmo.
+
+        As escritas só são enviadas se o bloco terminar sem exceção: um
+        refresh que falha no meio não deixa o cache meio-atualizado.
+        """
+        lote = _LoteCache(self.backend)
+        yield CacheManager(lote)
+        lote.enviar()
+
     def invalidar_tudo(self):
         """Invalida todo o cache"""
         self.backend.clear()
@@ -276,10 +539,24 @@ _cache_manager: Optional[CacheManager] = None
 
 
 def get_cache_manager() -> CacheManager:
-    """Obtém ou cria gerenciador de cache global"""
+    """
+    Obtém ou cria gerenciador de cache global.
+
+    Com SLA_REDIS_URL definido (e o pacote redis instalado), usa o backend
+    compartilhado; caso contrário, ou se o Redis estiver fora, cai para o
+    cache em memória por processo.
+    """
     global _cache_manager
     if _cache_manager is None:
-        _cache_manager = CacheManager()
+        backend: Optional[CacheBackend] = None
+        url = os.getenv("SLA_REDIS_URL", "").strip()
+        if url:
+            try:
+                backend = RedisCache(url)
+                logger.info("Cache SLA usando Redis compartilhado")
+            except Exception as e:
+                logger.warning(f"Redis indisponível ({e}); usando cache em memória")
+        _cache_manager = CacheManager(backend)
     return _cache_manager
 
 
@@ -7,16 +7,19 @@ Sistema de cálculo de SLA robusto
 - Conta SLA em: Aberto, Em atendimento
 - Calcula ao encerrar: Concluído, Expirado
 """
+import threading
 from datetime import datetime, date, time, timedelta
-from typing import List, Optional, Tuple, Dict
+from typing import List, Optional, Sequence, Set, Tuple, Dict
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 import logging
 
+from core import observability
 from .models import (
     Chamado, ConfiguracaoSLA, HorarioComercial, Feriado,
     PausaSLA, InfoSLAChamado, LogCalculoSLA
 )
+from .cache import SlaCache
 from .holidays import gerar_todos_feriados
 
 logger = logging.getLogger("sla.calculator")
@@ -30,59 +33,90 @@ STATUS_CONTA = {"Aberto", "Em atendimento"}
 # Status finais (encerram o cálculo)
 STATUS_FINAL = {"Concluído", "Expirado"}
 
+# Sentinela para distinguir "config não informada" de "sem config cadastrada"
+_NAO_CARREGADO = object()
+
 
 class CalculadorSLA:
     """Calculadora de SLA com suporte a pausas automáticas e feriados"""
     
+    # Tabela acumulada compartilhada entre instâncias (o scheduler cria um
+    # CalculadorSLA novo a cada refresh): (revisão do calendário, tabela).
+    # Reconstruída apenas quando o intervalo cresce ou feriados/horários mudam
+    _tabela_compartilhada: Optional[Tuple[int, Tuple]] = None
+    _tabela_lock = threading.Lock()
+
     def __init__(self, db: Session):
         self.db = db
-        self._cache_feriados: Dict[int, List[date]] = {}
+        self._cache_feriados: Dict[int, Set[date]] = {}
         self._cache_horarios: Optional[Dict[int, Tuple[time, time]]] = None
-    
+        # (ord_base, soma acumulada por dia, feriados, jornadas) — ver
+        # preparar_tabela_horas_uteis
+        self._tabela_horas: Optional[Tuple[int, List[float], Set[date], Dict]] = None
+
     # ==================== Cache e Carregamento ====================
-    
-    def _carregar_feriados(self, ano: int) -> List[date]:
-        """Carrega feriados para um ano específico do banco"""
+
+    def _carregar_feriados(self, ano: int) -> Set[date]:
+        """Carrega feriados para um ano específico (via cache de processo)"""
         if ano in self._cache_feriados:
             return self._cache_feriados[ano]
-        
-        feriados_db = self.db.query(Feriado.data).filter(
-            and_(
-                Feriado.ativo == True,
-                func.extract('year', Feriado.data) == ano
-            )
-        ).all()
-        
-        feriados_list = [f.data for f in feriados_db]
-        self._cache_feriados[ano] = feriados_list
-        
-        return feriados_list
-    
+
+        cache = SlaCache()
+        por_ano = cache.get_feriados()
+        if por_ano is None:
+            # Tabela pequena e read-mostly: carrega tudo de uma vez e
+            # compartilha entre instâncias via SlaCache (TTL + invalidação
+            # nos endpoints de escrita)
+            feriados_db = self.db.query(Feriado.data).filter(
+                Feriado.ativo == True
+            ).all()
+
+            por_ano = {}
+            for (data_feriado,) in feriados_db:
+                por_ano.setdefault(data_feriado.year, set()).add(data_feriado)
+            cache.set_feriados(por_ano)
+
+        feriados_set = por_ano.get(ano, set())
+        self._cache_feriados[ano] = feriados_set
+
+        return feriados_set
+
     def _carregar_horarios_comerciais(self) -> Dict[int, Tuple[time, time]]:
-        """Carrega horários comerciais por dia da semana"""
+        """Carrega horários comerciais por dia da semana (via cache de processo)"""
         if self._cache_horarios is not None:
             return self._cache_horarios
-        
-        horarios_db = self.db.query(HorarioComercial).filter(
-            HorarioComercial.ativo == True
-        ).all()
-        
-        horarios = {}
-        for h in horarios_db:
-            horarios[h.dia_semana] = (h.hora_inicio, h.hora_fim)
-        
-        # Padrão se não configurado
-        if not horarios:
-            for dia in range(5):  # seg-sex
-                horarios[dia] = (time(8, 0), time(18, 0))
-        
+
+        cache = SlaCache()
+        horarios = cache.get_horarios()
+        if horarios is None:
+            horarios_db = self.db.query(HorarioComercial).filter(
+                HorarioComercial.ativo == True
+            ).all()
+
+            horarios = {}
+            for h in horarios_db:
+                horarios[h.dia_semana] = (h.hora_inicio, h.hora_fim)
+
+            # Padrão se não configurado
+            if not horarios:
+                for dia in range(5):  # seg-sex
+                    horarios[dia] = (time(8, 0), time(18, 0))
+
+            cache.set_horarios(horarios)
+
         self._cache_horarios = horarios
         return horarios
     
     def invalidar_cache(self):
-        """Invalida cache de feriados e horários"""
+        """Invalida cache de feriados e horários (local e compartilhado)"""
         self._cache_feriados.clear()
         self._cache_horarios = None
+        self._tabela_horas = None
+        with CalculadorSLA._tabela_lock:
+            CalculadorSLA._tabela_compartilhada = None
+        cache = SlaCache()
+        cache.invalidate_feriados()
+        cache.invalidate_horarios()
     
     # ==================== Validação de Dias Úteis ====================
     
@@ -123,7 +157,89 @@ class CalculadorSLA:
         return horarios.get(dia_semana, (time(8, 0), time(18, 0)))
     
     # ==================== Cálculo de Horas Úteis ====================
-    
+
+    # Jornada aplicada quando um dia útil não tem horário configurado
+    # (mesmo fallback de obter_horario_comercial)
+    _JORNADA_PADRAO = (8 * 3600, 18 * 3600)
+
+    @staticmethod
+    def _segundos_de(t: time) -> float:
+        """Converte um horário em segundos desde a meia-noite"""
+        return t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
+
+    @staticmethod
+    def _contar_dia_semana(ord_inicio: int, ord_fim: int, dia_semana: int) -> int:
+        """
+        Conta quantas datas do intervalo de ordinais [ord_inicio, ord_fim]
+        caem em um dia da semana (0=segunda ... 6=domingo).
+        O ordinal 1 do calendário proléptico é uma segunda-feira.
+        """
+        if ord_fim < ord_inicio:
+            return 0
+        primeiro = ord_inicio + (dia_semana - (ord_inicio - 1)) % 7
+        if primeiro > ord_fim:
+            return 0
+        return (ord_fim - primeiro) // 7 + 1
+
+    def _feriados_entre(self, data_inicio: date, data_fim: date) -> Set[date]:
+        """Feriados ativos dentro do intervalo (inclusive)"""
+        feriados = set()
+        for ano in range(data_inicio.year, data_fim.year + 1):
+            feriados.update(
+                f for f in self._carregar_feriados(ano)
+                if data_inicio <= f <= data_fim
+            )
+        return feriados
+
+    def preparar_tabela_horas_uteis(self, data_inicio: date, data_fim: date) -> None:
+        """
+        Pré-calcula a soma acumulada de segundos úteis por dia no intervalo
+
+        Com a tabela montada, calcular_horas_uteis resolve os dias inteiros
+        entre as pontas com duas consultas O(1), sem refazer a contagem por
+        dia da semana nem a varredura de feriados a cada chamado. Usada por
+        recalcular_todos, onde o mesmo intervalo é consultado milhares de
+        vezes.
+
+        A tabela é compartilhada entre instâncias e reaproveitada entre
+        refreshes: só é reconstruída se o intervalo pedido não couber na
+        existente ou se a revisão do calendário (feriados/horários) mudou.
+        """
+        revisao = SlaCache().get_revisao()
+        with CalculadorSLA._tabela_lock:
+            compartilhada = CalculadorSLA._tabela_compartilhada
+            if compartilhada is not None and compartilhada[0] == revisao:
+                tabela = compartilhada[1]
+                if (
+                    tabela[0] <= data_inicio.toordinal()
+                    and data_fim.toordinal() <= tabela[0] + len(tabela[1]) - 2
+                ):
+                    self._tabela_horas = tabela
+                    return
+
+        horarios = self._carregar_horarios_comerciais()
+        jornadas = {
+            dia: (self._segundos_de(h_ini), self._segundos_de(h_fim))
+            for dia, (h_ini, h_fim) in horarios.items()
+        }
+        feriados = self._feriados_entre(data_inicio, data_fim)
+
+        ord_base = data_inicio.toordinal()
+        dias = data_fim.toordinal() - ord_base + 1
+        cum = [0.0] * (dias + 1)
+        total = 0.0
+        for i in range(dias):
+            ordinal = ord_base + i
+            dia_semana = (ordinal - 1) % 7  # ordinal 1 é segunda-feira
+            if dia_semana < 5 and date.fromordinal(ordinal) not in feriados:
+                j_ini, j_fim = jornadas.get(dia_semana, self._JORNADA_PADRAO)
+                total += max(0.0, j_fim - j_ini)
+            cum[i + 1] = total
+
+        self._tabela_horas = (ord_base, cum, feriados, jornadas)
+        with CalculadorSLA._tabela_lock:
+            CalculadorSLA._tabela_compartilhada = (revisao, self._tabela_horas)
+
     def calcular_horas_uteis(
         self,
         data_inicio: datetime,
@@ -131,52 +247,80 @@ class CalculadorSLA:
     ) -> float:
         """
         Calcula horas úteis entre duas datas (considerando horário comercial e dias úteis)
-        
+
+        Os dias inteiros entre as pontas são resolvidos pela tabela
+        acumulada (se preparada e cobrindo o intervalo) ou por aritmética
+        de calendário (contagem por dia da semana menos os feriados do
+        intervalo), sem iterar dia a dia; só os dias parciais das pontas
+        recebem o recorte pelo horário comercial.
+
         Args:
             data_inicio: Data/hora inicial
             data_fim: Data/hora final
-        
+
         Returns:
             Número de horas úteis
         """
         if data_inicio >= data_fim:
             return 0.0
-        
-        total_horas = 0.0
-        current_date = data_inicio.date()
-        current_time = data_inicio.time()
-        
-        while current_date <= data_fim.date():
-            horario_comercial = self.obter_horario_comercial(current_date)
-            
-            if horario_comercial:  # É dia útil
-                hora_inicio_comercial = horario_comercial[0]
-                hora_fim_comercial = horario_comercial[1]
-                
-                # Ajusta tempo inicial se estiver antes do horário comercial
-                if current_date == data_inicio.date():
-                    tempo_inicio = max(current_time, hora_inicio_comercial)
-                else:
-                    tempo_inicio = hora_inicio_comercial
-                
-                # Ajusta tempo final se for depois do horário comercial
-                if current_date == data_fim.date():
-                    tempo_fim = min(data_fim.time(), hora_fim_comercial)
-                else:
-                    tempo_fim = hora_fim_comercial
-                
-                # Calcula horas do dia
-                if tempo_inicio < tempo_fim:
-                    dt_inicio = datetime.combine(current_date, tempo_inicio)
-                    dt_fim = datetime.combine(current_date, tempo_fim)
-                    horas_dia = (dt_fim - dt_inicio).total_seconds() / 3600
-                    total_horas += horas_dia
-            
-            # Avança para próximo dia
-            current_date += timedelta(days=1)
-            current_time = time(0, 0)
-        
-        return total_horas
+
+        dia_ini = data_inicio.date()
+        dia_fim = data_fim.date()
+
+        tabela = self._tabela_horas
+        if (
+            tabela is not None
+            and tabela[0] <= dia_ini.toordinal()
+            and dia_fim.toordinal() <= tabela[0] + len(tabela[1]) - 2
+        ):
+            ord_base, cum, feriados, jornadas = tabela
+        else:
+            ord_base = cum = None
+            horarios = self._carregar_horarios_comerciais()
+            jornadas = {
+                dia: (self._segundos_de(h_ini), self._segundos_de(h_fim))
+                for dia, (h_ini, h_fim) in horarios.items()
+            }
+            feriados = self._feriados_entre(dia_ini, dia_fim)
+
+        def _segundos_parciais(dia: date, seg_ini: float, seg_fim: float) -> float:
+            """Recorte [seg_ini, seg_fim] do dia pela jornada comercial"""
+            if dia.weekday() >= 5 or dia in feriados:
+                return 0.0
+            j_ini, j_fim = jornadas.get(dia.weekday(), self._JORNADA_PADRAO)
+            return max(0.0, min(seg_fim, j_fim) - max(seg_ini, j_ini))
+
+        seg_abertura = self._segundos_de(data_inicio.time())
+        seg_fechamento = self._segundos_de(data_fim.time())
+
+        if dia_ini == dia_fim:
+            return _segundos_parciais(dia_ini, seg_abertura, seg_fechamento) / 3600
+
+        total = (
+            _segundos_parciais(dia_ini, seg_abertura, 86400.0)
+            + _segundos_parciais(dia_fim, 0.0, seg_fechamento)
+        )
+
+        # Dias inteiros entre as pontas (exclusivos): jornada cheia por dia
+        # da semana, descontando os feriados que caem em dia útil
+        ord_a = dia_ini.toordinal() + 1
+        ord_b = dia_fim.toordinal() - 1
+        if ord_a <= ord_b:
+            if cum is not None:
+                total += cum[ord_b - ord_base + 1] - cum[ord_a - ord_base]
+                return total / 3600
+            for dia_semana in range(5):
+                j_ini, j_fim = jornadas.get(dia_semana, self._JORNADA_PADRAO)
+                duracao = max(0.0, j_fim - j_ini)
+                if duracao:
+                    total += self._contar_dia_semana(ord_a, ord_b, dia_semana) * duracao
+            for feriado in feriados:
+                ordinal = feriado.toordinal()
+                if ord_a <= ordinal <= ord_b and feriado.weekday() < 5:
+                    j_ini, j_fim = jornadas.get(feriado.weekday(), self._JORNADA_PADRAO)
+                    total -= max(0.0, j_fim - j_ini)
+
+        return total / 3600
     
     # ==================== Gerenciamento de Pausas ====================
     
@@ -322,18 +466,27 @@ class CalculadorSLA:
     
     def calcular_sla(
         self,
-        chamado: Chamado
+        chamado: Chamado,
+        config=_NAO_CARREGADO,
+        pausas: Optional[Sequence[PausaSLA]] = None,
+        tempo_pausado: Optional[float] = None
     ) -> Dict:
         """
         Calcula informações de SLA completas para um chamado
-        
+
         Args:
             chamado: Objeto Chamado
-        
+            config: Configuração de SLA já carregada (evita um SELECT por
+                chamado em recálculos em lote); se omitida, busca no banco
+            pausas: Pausas do chamado já carregadas; se None, busca no banco
+            tempo_pausado: Total de horas pausadas já agregado (ex.: por um
+                SUM no banco); tem precedência sobre `pausas`
+
         Returns:
             Dicionário com informações de SLA
         """
-        config = self.obter_configuracao_sla(chamado.prioridade)
+        if config is _NAO_CARREGADO:
+            config = self.obter_configuracao_sla(chamado.prioridade)
         if not config:
             logger.warning(f"Sem configuração SLA para prioridade: {chamado.prioridade}")
             return self._criar_resultado_vazio()
@@ -343,7 +496,18 @@ class CalculadorSLA:
             data_ref = chamado.data_conclusao or chamado.cancelado_em or datetime.utcnow()
         else:
             data_ref = datetime.utcnow()
-        
+
+        # Tempo pausado é o mesmo para resposta e resolução: calcula uma vez
+        if tempo_pausado is not None:
+            tempo_pausado_total = tempo_pausado
+        elif pausas is not None:
+            tempo_pausado_total = sum(
+                p.duracao_horas for p in pausas
+                if p.fim is not None and p.duracao_horas
+            )
+        else:
+            tempo_pausado_total = self.calcular_tempo_pausado(chamado.id)
+
         # ==================== Cálculo de Resposta ====================
         tempo_resposta_decorrido = 0.0
         tempo_resposta_pausado = 0.0
@@ -358,7 +522,7 @@ class CalculadorSLA:
                 chamado.data_abertura,
                 data_ref
             )
-            tempo_resposta_pausado = self.calcular_tempo_pausado(chamado.id)
+            tempo_resposta_pausado = tempo_pausado_total
             
             tempo_efetivo = max(0, tempo_resposta_decorrido - tempo_resposta_pausado)
             percentual_resposta = (tempo_efetivo / config.tempo_resposta_horas * 100) if config.tempo_resposta_horas > 0 else 0
@@ -372,7 +536,7 @@ class CalculadorSLA:
             chamado.data_abertura,
             data_ref
         )
-        tempo_resolucao_pausado = self.calcular_tempo_pausado(chamado.id)
+        tempo_resolucao_pausado = tempo_pausado_total
         
         tempo_efetivo_resolucao = max(0, tempo_resolucao_decorrido - tempo_resolucao_pausado)
         percentual_resolucao = (tempo_efetivo_resolucao / config.tempo_resolucao_horas * 100) if config.tempo_resolucao_horas > 0 else 0
@@ -440,16 +604,27 @@ class CalculadorSLA:
     def recalcular_todos(self) -> Dict:
         """
         Recalcula SLA para todos os chamados ativos
-        
+
+        Pré-carrega configurações, pausas e o mapa de InfoSLAChamado em
+        poucas queries, de modo que o laço por chamado seja aritmética pura
+        (sem SELECT por ticket), e grava os resultados em lote.
+
         Returns:
             Dicionário com estatísticas
         """
         inicio = datetime.utcnow()
-        
-        chamados = self.db.query(Chamado).filter(
+
+        # Somente as colunas que calcular_sla lê, como tuplas (Row): nada de
+        # hidratar entidades ORM completas (descrição, anexos, tracking de
+        # estado) para um laço que só faz aritmética
+        chamados = self.db.query(
+            Chamado.id, Chamado.prioridade, Chamado.status,
+            Chamado.data_abertura, Chamado.data_primeira_resposta,
+            Chamado.data_conclusao, Chamado.cancelado_em,
+        ).filter(
             Chamado.deletado_em.is_(None)
         ).all()
-        
+
         stats = {
             "total_processados": len(chamados),
             "em_risco": 0,
@@ -457,26 +632,66 @@ class CalculadorSLA:
             "pausados": 0,
             "tempo_ms": 0
         }
-        
+
+        configs = {
+            c.prioridade: c
+            for c in self.db.query(ConfiguracaoSLA).filter(
+                ConfiguracaoSLA.ativo == True
+            ).all()
+        }
+
+        # Tabela acumulada cobrindo todos os chamados do lote: cada
+        # calcular_horas_uteis vira duas consultas O(1) na tabela
+        datas_abertura = [c.data_abertura for c in chamados if c.data_abertura]
+        if datas_abertura:
+            self.preparar_tabela_horas_uteis(
+                min(datas_abertura).date(),
+                (inicio + timedelta(days=2)).date()
+            )
+
+        # Total pausado por chamado agregado no banco (apenas pausas
+        # finalizadas, mesma regra de calcular_tempo_pausado): um GROUP BY
+        # substitui carregar todas as linhas de pausa em blocos e somá-las
+        # em Python
+        pausado_por_chamado: Dict[int, float] = dict(
+            self.db.query(
+                PausaSLA.chamado_id,
+                func.coalesce(func.sum(PausaSLA.duracao_horas), 0.0),
+            ).filter(
+                PausaSLA.fim.isnot(None)
+            ).group_by(PausaSLA.chamado_id).all()
+        )
+
+        # chamado_id -> id da linha existente em sla_info_chamado
+        info_ids = dict(
+            self.db.query(InfoSLAChamado.chamado_id, InfoSLAChamado.id).all()
+        )
+
+        agora = datetime.utcnow()
+
+        # Com os dados pré-carregados o laço é aritmética pura em Python e
+        # roda sequencial de propósito: threads serializariam no GIL e um
+        # pool de processos custaria mais em pickling do que o laço em si
+        updates: List[Dict] = []
+        inserts: List[Dict] = []
+
         for chamado in chamados:
-            resultado = self.calcular_sla(chamado)
-            
-            # Atualiza ou cria InfoSLAChamado
-            info = self.db.query(InfoSLAChamado).filter(
-                InfoSLAChamado.chamado_id == chamado.id
-            ).first()
-            
-            if not info:
-                info = InfoSLAChamado(chamado_id=chamado.id)
-                self.db.add(info)
-            
-            # Atualiza campos
-            for key, value in resultado.items():
-                if hasattr(info, key):
-                    setattr(info, key, value)
-            
-            info.ultima_atualizacao = datetime.utcnow()
-            
+            resultado = self.calcular_sla(
+                chamado,
+                config=configs.get(chamado.prioridade),
+                tempo_pausado=pausado_por_chamado.get(chamado.id, 0.0)
+            )
+
+            payload = dict(resultado)
+            payload["ultima_atualizacao"] = agora
+            info_id = info_ids.get(chamado.id)
+            if info_id is not None:
+                payload["id"] = info_id
+                updates.append(payload)
+            else:
+                payload["chamado_id"] = chamado.id
+                inserts.append(payload)
+
             # Conta estatísticas
             if resultado["pausado"]:
                 stats["pausados"] += 1
@@ -484,12 +699,18 @@ class CalculadorSLA:
                 stats["em_risco"] += 1
             if resultado["resolucao_vencida"]:
                 stats["vencidos"] += 1
-        
+
+        if updates:
+            self.db.bulk_update_mappings(InfoSLAChamado, updates)
+        if inserts:
+            self.db.bulk_insert_mappings(InfoSLAChamado, inserts)
+
         self.db.commit()
         
         # Log
         tempo_ms = int((datetime.utcnow() - inicio).total_seconds() * 1000)
         stats["tempo_ms"] = tempo_ms
+        observability.observar("sla_recalcular_todos", tempo_ms / 1000.0)
         
         log = LogCalculoSLA(
             tipo="batch",
@@ -18,7 +18,7 @@ class SlaSettings:
     # Scheduler
     SCHEDULER_INTERVAL_MINUTES: int = 5   # Intervalo de recálculo
     SCHEDULER_ENABLED: bool = True        # Ativar scheduler
-    
+
     def __post_init__(self):
         if self.BUSINESS_DAYS is None:
             self.BUSINESS_DAYS = [0, 1, 2, 3, 4]  # Segunda a sexta
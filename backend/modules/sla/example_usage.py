@@ -2,8 +2,11 @@
 Exemplos práticos de uso do módulo SLA
 Execute para testar o sistema
 """
+import io
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import redirect_stdout
 from datetime import datetime, date, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 
 from .calculator import CalculadorSLA
 from .metrics import ServicoMetricasSLA
@@ -237,27 +240,66 @@ def exemplo_configuracoes_sla(db: Session):
         print()
 
 
+def _executar_exemplo_isolado(exemplo, session_factory):
+    """
+    Executa um exemplo em uma sessão própria, capturando a saída em buffer
+    para permitir execução concorrente sem misturar os prints
+    """
+    buffer = io.StringIO()
+    db = session_factory()
+    try:
+        with redirect_stdout(buffer):
+            exemplo(db)
+    finally:
+        db.close()
+    return buffer.getvalue()
+
+
 def executar_todos_exemplos(db: Session):
-    """Executa todos os exemplos"""
+    """
+    Executa todos os exemplos
+
+    Os exemplos são somente-leitura e independentes entre si, então são
+    despachados em paralelo (4 workers) para sobrepor a espera de I/O do
+    banco. Cada worker usa sua própria sessão e a saída é impressa na
+    ordem original ao final.
+    """
     print("\n")
     print("╔" + "="*58 + "╗")
     print("║" + " "*10 + "EXEMPLOS DE USO DO MÓDULO SLA" + " "*20 + "║")
     print("╚" + "="*58 + "╝")
-    
+
+    exemplos = [
+        exemplo_calcular_sla,
+        exemplo_configuracoes_sla,
+        exemplo_feriados,
+        exemplo_metricas_gerais,
+        exemplo_metricas_por_prioridade,
+        exemplo_chamados_em_risco,
+        exemplo_chamados_vencidos,
+        exemplo_dashboard_executivo,
+    ]
+
     try:
-        exemplo_calcular_sla(db)
-        exemplo_configuracoes_sla(db)
-        exemplo_feriados(db)
-        exemplo_metricas_gerais(db)
-        exemplo_metricas_por_prioridade(db)
-        exemplo_chamados_em_risco(db)
-        exemplo_chamados_vencidos(db)
-        exemplo_dashboard_executivo(db)
-        
+        session_factory = scoped_session(sessionmaker(bind=db.get_bind()))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [
+                executor.submit(_executar_exemplo_isolado, exemplo, session_factory)
+                for exemplo in exemplos
+            ]
+            wait(futures)
+
+        session_factory.remove()
+
+        # Imprime as saídas na ordem original dos exemplos
+        for future in futures:
+            print(future.result(), end="")
+
         print("\n" + "="*60)
         print("✅ Todos os exemplos executados com sucesso!")
         print("="*60 + "\n")
-        
+
     except Exception as e:
         print(f"\n❌ Erro ao executar exemplos: {e}")
         import traceback
@@ -2,7 +2,9 @@
 Cálculo de feriados brasileiros: fixos e móveis (baseados na Páscoa)
 """
 from datetime import date, timedelta
-from typing import List, Dict
+from functools import lru_cache
+from operator import itemgetter
+from typing import List, Dict, Tuple
 from dateutil.easter import easter
 
 
@@ -93,6 +95,19 @@ def calcular_feriados_fixos(ano: int) -> List[Dict[str, str]]:
     ]
 
 
+# Feriados móveis como deslocamento em dias a partir da Páscoa:
+# (offset, nome, tipo)
+_MOVEL_OFFSETS = (
+    (-49, "Domingo de Carnaval", "ponto_facultativo"),
+    (-48, "Segunda-feira de Carnaval", "ponto_facultativo"),
+    (-47, "Terça-feira de Carnaval", "ponto_facultativo"),
+    (-46, "Quarta-feira de Cinzas (até 14h)", "ponto_facultativo"),
+    (-2, "Sexta-feira Santa", "nacional"),
+    (0, "Páscoa", "nacional"),
+    (60, "Corpus Christi", "ponto_facultativo"),
+)
+
+
 def calcular_feriados_moveis(ano: int) -> List[Dict[str, str]]:
     """
     Calcula feriados móveis (que mudam conforme Páscoa) para um ano específico
@@ -111,93 +126,47 @@ def calcular_feriados_moveis(ano: int) -> List[Dict[str, str]]:
         - Corpus Christi: 60 dias depois da Páscoa
     """
     pascoa = easter(ano)
+
+    return [
+        {
+            "data": (pascoa + timedelta(days=offset)).strftime("%Y-%m-%d"),
+            "nome": nome,
+            "tipo": tipo,
+            "recorrente": False
+        }
+        for offset, nome, tipo in _MOVEL_OFFSETS
+    ]
+
+
+@lru_cache(maxsize=64)
+def _gerar_todos_feriados_cached(ano: int) -> Tuple[Dict[str, str], ...]:
+    """Versão memoizada: função pura de `ano` (inclui o cálculo da Páscoa)"""
     feriados = []
-    
-    # Carnaval (domingo): 49 dias antes da Páscoa
-    carnaval_domingo = pascoa - timedelta(days=49)
-    feriados.append({
-        "data": carnaval_domingo.strftime("%Y-%m-%d"),
-        "nome": "Domingo de Carnaval",
-        "tipo": "ponto_facultativo",
-        "recorrente": False
-    })
-    
-    # Segunda-feira de Carnaval: 48 dias antes
-    carnaval_segunda = pascoa - timedelta(days=48)
-    feriados.append({
-        "data": carnaval_segunda.strftime("%Y-%m-%d"),
-        "nome": "Segunda-feira de Carnaval",
-        "tipo": "ponto_facultativo",
-        "recorrente": False
-    })
-    
-    # Terça-feira de Carnaval: 47 dias antes
-    carnaval_terca = pascoa - timedelta(days=47)
-    feriados.append({
-        "data": carnaval_terca.strftime("%Y-%m-%d"),
-        "nome": "Terça-feira de Carnaval",
-        "tipo": "ponto_facultativo",
-        "recorrente": False
-    })
-    
-    # Quarta-feira de Cinzas: 46 dias antes (até 14h - ponto facultativo)
-    cinzas = pascoa - timedelta(days=46)
-    feriados.append({
-        "data": cinzas.strftime("%Y-%m-%d"),
-        "nome": "Quarta-feira de Cinzas (até 14h)",
-        "tipo": "ponto_facultativo",
-        "recorrente": False
-    })
-    
-    # Sexta-feira Santa: 2 dias antes da Páscoa
-    sexta_santa = pascoa - timedelta(days=2)
-    feriados.append({
-        "data": sexta_santa.strftime("%Y-%m-%d"),
-        "nome": "Sexta-feira Santa",
-        "tipo": "nacional",
-        "recorrente": False
-    })
-    
-    # Páscoa
-    feriados.append({
-        "data": pascoa.strftime("%Y-%m-%d"),
-        "nome": "Páscoa",
-        "tipo": "nacional",
-        "recorrente": False
-    })
-    
-    # Corpus Christi: 60 dias depois da Páscoa
-    corpus_christi = pascoa + timedelta(days=60)
-    feriados.append({
-        "data": corpus_christi.strftime("%Y-%m-%d"),
-        "nome": "Corpus Christi",
-        "tipo": "ponto_facultativo",
-        "recorrente": False
-    })
-    
-    return feriados
+
+    # Adiciona fixos e móveis
+    feriados.extend(calcular_feriados_fixos(ano))
+    feriados.extend(calcular_feriados_moveis(ano))
+
+    # Ordena por data
+    feriados.sort(key=itemgetter("data"))
+
+    return tuple(feriados)
 
 
 def gerar_todos_feriados(ano: int) -> List[Dict[str, str]]:
     """
     Gera lista completa de feriados (fixos + móveis) para um ano, ordenada por data
-    
+
+    O resultado é memoizado por ano; cada chamada devolve cópias rasas
+    dos dicts para que alterações do chamador não poluam o cache.
+
     Args:
         ano: Ano desejado
-    
+
     Returns:
         Lista ordenada de dicts com feriados
     """
-    feriados = []
-    
-    # Adiciona fixos e móveis
-    feriados.extend(calcular_feriados_fixos(ano))
-    feriados.extend(calcular_feriados_moveis(ano))
-    
-    # Ordena por data
-    feriados.sort(key=lambda x: x["data"])
-    
-    return feriados
+    return [dict(f) for f in _gerar_todos_feriados_cached(ano)]
 
 
 def gerar_feriados_intervalo(ano_inicio: int, ano_fim: int) -> List[Dict[str, str]]:
@@ -216,15 +185,14 @@ def gerar_feriados_intervalo(ano_inicio: int, ano_fim: int) -> List[Dict[str, st
     for ano in range(ano_inicio, ano_fim + 1):
         todos_feriados.extend(gerar_todos_feriados(ano))
     
-    # Remove duplicatas (se houver) e ordena
+    # Remove duplicatas (se houver) usando o ordinal da data como chave
+    # (hash de int é mais barato que o de string)
     feriados_unicos = {}
     for f in todos_feriados:
-        feriados_unicos[f["data"]] = f
-    
-    feriados_list = list(feriados_unicos.values())
-    feriados_list.sort(key=lambda x: x["data"])
-    
-    return feriados_list
+        ordinal = date.fromisoformat(f["data"]).toordinal()
+        feriados_unicos.setdefault(ordinal, f)
+
+    return sorted(feriados_unicos.values(), key=itemgetter("data"))
 
 
 # Exemplo de uso
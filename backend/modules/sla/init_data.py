@@ -3,6 +3,7 @@ Script para inicializar configurações padrão e dados de SLA
 Execute uma vez no início do projeto
 """
 from datetime import time
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.orm import Session
 import logging
 
@@ -12,13 +13,15 @@ from .holidays import gerar_todos_feriados
 logger = logging.getLogger("sla.init")
 
 
-def inicializar_configuracoes_sla(db: Session, sobrescrever: bool = False):
+def inicializar_configuracoes_sla(db: Session, sobrescrever: bool = False, commit: bool = True):
     """
     Cria configurações padrão de SLA por prioridade
-    
+
     Args:
         db: Sessão do banco
         sobrescrever: Se deve sobrescrever configurações existentes
+        commit: Se deve commitar ao final (False quando parte de uma
+            transação maior, como em inicializar_completo)
     """
     configuracoes_padrao = [
         {
@@ -67,34 +70,36 @@ def inicializar_configuracoes_sla(db: Session, sobrescrever: bool = False):
         }
     ]
     
-    for config_data in configuracoes_padrao:
-        existe = db.query(ConfiguracaoSLA).filter(
-            ConfiguracaoSLA.prioridade == config_data["prioridade"]
-        ).first()
-        
-        if existe:
-            if sobrescrever:
-                # Atualiza campos
-                for key, value in config_data.items():
-                    setattr(existe, key, value)
-                logger.info(f"✓ Configuração '{config_data['prioridade']}' atualizada")
-            else:
-                logger.info(f"✓ Configuração '{config_data['prioridade']}' já existe")
-        else:
-            nova_config = ConfiguracaoSLA(**config_data, ativo=True)
-            db.add(nova_config)
-            logger.info(f"✓ Configuração '{config_data['prioridade']}' criada")
-    
-    db.commit()
+    # Upsert em uma única ida ao banco: o índice único em `prioridade`
+    # garante a idempotência sem o SELECT-then-INSERT (e sem a corrida dele)
+    valores = [{**config_data, "ativo": True} for config_data in configuracoes_padrao]
+    stmt = mysql_insert(ConfiguracaoSLA.__table__).values(valores)
 
+    if sobrescrever:
+        stmt = stmt.on_duplicate_key_update(
+            {col: stmt.inserted[col] for col in valores[0] if col != "prioridade"}
+        )
+    else:
+        # No-op em caso de duplicata (equivalente MySQL do DO NOTHING)
+        stmt = stmt.on_duplicate_key_update(id=ConfiguracaoSLA.__table__.c.id)
 
-def inicializar_horario_comercial(db: Session, sobrescrever: bool = False):
+    db.execute(stmt)
+    if commit:
+        db.commit()
+
+    acao = "atualizadas" if sobrescrever else "garantidas"
+    logger.info(f"✓ {len(valores)} configurações de SLA {acao}")
+
+
+def inicializar_horario_comercial(db: Session, sobrescrever: bool = False, commit: bool = True):
     """
     Cria horário comercial padrão (08:00-18:00, seg-sex)
-    
+
     Args:
         db: Sessão do banco
         sobrescrever: Se deve sobrescrever horários existentes
+        commit: Se deve commitar ao final (False quando parte de uma
+            transação maior)
     """
     # Horário padrão: 8h-18h de segunda a sexta
     horarios_padrao = [
@@ -109,61 +114,74 @@ def inicializar_horario_comercial(db: Session, sobrescrever: bool = False):
         # Remove horários antigos
         db.query(HorarioComercial).delete()
         logger.info("✓ Horários comerciais anteriores removidos")
-    
-    for horario_data in horarios_padrao:
-        existe = db.query(HorarioComercial).filter(
-            HorarioComercial.dia_semana == horario_data["dia_semana"]
-        ).first()
-        
-        if not existe:
-            novo_horario = HorarioComercial(**horario_data, ativo=True)
-            db.add(novo_horario)
-            dia_nome = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta"][horario_data["dia_semana"]]
-            logger.info(f"✓ Horário {dia_nome}: 08:00-18:00 criado")
-    
-    db.commit()
 
+    # Upsert em lote apoiado no índice único em `dia_semana`
+    valores = [{**horario_data, "ativo": True} for horario_data in horarios_padrao]
+    stmt = mysql_insert(HorarioComercial.__table__).values(valores)
+    stmt = stmt.on_duplicate_key_update(id=HorarioComercial.__table__.c.id)
+
+    db.execute(stmt)
+    if commit:
+        db.commit()
 
-def inicializar_feriados(db: Session, ano_inicio: int = 2026, ano_fim: int = 2027):
+    logger.info(f"✓ {len(valores)} horários comerciais (08:00-18:00, seg-sex) garantidos")
+
+
+def inicializar_feriados(db: Session, ano_inicio: int = 2026, ano_fim: int = 2027, commit: bool = True):
     """
     Cria feriados brasileiros fixos e móveis para um intervalo de anos
-    
+
     Args:
         db: Sessão do banco
         ano_inicio: Primeiro ano (padrão 2026)
         ano_fim: Último ano (padrão 2027)
+        commit: Se deve commitar ao final (False quando parte de uma
+            transação maior)
     """
+    from datetime import date
+
     feriados_criados = 0
     feriados_duplicados = 0
-    
+
+    # Busca as datas já cadastradas de uma vez; o set usa o ordinal (int)
+    # da data, cujo hash é mais barato que o de date/string
+    existing_ords = {
+        d.toordinal()
+        for (d,) in db.query(Feriado.data).filter(
+            Feriado.data >= date(ano_inicio, 1, 1),
+            Feriado.data <= date(ano_fim, 12, 31)
+        ).all()
+    }
+
+    valores = []
     for ano in range(ano_inicio, ano_fim + 1):
-        feriados = gerar_todos_feriados(ano)
-        
-        for feriado_data in feriados:
-            from datetime import date
+        for feriado_data in gerar_todos_feriados(ano):
             data_obj = date.fromisoformat(feriado_data["data"])
-            
-            existe = db.query(Feriado).filter(
-                Feriado.data == data_obj
-            ).first()
-            
-            if existe:
+
+            if data_obj.toordinal() in existing_ords:
                 feriados_duplicados += 1
                 continue
-            
-            novo_feriado = Feriado(
-                data=data_obj,
-                nome=feriado_data["nome"],
-                descricao=f"Feriado brasileiro - {feriado_data.get('tipo', 'nacional')}",
-                tipo=feriado_data.get("tipo", "nacional"),
-                recorrente=feriado_data.get("recorrente", False),
-                ativo=True
-            )
-            
-            db.add(novo_feriado)
+
+            existing_ords.add(data_obj.toordinal())
+            valores.append({
+                "data": data_obj,
+                "nome": feriado_data["nome"],
+                "descricao": f"Feriado brasileiro - {feriado_data.get('tipo', 'nacional')}",
+                "tipo": feriado_data.get("tipo", "nacional"),
+                "recorrente": feriado_data.get("recorrente", False),
+                "ativo": True
+            })
             feriados_criados += 1
-    
-    db.commit()
+
+    if valores:
+        # Insert único; a chave única em (data, ativo) ignora corridas
+        # concorrentes via no-op no ON DUPLICATE KEY
+        stmt = mysql_insert(Feriado.__table__).values(valores)
+        stmt = stmt.on_duplicate_key_update(id=Feriado.__table__.c.id)
+        db.execute(stmt)
+
+    if commit:
+        db.commit()
     logger.info(f"✓ {feriados_criados} feriados criados")
     if feriados_duplicados > 0:
         logger.info(f"⚠️ {feriados_duplicados} feriados já existiam")
@@ -182,15 +200,19 @@ def inicializar_completo(db: Session, anos_feriado=(2026, 2027)):
     logger.info("=" * 60)
     
     try:
+        # Os três passos compartilham uma única transação: um commit (e um
+        # fsync) no final, e tudo-ou-nada se algum passo falhar
         logger.info("\n1. Criando configurações de SLA...")
-        inicializar_configuracoes_sla(db)
-        
+        inicializar_configuracoes_sla(db, commit=False)
+
         logger.info("\n2. Criando horário comercial...")
-        inicializar_horario_comercial(db)
-        
+        inicializar_horario_comercial(db, commit=False)
+
         logger.info(f"\n3. Criando feriados ({anos_feriado[0]}-{anos_feriado[1]})...")
-        inicializar_feriados(db, anos_feriado[0], anos_feriado[1])
-        
+        inicializar_feriados(db, anos_feriado[0], anos_feriado[1], commit=False)
+
+        db.commit()
+
         logger.info("\n" + "=" * 60)
         logger.info("✅ Inicialização concluída com sucesso!")
         logger.info("=" * 60)
@@ -4,54 +4,201 @@ ServicoMetricasSLA - Cálculo de SLA com horas úteis
 - Pausa automática quando status == 'Aguardando'
 - Contabiliza apenas chamados abertos >= 16/02/2026
 """
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta, time, date, timezone
+from functools import lru_cache
+import threading
+import time as time_mod
 from typing import List, Optional, Dict, Tuple
 from sqlalchemy.orm import Session
 
+from core import observability
+
 SLA_DATA_INICIO = datetime(2026, 2, 16, 0, 0, 0)
 HORA_INICIO = time(8, 0)
 HORA_FIM = time(18, 0)
-STATUS_PAUSADOS = {"Aguardando"}
-STATUS_ATIVOS = {"Aberto", "Em atendimento"}
-STATUS_FINAIS = {"Concluído", "Expirado"}
+STATUS_PAUSADOS = frozenset({"Aguardando"})
+STATUS_ATIVOS = frozenset({"Aberto", "Em atendimento"})
+STATUS_FINAIS = frozenset({"Concluído", "Expirado"})
+STATUS_ABERTOS_OU_PAUSADOS = STATUS_ATIVOS | STATUS_PAUSADOS
+
+# Tuplas pré-materializadas para os filtros IN (evita list(set) por request)
+_STATUS_ABERTOS_OU_PAUSADOS_LIST = tuple(STATUS_ABERTOS_OU_PAUSADOS)
+_STATUS_FINAIS_LIST = tuple(STATUS_FINAIS)
+
+# Prioridades formam um conjunto fechado: normalização por lookup evita
+# alocar uma string nova em .lower() a cada chamado
+_PRIO_NORM = {
+    "Urgente": "urgente", "urgente": "urgente",
+    "Alta": "alta", "alta": "alta",
+    "Normal": "normal", "normal": "normal",
+    "Baixa": "baixa", "baixa": "baixa",
+    None: "normal",
+}
 
 
 def _eh_dia_util(d: date) -> bool:
     return d.weekday() < 5
 
+# Janela comercial em segundos a partir da meia-noite
+_JANELA_INICIO_S = HORA_INICIO.hour * 3600 + HORA_INICIO.minute * 60
+_JANELA_FIM_S = HORA_FIM.hour * 3600 + HORA_FIM.minute * 60
+_SEGUNDOS_DIA_UTIL = _JANELA_FIM_S - _JANELA_INICIO_S
+
+
+def _dias_uteis_entre(ord_inicio: int, ord_fim: int) -> int:
+    """Conta dias úteis (seg-sex) no intervalo de ordinais [ord_inicio, ord_fim)."""
+    semanas, resto = divmod(ord_fim - ord_inicio, 7)
+    total = semanas * 5
+    wd = (ord_inicio - 1) % 7  # ordinal 1 = segunda-feira
+    for i in range(resto):
+        if (wd + i) % 7 < 5:
+            total += 1
+    return total
+
+
+# Numba é opcional: se instalado, compila o kernel escalar (cache em disco
+# para não pagar a compilação a cada restart); senão segue em Python puro
+try:
+    from numba import njit
+    _dias_uteis_entre = njit(cache=True)(_dias_uteis_entre)
+except ImportError:
+    pass
+
+# Tabela de prefixos: _CUM[i] = segundos úteis acumulados nos dias
+# [SLA_DATA_INICIO, SLA_DATA_INICIO + i). Como a janela comercial é fixa,
+# a tabela é determinística e cobre ~10 anos; feriados podem zerar dias
+# via reconstruir_tabela_horas_uteis.
+_ORD_BASE = SLA_DATA_INICIO.toordinal()
+_TABELA_DIAS = 3660
+_FERIADOS_ORDS: frozenset = frozenset()
+_CUM: List[int] = []
+
+
+def reconstruir_tabela_horas_uteis(feriados=()) -> None:
+    """
+    (Re)constrói a tabela de prefixos de segundos úteis.
+
+    Args:
+        feriados: iterável de `date` que devem contar como dias sem expediente
+    """
+    global _CUM, _FERIADOS_ORDS
+    _FERIADOS_ORDS = frozenset(d.toordinal() for d in feriados)
+    cum = [0] * (_TABELA_DIAS + 1)
+    total = 0
+    for i in range(_TABELA_DIAS):
+        o = _ORD_BASE + i
+        if (o - 1) % 7 < 5 and o not in _FERIADOS_ORDS:
+            total += _SEGUNDOS_DIA_UTIL
+        cum[i + 1] = total
+    _CUM = cum
+
+
+reconstruir_tabela_horas_uteis()
+
+
+def _segundos_uteis_ate(dt: datetime) -> int:
+    """
+    Segundos úteis acumulados de SLA_DATA_INICIO até `dt`: lookup O(1) na
+    tabela de prefixos mais a fração já decorrida da janela comercial do
+    próprio dia.
+    """
+    ordinal = dt.toordinal()
+    idx = ordinal - _ORD_BASE
+    if idx < 0:
+        return 0
+    if idx >= _TABELA_DIAS:
+        # Além do horizonte da tabela: completa com a forma fechada
+        total = _CUM[-1] + _dias_uteis_entre(_ORD_BASE + _TABELA_DIAS, ordinal) * _SEGUNDOS_DIA_UTIL
+    else:
+        total = _CUM[idx]
+    if (ordinal - 1) % 7 < 5 and ordinal not in _FERIADOS_ORDS:
+        s = dt.hour * 3600 + dt.minute * 60 + dt.second
+        total += min(max(s, _JANELA_INICIO_S), _JANELA_FIM_S) - _JANELA_INICIO_S
+    return total
+
 
 def _horas_uteis(inicio: datetime, fim: datetime) -> float:
+    # Aritmética inteira fechada (ordinais + segundos) em vez do laço
+    # dia-a-dia com datetime.combine: custo O(1) por chamada
     if not inicio or not fim:
         return 0.0
     if inicio < SLA_DATA_INICIO:
         inicio = SLA_DATA_INICIO
     if inicio >= fim:
         return 0.0
-    total = 0.0
-    current = inicio.date()
-    while current <= fim.date():
-        if _eh_dia_util(current):
-            j_ini = max(datetime.combine(current, HORA_INICIO), inicio)
-            j_fim = min(datetime.combine(current, HORA_FIM), fim)
-            if j_ini < j_fim:
-                total += (j_fim - j_ini).total_seconds() / 3600
-        current += timedelta(days=1)
-    return round(total, 4)
-
-
-def _horas_uteis_com_pausas(inicio: datetime, fim: datetime, pausas: List[Tuple]) -> Tuple[float, float]:
-    bruto = _horas_uteis(inicio, fim)
-    pausado = 0.0
-    for p_ini, p_fim in pausas:
-        p_fim_real = p_fim or datetime.utcnow()
-        i2 = max(p_ini, inicio)
-        f2 = min(p_fim_real, fim)
+    ord_inicio = inicio.toordinal()
+    if ord_inicio == fim.toordinal():
+        # Fast path: intervalo dentro de um único dia (caso mais comum em
+        # resoluções rápidas) — um único clamp contra a janela comercial
+        if (ord_inicio - 1) % 7 >= 5 or ord_inicio in _FERIADOS_ORDS:
+            return 0.0
+        s_ini = max(inicio.hour * 3600 + inicio.minute * 60 + inicio.second, _JANELA_INICIO_S)
+        s_fim = min(fim.hour * 3600 + fim.minute * 60 + fim.second, _JANELA_FIM_S)
+        if s_ini >= s_fim:
+            return 0.0
+        return round((s_fim - s_ini) / 3600, 4)
+    total = _segundos_uteis_ate(fim) - _segundos_uteis_ate(inicio)
+    return round(total / 3600, 4)
+
+
+def _indexar_pausas(pausas: List[Tuple], now: datetime) -> Tuple:
+    """
+    Ordena as pausas por início e pré-soma as horas úteis de cada uma.
+
+    O índice (inícios, fins, prefixo) permite consultar o total pausado em
+    qualquer intervalo em O(log P): busca binária delimita as pausas que
+    tocam a janela, as totalmente contidas saem da soma de prefixos e só as
+    (no máximo duas) pausas de borda são recortadas individualmente.
+    """
+    intervalos = sorted((p_ini, p_fim or now) for p_ini, p_fim in pausas)
+    inicios = [i for i, _ in intervalos]
+    fins = [f for _, f in intervalos]
+    prefixo = [0.0]
+    for p_ini, p_fim in intervalos:
+        prefixo.append(prefixo[-1] + _horas_uteis(p_ini, p_fim))
+    return inicios, fins, prefixo
+
+
+def _horas_pausadas_no_intervalo(indice_pausas: Tuple, inicio: datetime, fim: datetime) -> float:
+    inicios, fins, prefixo = indice_pausas
+    if inicio >= fim:
+        return 0.0
+    # Pausas que tocam [inicio, fim): começam antes de fim e terminam após inicio
+    lo = bisect_right(fins, inicio)
+    hi = bisect_left(inicios, fim)
+    if lo >= hi:
+        return 0.0
+    # Totalmente contidas: soma de prefixos, sem recorte
+    a = max(bisect_left(inicios, inicio), lo)
+    b = min(bisect_right(fins, fim), hi)
+    total = prefixo[b] - prefixo[a] if b > a else 0.0
+    # Pausas de borda (atravessam inicio ou fim): recorta uma a uma
+    for idx in {*range(lo, min(a, hi)), *range(max(b, lo), hi)}:
+        i2 = max(inicios[idx], inicio)
+        f2 = min(fins[idx], fim)
         if i2 < f2:
-            pausado += _horas_uteis(i2, f2)
+            total += _horas_uteis(i2, f2)
+    return total
+
+
+def _horas_uteis_com_pausas(
+    inicio: datetime,
+    fim: datetime,
+    indice_pausas: Optional[Tuple],
+) -> Tuple[float, float]:
+    bruto = _horas_uteis(inicio, fim)
+    if not indice_pausas:
+        # Caminho comum: sem pausas não há o que descontar nem re-arredondar
+        return bruto, 0.0
+    pausado = _horas_pausadas_no_intervalo(indice_pausas, inicio, fim)
     return round(max(0, bruto - pausado), 4), round(pausado, 4)
 
 
-def _formatar(horas: float) -> str:
+@lru_cache(maxsize=4096)
+def _formatar_cached(horas: float) -> str:
     if horas <= 0:
         return "—"
     h = int(horas)
@@ -63,6 +210,40 @@ def _formatar(horas: float) -> str:
     return f"{m}min"
 
 
+def _formatar(horas: float) -> str:
+    # Domínio limitado (~0-2000h, resolução de minutos): memoizar compensa
+    return _formatar_cached(round(horas, 2))
+
+
+@dataclass(slots=True)
+class SlaResult:
+    """Resultado de SLA de um chamado; evita um dict de 20 chaves por ticket
+    no laço do dashboard (o dict só é materializado nas listas top-50)."""
+    chamado_id: int
+    codigo: str
+    prioridade: Optional[str]
+    status: str
+    pausado: bool
+    ativo: bool
+    resolucao_trabalhado_horas: float
+    resolucao_pausado_horas: float
+    resolucao_limite_horas: float
+    percentual_resolucao: float
+    resolucao_em_dia: bool
+    resolucao_em_risco: bool
+    resolucao_vencida: bool
+    resposta_trabalhado_horas: float
+    resposta_pausado_horas: float
+    resposta_limite_horas: float
+    percentual_resposta: float
+    resposta_em_dia: bool
+    resposta_em_risco: bool
+    resposta_vencida: bool
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
 def _normalizar_datetime(dt: Optional[datetime]) -> Optional[datetime]:
     """Remove timezone info para manter consistência com datetimes naive do sistema."""
     if dt is not None and dt.tzinfo is not None:
@@ -72,20 +253,54 @@ def _normalizar_datetime(dt: Optional[datetime]) -> Optional[datetime]:
 
 class ServicoMetricasSLA:
 
+    # Cache de resultados do dashboard compartilhado entre instâncias
+    # (o payload é determinístico dado o período + instante do cálculo;
+    # o TTL curto limita a defasagem, já que Chamado não tem um
+    # atualizado_em barato para servir de ETag)
+    _dashboard_cache: Dict[Tuple, Tuple[float, Dict]] = {}
+    _dashboard_cache_lock = threading.Lock()
+    _DASHBOARD_CACHE_TTL = 30.0
+    # Teto de entradas: as chaves vêm de parâmetros do cliente, então o
+    # dict não pode crescer sem limite; ao inserir, entradas vencidas são
+    # removidas e, no teto, sai a de expiração mais próxima (~LRU, já que
+    # o TTL é fixo)
+    _DASHBOARD_CACHE_MAX = 32
+
     def __init__(self, db: Session):
         self.db = db
+        self._configs_cache: Optional[Dict[str, Dict]] = None
 
     def _configs(self) -> Dict[str, Dict]:
-        from modules.sla.models import ConfiguracaoSLA
-        configs = self.db.query(ConfiguracaoSLA).filter(ConfiguracaoSLA.ativo == True).all()
-        return {
-            c.prioridade.lower(): {
-                "resposta": c.tempo_resposta_horas,
-                "resolucao": c.tempo_resolucao_horas,
-                "risco": c.percentual_risco
+        # Uma query por instância: o dashboard processa milhares de chamados
+        # e as configurações não mudam no meio de um cálculo
+        if self._configs_cache is None:
+            from modules.sla.models import ConfiguracaoSLA
+            configs = self.db.query(ConfiguracaoSLA).filter(ConfiguracaoSLA.ativo == True).all()
+            self._configs_cache = {
+                c.prioridade.lower(): {
+                    "resposta": c.tempo_resposta_horas,
+                    "resolucao": c.tempo_resolucao_horas,
+                    "risco": c.percentual_risco
+                }
+                for c in configs
             }
-            for c in configs
-        }
+        return self._configs_cache
+
+    def clear_cache(self):
+        """Invalida o cache de configurações (usar após alterar ConfiguracaoSLA)."""
+        self._configs_cache = None
+
+    @classmethod
+    def invalidar_dashboard_cache(cls):
+        """
+        Descarta o cache de dashboard de todas as instâncias.
+
+        Chamar após escritas que afetam as métricas (pausas criadas/retomadas,
+        recálculo em lote), para que a próxima leitura reflita o novo estado
+        sem esperar o TTL expirar.
+        """
+        with cls._dashboard_cache_lock:
+            cls._dashboard_cache.clear()
 
     def _pausas(self, chamado_id: int) -> List[Tuple]:
         try:
@@ -95,14 +310,97 @@ class ServicoMetricasSLA:
         except Exception:
             return []
 
-    def calcular_sla_chamado(self, chamado) -> Optional[Dict]:
+    def _pausas_em_lote(self, chamado_ids: List[int]) -> Dict[int, List[Tuple]]:
+        """Busca as pausas de vários chamados em uma única query IN (evita N+1)."""
+        pausas_by_id: Dict[int, List[Tuple]] = defaultdict(list)
+        if not chamado_ids:
+            return pausas_by_id
+        try:
+            from ti.models.sla_pausa import SLAPausa
+            # Fatia a lista de IDs para não estourar o limite de parâmetros do driver
+            for i in range(0, len(chamado_ids), 1000):
+                chunk = chamado_ids[i:i + 1000]
+                rows = self.db.query(
+                    SLAPausa.chamado_id, SLAPausa.inicio, SLAPausa.fim
+                ).filter(SLAPausa.chamado_id.in_(chunk)).all()
+                for chamado_id, inicio, fim in rows:
+                    pausas_by_id[chamado_id].append((inicio, fim))
+        except Exception:
+            pass
+        return pausas_by_id
+
+    def _sla_de_info_cacheada(self, chamado, status: str) -> Optional[SlaResult]:
+        """
+        Monta o resultado de SLA de um chamado finalizado a partir da linha
+        pré-calculada em InfoSLAChamado. Retorna None se não houver linha
+        utilizável (caller refaz o cálculo ao vivo).
+        """
+        try:
+            from modules.sla.models import InfoSLAChamado
+            info = self.db.query(InfoSLAChamado).filter(
+                InfoSLAChamado.chamado_id == chamado.id
+            ).first()
+        except Exception:
+            return None
+
+        if not info or info.tempo_resolucao_limite_horas is None:
+            return None
+
+        res_dec = info.tempo_resolucao_decorrido_horas or 0.0
+        res_paus = info.tempo_resolucao_pausado_horas or 0.0
+        resp_dec = info.tempo_resposta_decorrido_horas or 0.0
+        resp_paus = info.tempo_resposta_pausado_horas or 0.0
+
+        return SlaResult(
+            chamado_id=chamado.id,
+            codigo=chamado.codigo,
+            prioridade=chamado.prioridade,
+            status=status,
+            pausado=False,
+            ativo=False,
+            resolucao_trabalhado_horas=round(max(0.0, res_dec - res_paus), 4),
+            resolucao_pausado_horas=res_paus,
+            resolucao_limite_horas=info.tempo_resolucao_limite_horas,
+            percentual_resolucao=info.percentual_resolucao or 0.0,
+            resolucao_em_dia=bool(info.resolucao_em_dia),
+            resolucao_em_risco=bool(info.resolucao_em_risco),
+            resolucao_vencida=bool(info.resolucao_vencida),
+            resposta_trabalhado_horas=round(max(0.0, resp_dec - resp_paus), 4),
+            resposta_pausado_horas=resp_paus,
+            resposta_limite_horas=info.tempo_resposta_limite_horas or 0.0,
+            percentual_resposta=info.percentual_resposta or 0.0,
+            resposta_em_dia=bool(info.resposta_em_dia),
+            resposta_em_risco=bool(info.resposta_em_risco),
+            resposta_vencida=bool(info.resposta_vencida),
+        )
+
+    def calcular_sla_chamado(
+        self,
+        chamado,
+        configs: Optional[Dict[str, Dict]] = None,
+        pausas: Optional[List[Tuple]] = None,
+        now: Optional[datetime] = None
+    ) -> Optional[Dict]:
+        """Versão pública (dict) de _calcular_sla_result."""
+        resultado = self._calcular_sla_result(chamado, configs, pausas, now)
+        return resultado.as_dict() if resultado is not None else None
+
+    def _calcular_sla_result(
+        self,
+        chamado,
+        configs: Optional[Dict[str, Dict]] = None,
+        pausas: Optional[List[Tuple]] = None,
+        now: Optional[datetime] = None
+    ) -> Optional[SlaResult]:
         if not chamado.data_abertura:
             return None
         if chamado.data_abertura < SLA_DATA_INICIO:
             return None
 
-        configs = self._configs()
-        key = (chamado.prioridade or "normal").lower()
+        if configs is None:
+            configs = self._configs()
+        prioridade = chamado.prioridade
+        key = _PRIO_NORM.get(prioridade) or (prioridade or "normal").lower()
         cfg = configs.get(key) or configs.get("normal")
         if not cfg:
             return None
@@ -111,54 +409,68 @@ class ServicoMetricasSLA:
         lim_res = cfg["resolucao"]
         pct_risco = cfg.get("risco", 80)
 
-        pausas = self._pausas(chamado.id)
         status = chamado.status or "Aberto"
+
+        # Chamados finalizados têm SLA imutável: reaproveita a linha já
+        # calculada em InfoSLAChamado em vez de refazer a matemática
+        if status in STATUS_FINAIS:
+            cacheado = self._sla_de_info_cacheada(chamado, status)
+            if cacheado is not None:
+                return cacheado
+
+        if pausas is None:
+            pausas = self._pausas(chamado.id)
+        if now is None:
+            now = datetime.utcnow()
+        # Índice ordenado construído uma vez por chamado e reaproveitado nas
+        # consultas de resposta e resolução (O(log P) cada, em vez de O(P))
+        indice_pausas = _indexar_pausas(pausas, now) if pausas else None
         pausado = status in STATUS_PAUSADOS
 
-        data_ref = chamado.data_conclusao or chamado.cancelado_em or datetime.utcnow()
+        data_ref = chamado.data_conclusao or chamado.cancelado_em or now
         if status not in STATUS_FINAIS:
-            data_ref = datetime.utcnow()
+            data_ref = now
 
         # Resolução
-        res_trab, res_paus = _horas_uteis_com_pausas(chamado.data_abertura, data_ref, pausas)
+        res_trab, res_paus = _horas_uteis_com_pausas(chamado.data_abertura, data_ref, indice_pausas)
         pct_res = round(res_trab / lim_res * 100, 1) if lim_res > 0 else 0
         res_venc = res_trab >= lim_res and status not in STATUS_FINAIS
         res_risco = pct_res >= pct_risco and not res_venc and status not in STATUS_FINAIS
 
         # Resposta
         if chamado.data_primeira_resposta:
-            resp_trab, resp_paus = _horas_uteis_com_pausas(chamado.data_abertura, chamado.data_primeira_resposta, pausas)
+            resp_trab, resp_paus = _horas_uteis_com_pausas(chamado.data_abertura, chamado.data_primeira_resposta, indice_pausas)
             pct_resp = round(resp_trab / lim_resp * 100, 1) if lim_resp > 0 else 0
             resp_venc = resp_trab > lim_resp
             resp_risco = False
         else:
-            resp_trab, resp_paus = _horas_uteis_com_pausas(chamado.data_abertura, data_ref, pausas)
+            resp_trab, resp_paus = _horas_uteis_com_pausas(chamado.data_abertura, data_ref, indice_pausas)
             pct_resp = round(resp_trab / lim_resp * 100, 1) if lim_resp > 0 else 0
             resp_venc = resp_trab >= lim_resp and status not in STATUS_FINAIS
             resp_risco = pct_resp >= pct_risco and not resp_venc and status not in STATUS_FINAIS
 
-        return {
-            "chamado_id": chamado.id,
-            "codigo": chamado.codigo,
-            "prioridade": chamado.prioridade,
-            "status": status,
-            "pausado": pausado,
-            "ativo": status in STATUS_ATIVOS,
-            "resolucao_trabalhado_horas": res_trab,
-            "resolucao_pausado_horas": res_paus,
-            "resolucao_limite_horas": lim_res,
-            "percentual_resolucao": pct_res,
-            "resolucao_em_dia": not res_venc and not res_risco,
-            "resolucao_em_risco": res_risco,
-            "resolucao_vencida": res_venc,
-            "resposta_trabalhado_horas": resp_trab,
-            "resposta_pausado_horas": resp_paus,
-            "resposta_limite_horas": lim_resp,
-            "percentual_resposta": pct_resp,
-            "resposta_em_dia": not resp_venc and not resp_risco,
-            "resposta_em_risco": resp_risco,
-            "resposta_vencida": resp_venc,
-        }
+        return SlaResult(
+            chamado_id=chamado.id,
+            codigo=chamado.codigo,
+            prioridade=chamado.prioridade,
+            status=status,
+            pausado=pausado,
+            ativo=status in STATUS_ATIVOS,
+            resolucao_trabalhado_horas=res_trab,
+            resolucao_pausado_horas=res_paus,
+            resolucao_limite_horas=lim_res,
+            percentual_resolucao=pct_res,
+            resolucao_em_dia=not res_venc and not res_risco,
+            resolucao_em_risco=res_risco,
+            resolucao_vencida=res_venc,
+            resposta_trabalhado_horas=resp_trab,
+            resposta_pausado_horas=resp_paus,
+            resposta_limite_horas=lim_resp,
+            percentual_resposta=pct_resp,
+            resposta_em_dia=not resp_venc and not resp_risco,
+            resposta_em_risco=resp_risco,
+            resposta_vencida=resp_venc,
+        )
 
     def obter_metricas_dashboard(
         self,
@@ -166,14 +478,32 @@ class ServicoMetricasSLA:
         data_fim: Optional[datetime] = None
     ) -> Dict:
         from ti.models.chamado import Chamado
-        from sqlalchemy import and_, or_
+        from sqlalchemy import and_, or_, func, text
 
         # ✅ Normalizar: remover timezone se vier com offset (ex: "Z" do frontend)
         data_inicio = _normalizar_datetime(data_inicio)
         data_fim = _normalizar_datetime(data_fim)
 
+        # Chave truncada ao minuto: o refresh periódico (e clientes com
+        # relógios ligeiramente defasados) reutilizam a mesma entrada em
+        # vez de gravar uma chave nova por microssegundo de "agora"
+        cache_key = (
+            data_inicio.replace(second=0, microsecond=0).isoformat() if data_inicio else None,
+            data_fim.replace(second=0, microsecond=0).isoformat() if data_fim else None,
+        )
+        agora_mono = time_mod.monotonic()
+        with self._dashboard_cache_lock:
+            entrada = self._dashboard_cache.get(cache_key)
+            if entrada and entrada[0] > agora_mono:
+                observability.incrementar("sla_dashboard_cache_hit")
+                return dict(entrada[1])
+        observability.incrementar("sla_dashboard_cache_miss")
+
+        # Timestamp único para todo o cálculo (evita um gettimeofday por chamado)
+        now = datetime.utcnow()
+
         if not data_fim:
-            data_fim = datetime.utcnow()
+            data_fim = now
         if not data_inicio:
             data_inicio = max(data_fim - timedelta(days=30), SLA_DATA_INICIO)
         else:
@@ -182,97 +512,160 @@ class ServicoMetricasSLA:
         # Inclui:
         # 1. Chamados abertos/em atendimento >= SLA_DATA_INICIO (independente do período filtrado)
         # 2. Chamados concluídos/expirados dentro do período filtrado
-        chamados = self.db.query(Chamado).filter(
-            and_(
-                Chamado.data_abertura >= SLA_DATA_INICIO,
-                Chamado.deletado_em.is_(None),
-                or_(
-                    # Ativos: sempre incluídos
-                    Chamado.status.in_(list(STATUS_ATIVOS | STATUS_PAUSADOS)),
-                    # Finalizados: só do período filtrado
-                    and_(
-                        Chamado.status.in_(list(STATUS_FINAIS)),
-                        Chamado.data_abertura >= data_inicio,
-                        Chamado.data_abertura <= data_fim,
-                    )
+        filtro = and_(
+            Chamado.data_abertura >= SLA_DATA_INICIO,
+            Chamado.deletado_em.is_(None),
+            or_(
+                # Ativos: sempre incluídos
+                Chamado.status.in_(_STATUS_ABERTOS_OU_PAUSADOS_LIST),
+                # Finalizados: só do período filtrado
+                and_(
+                    Chamado.status.in_(_STATUS_FINAIS_LIST),
+                    Chamado.data_abertura >= data_inicio,
+                    Chamado.data_abertura <= data_fim,
                 )
             )
-        ).all()
+        )
 
-        em_risco, vencidos, pausados, processados = [], [], [], []
-        soma_resp = soma_res = cnt_resp = cnt_res = 0.0
-
-        for c in chamados:
-            s = self.calcular_sla_chamado(c)
-            if not s:
-                continue
-            processados.append(s)
-            if s["pausado"]:
-                pausados.append(s)
-            elif s["resolucao_vencida"]:
-                vencidos.append(s)
-            elif s["resolucao_em_risco"]:
-                em_risco.append(s)
-            if c.data_primeira_resposta and s["resposta_trabalhado_horas"] > 0:
-                soma_resp += s["resposta_trabalhado_horas"]
-                cnt_resp += 1
-            elif c.data_primeira_resposta and s["resposta_trabalhado_horas"] <= 0:
-                # Fallback: primeira resposta fora do horário comercial → usa tempo real
-                horas_resp = max(
-                    (c.data_primeira_resposta - c.data_abertura).total_seconds() / 3600,
-                    0.017
-                )
-                soma_resp += horas_resp
-                cnt_resp += 1
-            # Resolução: conta chamados Concluídos
-            if c.status == "Concluído":
-                horas_res = s["resolucao_trabalhado_horas"]
-                if horas_res <= 0 and c.data_conclusao and c.data_abertura:
-                    # Fallback: tempo real em horas (mínimo 1 minuto = 0.017h)
-                    horas_res = max(
-                        (c.data_conclusao - c.data_abertura).total_seconds() / 3600,
+        # Contagens simples saem como GROUP BY no banco; só chamados ativos
+        # (que ainda precisam da matemática de risco/vencimento por linha)
+        # são hidratados como objetos ORM
+        contagens = self.db.query(
+            Chamado.prioridade, Chamado.status, func.count(Chamado.id)
+        ).filter(filtro).group_by(Chamado.prioridade, Chamado.status).all()
+
+        total = 0
+        chamados_abertos_count = 0
+        # defaultdict de contadores: o nome da prioridade entra só na
+        # montagem de por_prioridade, evitando o membership check por linha
+        prio_map: Dict[str, dict] = defaultdict(
+            lambda: {"total": 0, "em_risco": 0, "vencidos": 0, "pausados": 0}
+        )
+        for prioridade, status, qtd in contagens:
+            total += qtd
+            if status in STATUS_ABERTOS_OU_PAUSADOS:
+                chamados_abertos_count += qtd
+            prio_map[prioridade or "Normal"]["total"] += qtd
+
+        # Médias dos finalizados direto no banco (tempo de parede, em segundos)
+        soma_resp = cnt_resp = 0.0
+        resp_final = self.db.query(
+            func.count(Chamado.id),
+            func.sum(func.timestampdiff(
+                text("SECOND"), Chamado.data_abertura, Chamado.data_primeira_resposta
+            ))
+        ).filter(
+            filtro,
+            Chamado.status.in_(_STATUS_FINAIS_LIST),
+            Chamado.data_primeira_resposta.isnot(None)
+        ).one()
+        if resp_final[0]:
+            cnt_resp += resp_final[0]
+            soma_resp += float(resp_final[1] or 0) / 3600
+
+        res_final = self.db.query(
+            func.count(Chamado.id),
+            func.sum(func.timestampdiff(
+                text("SECOND"), Chamado.data_abertura, Chamado.data_conclusao
+            ))
+        ).filter(
+            filtro,
+            Chamado.status == "Concluído",
+            Chamado.data_conclusao.isnot(None)
+        ).one()
+        cnt_res = res_final[0] or 0
+        soma_res = float(res_final[1] or 0) / 3600 if res_final[0] else 0.0
+
+        # Linhas apenas dos ativos/pausados, e só as colunas que o cálculo
+        # de SLA realmente lê. Tuplas (Row) em vez de entidades ORM: sem
+        # identity map nem rastreamento de estado por linha, só os valores.
+        # Streaming em lotes de 500 em vez de .all(): memória constante e o
+        # processamento Python sobrepõe o fetch do banco
+        chamados_iter = self.db.query(
+            Chamado.id, Chamado.codigo, Chamado.prioridade, Chamado.status,
+            Chamado.data_abertura, Chamado.data_conclusao,
+            Chamado.cancelado_em, Chamado.data_primeira_resposta
+        ).filter(
+            filtro,
+            Chamado.status.in_(_STATUS_ABERTOS_OU_PAUSADOS_LIST)
+        ).execution_options(stream_results=True).yield_per(500)
+
+        # Listas top-50 materializadas como dict só no append; os contadores
+        # seguem separados para os percentuais
+        em_risco, vencidos, pausados = [], [], []
+        cnt_em_risco = cnt_vencidos = cnt_pausados = 0
+        configs = self._configs()
+
+        def _processar_lote(lote):
+            nonlocal cnt_em_risco, cnt_vencidos, cnt_pausados, soma_resp, cnt_resp
+            pausas_by_id = self._pausas_em_lote([c.id for c in lote])
+            for c in lote:
+                s = self._calcular_sla_result(c, configs, pausas_by_id.get(c.id, []), now)
+                if not s:
+                    continue
+                if s.pausado:
+                    cnt_pausados += 1
+                    if len(pausados) < 50:
+                        pausados.append(s.as_dict())
+                elif s.resolucao_vencida:
+                    cnt_vencidos += 1
+                    if len(vencidos) < 50:
+                        vencidos.append(s.as_dict())
+                elif s.resolucao_em_risco:
+                    cnt_em_risco += 1
+                    if len(em_risco) < 50:
+                        em_risco.append(s.as_dict())
+                if c.data_primeira_resposta and s.resposta_trabalhado_horas > 0:
+                    soma_resp += s.resposta_trabalhado_horas
+                    cnt_resp += 1
+                elif c.data_primeira_resposta and s.resposta_trabalhado_horas <= 0:
+                    # Fallback: primeira resposta fora do horário comercial → usa tempo real
+                    horas_resp = max(
+                        (c.data_primeira_resposta - c.data_abertura).total_seconds() / 3600,
                         0.017
                     )
-                if horas_res > 0:
-                    soma_res += horas_res
-                    cnt_res += 1
+                    soma_resp += horas_resp
+                    cnt_resp += 1
+
+                entrada = prio_map[s.prioridade or "Normal"]
+                if s.pausado:
+                    entrada["pausados"] += 1
+                if s.resolucao_em_risco:
+                    entrada["em_risco"] += 1
+                if s.resolucao_vencida:
+                    entrada["vencidos"] += 1
+
+        lote = []
+        for c in chamados_iter:
+            lote.append(c)
+            if len(lote) >= 500:
+                _processar_lote(lote)
+                lote = []
+        if lote:
+            _processar_lote(lote)
 
-        total = len(processados)
-        em_dia = total - len(em_risco) - len(vencidos)
+        em_dia = total - cnt_em_risco - cnt_vencidos
         pct_cum = round(em_dia / total * 100, 1) if total > 0 else 0
-        pct_risco = round(len(em_risco) / total * 100, 1) if total > 0 else 0
-        pct_venc = round(len(vencidos) / total * 100, 1) if total > 0 else 0
+        pct_risco = round(cnt_em_risco / total * 100, 1) if total > 0 else 0
+        pct_venc = round(cnt_vencidos / total * 100, 1) if total > 0 else 0
 
         med_resp = soma_resp / cnt_resp if cnt_resp > 0 else 0
         med_res = soma_res / cnt_res if cnt_res > 0 else 0
 
-        # Métricas por prioridade
-        prio_map: Dict[str, dict] = {}
-        for s in processados:
-            p = s["prioridade"] or "Normal"
-            if p not in prio_map:
-                prio_map[p] = {"prioridade": p, "total": 0, "em_risco": 0, "vencidos": 0, "pausados": 0}
-            prio_map[p]["total"] += 1
-            if s["pausado"]:
-                prio_map[p]["pausados"] += 1
-            if s["resolucao_em_risco"]:
-                prio_map[p]["em_risco"] += 1
-            if s["resolucao_vencida"]:
-                prio_map[p]["vencidos"] += 1
-
         por_prioridade = [
-            {**v,
+            {"prioridade": p,
+             **v,
              "percentual_em_risco": round(v["em_risco"] / v["total"] * 100, 1) if v["total"] > 0 else 0,
              "percentual_vencidos": round(v["vencidos"] / v["total"] * 100, 1) if v["total"] > 0 else 0}
-            for v in prio_map.values()
+            for p, v in prio_map.items()
         ]
 
-        return {
+        resultado = {
             "total_chamados": total,
-            "chamados_abertos": sum(1 for c in chamados if c.status in STATUS_ATIVOS | STATUS_PAUSADOS),
-            "chamados_em_risco": len(em_risco),
-            "chamados_vencidos": len(vencidos),
-            "chamados_pausados": len(pausados),
+            "chamados_abertos": chamados_abertos_count,
+            "chamados_em_risco": cnt_em_risco,
+            "chamados_vencidos": cnt_vencidos,
+            "chamados_pausados": cnt_pausados,
             "percentual_cumprimento": pct_cum,
             "percentual_em_risco": pct_risco,
             "percentual_vencidos": pct_venc,
@@ -281,11 +674,362 @@ class ServicoMetricasSLA:
             "tempo_medio_resposta_formatado": _formatar(med_resp),
             "tempo_medio_resolucao_formatado": _formatar(med_res),
             "por_prioridade": por_prioridade,
-            "lista_em_risco": em_risco[:50],
-            "lista_vencidos": vencidos[:50],
-            "lista_pausados": pausados[:50],
-            "periodo_inicio": data_inicio.isoformat(),
-            "periodo_fim": data_fim.isoformat(),
-            "sla_data_inicio": SLA_DATA_INICIO.isoformat(),
-            "ultima_atualizacao": datetime.utcnow().isoformat(),
-        }
\ No newline at end of file
+            "lista_em_risco": em_risco,
+            "lista_vencidos": vencidos,
+            "lista_pausados": pausados,
+            # datetimes crus: a serialização ISO fica a cargo do encoder do
+            # FastAPI na borda da resposta (caminho C-acelerado, em lote)
+            "periodo_inicio": data_inicio,
+            "periodo_fim": data_fim,
+            "sla_data_inicio": SLA_DATA_INICIO,
+            "ultima_atualizacao": now,
+        }
+
+        agora_mono = time_mod.monotonic()
+        with self._dashboard_cache_lock:
+            # Higiene na inserção: joga fora o que já venceu e, se ainda
+            # assim estourar o teto, descarta a entrada mais antiga
+            vencidas = [
+                k for k, (expira, _) in self._dashboard_cache.items()
+                if expira <= agora_mono
+            ]
+            for k in vencidas:
+                del self._dashboard_cache[k]
+            if len(self._dashboard_cache) >= self._DASHBOARD_CACHE_MAX:
+                mais_antiga = min(
+                    self._dashboard_cache,
+                    key=lambda k: self._dashboard_cache[k][0],
+                )
+                del self._dashboard_cache[mais_antiga]
+            self._dashboard_cache[cache_key] = (
+                agora_mono + self._DASHBOARD_CACHE_TTL,
+                resultado
+            )
+
+        return dict(resultado)
+
+    def obter_metricas_multi_periodos(
+        self,
+        periodos: List[Tuple[date, date]]
+    ) -> List[Dict]:
+        """
+        Calcula métricas de vários períodos em uma única passada.
+
+        O maior período é superconjunto dos demais, então:
+        - chamados ativos/pausados (sempre incluídos, independentes do
+          período) são carregados e têm o SLA calculado uma única vez;
+        - finalizados são agregados no banco em baldes por dia de abertura
+          e redistribuídos em Python para cada período.
+
+        Substitui N varreduras completas (uma por período) por uma.
+        Retorna um dict de métricas por período, na ordem da entrada.
+        """
+        from ti.models.chamado import Chamado
+        from sqlalchemy import and_, func, text
+
+        now = datetime.utcnow()
+        sla_ini_date = SLA_DATA_INICIO.date()
+
+        # Janelas meio-abertas por dia de abertura: [inicio, fim + 1 dia)
+        janelas = [
+            (max(d_ini, sla_ini_date), d_fim + timedelta(days=1))
+            for d_ini, d_fim in periodos
+        ]
+        min_ini = min(j[0] for j in janelas)
+        max_fim = max(j[1] for j in janelas)
+
+        filtro_finais = and_(
+            Chamado.deletado_em.is_(None),
+            Chamado.status.in_(_STATUS_FINAIS_LIST),
+            Chamado.data_abertura >= datetime.combine(min_ini, time.min),
+            Chamado.data_abertura < datetime.combine(max_fim, time.min),
+        )
+
+        # Finalizados agregados por (prioridade, dia): uma varredura cobre
+        # todos os períodos
+        contagens_finais = self.db.query(
+            Chamado.prioridade,
+            func.date(Chamado.data_abertura),
+            func.count(Chamado.id),
+        ).filter(filtro_finais).group_by(
+            Chamado.prioridade, func.date(Chamado.data_abertura)
+        ).all()
+
+        resp_finais = self.db.query(
+            func.date(Chamado.data_abertura),
+            func.count(Chamado.id),
+            func.sum(func.timestampdiff(
+                text("SECOND"), Chamado.data_abertura, Chamado.data_primeira_resposta
+            )),
+        ).filter(
+            filtro_finais, Chamado.data_primeira_resposta.isnot(None)
+        ).group_by(func.date(Chamado.data_abertura)).all()
+
+        res_finais = self.db.query(
+            func.date(Chamado.data_abertura),
+            func.count(Chamado.id),
+            func.sum(func.timestampdiff(
+                text("SECOND"), Chamado.data_abertura, Chamado.data_conclusao
+            )),
+        ).filter(
+            filtro_finais,
+            Chamado.status == "Concluído",
+            Chamado.data_conclusao.isnot(None)
+        ).group_by(func.date(Chamado.data_abertura)).all()
+
+        # Ativos/pausados: SLA por chamado calculado UMA vez (o resultado
+        # não depende do período filtrado). Tuplas (Row), não entidades ORM
+        chamados_iter = self.db.query(
+            Chamado.id, Chamado.codigo, Chamado.prioridade, Chamado.status,
+            Chamado.data_abertura, Chamado.data_conclusao,
+            Chamado.cancelado_em, Chamado.data_primeira_resposta
+        ).filter(
+            Chamado.data_abertura >= SLA_DATA_INICIO,
+            Chamado.deletado_em.is_(None),
+            Chamado.status.in_(_STATUS_ABERTOS_OU_PAUSADOS_LIST)
+        ).execution_options(stream_results=True).yield_per(500)
+
+        configs = self._configs()
+        ativos_total = cnt_em_risco = cnt_vencidos = cnt_pausados = 0
+        soma_resp_ativos = 0.0
+        cnt_resp_ativos = 0
+        prio_ativos: Dict[str, dict] = defaultdict(
+            lambda: {"total": 0, "em_risco": 0, "vencidos": 0, "pausados": 0}
+        )
+
+        def _processar_lote(lote):
+            nonlocal ativos_total, cnt_em_risco, cnt_vencidos, cnt_pausados
+            nonlocal soma_resp_ativos, cnt_resp_ativos
+            pausas_by_id = self._pausas_em_lote([c.id for c in lote])
+            for c in lote:
+                ativos_total += 1
+                entrada = prio_ativos[c.prioridade or "Normal"]
+                entrada["total"] += 1
+                s = self._calcular_sla_result(c, configs, pausas_by_id.get(c.id, []), now)
+                if not s:
+                    continue
+                # Mesma precedência do dashboard: pausado > vencido > em risco
+                if s.pausado:
+                    cnt_pausados += 1
+                elif s.resolucao_vencida:
+                    cnt_vencidos += 1
+                elif s.resolucao_em_risco:
+                    cnt_em_risco += 1
+                if s.pausado:
+                    entrada["pausados"] += 1
+                if s.resolucao_em_risco:
+                    entrada["em_risco"] += 1
+                if s.resolucao_vencida:
+                    entrada["vencidos"] += 1
+                if c.data_primeira_resposta:
+                    if s.resposta_trabalhado_horas > 0:
+                        soma_resp_ativos += s.resposta_trabalhado_horas
+                    else:
+                        # Primeira resposta fora do horário comercial → tempo real
+                        soma_resp_ativos += max(
+                            (c.data_primeira_resposta - c.data_abertura).total_seconds() / 3600,
+                            0.017
+                        )
+                    cnt_resp_ativos += 1
+
+        lote = []
+        for c in chamados_iter:
+            lote.append(c)
+            if len(lote) >= 500:
+                _processar_lote(lote)
+                lote = []
+        if lote:
+            _processar_lote(lote)
+
+        # Redistribui os baldes diários dos finalizados em cada período
+        resultados = []
+        for (d_ini, d_fim), (ini, fim) in zip(periodos, janelas):
+            total = ativos_total
+            prio_map: Dict[str, dict] = defaultdict(
+                lambda: {"total": 0, "em_risco": 0, "vencidos": 0, "pausados": 0}
+            )
+            for p, v in prio_ativos.items():
+                dest = prio_map[p]
+                for k in v:
+                    dest[k] += v[k]
+            for prioridade, dia, qtd in contagens_finais:
+                if ini <= dia < fim:
+                    total += qtd
+                    prio_map[prioridade or "Normal"]["total"] += qtd
+
+            soma_resp, cnt_resp = soma_resp_ativos, cnt_resp_ativos
+            for dia, qtd, soma_seg in resp_finais:
+                if ini <= dia < fim and qtd:
+                    cnt_resp += qtd
+                    soma_resp += float(soma_seg or 0) / 3600
+            soma_res = 0.0
+            cnt_res = 0
+            for dia, qtd, soma_seg in res_finais:
+                if ini <= dia < fim and qtd:
+                    cnt_res += qtd
+                    soma_res += float(soma_seg or 0) / 3600
+
+            em_dia = total - cnt_em_risco - cnt_vencidos
+            med_resp = soma_resp / cnt_resp if cnt_resp > 0 else 0
+            med_res = soma_res / cnt_res if cnt_res > 0 else 0
+
+            resultados.append({
+                "total_chamados": total,
+                "chamados_abertos": ativos_total,
+                "chamados_em_risco": cnt_em_risco,
+                "chamados_vencidos": cnt_vencidos,
+                "chamados_pausados": cnt_pausados,
+                "percentual_cumprimento": round(em_dia / total * 100, 1) if total > 0 else 0,
+                "percentual_em_risco": round(cnt_em_risco / total * 100, 1) if total > 0 else 0,
+                "percentual_vencidos": round(cnt_vencidos / total * 100, 1) if total > 0 else 0,
+                "tempo_medio_resposta_horas": round(med_resp, 2),
+                "tempo_medio_resolucao_horas": round(med_res, 2),
+                "tempo_medio_resposta_formatado": _formatar(med_resp),
+                "tempo_medio_resolucao_formatado": _formatar(med_res),
+                "por_prioridade": [
+                    {"prioridade": p,
+                     **v,
+                     "percentual_em_risco": round(v["em_risco"] / v["total"] * 100, 1) if v["total"] > 0 else 0,
+                     "percentual_vencidos": round(v["vencidos"] / v["total"] * 100, 1) if v["total"] > 0 else 0}
+                    for p, v in prio_map.items()
+                ],
+                "periodo_inicio": d_ini,
+                "periodo_fim": d_fim,
+                "sla_data_inicio": SLA_DATA_INICIO,
+                "ultima_atualizacao": now,
+            })
+
+        return resultados
+
+    def _top_criticos(self, coluna_flag, limite: int) -> List[Dict]:
+        """
+        TOP-N de chamados ativos por uma flag de InfoSLAChamado, ordenados
+        pelo percentual de resolução. Lê a tabela materializada pelo
+        recálculo periódico em vez de refazer a matemática de SLA por
+        chamado; o índice (flag, percentual) entrega as N primeiras linhas
+        sem ordenar o restante.
+        """
+        from ti.models.chamado import Chamado
+        from modules.sla.models import InfoSLAChamado
+
+        rows = self.db.query(
+            InfoSLAChamado.chamado_id,
+            Chamado.codigo,
+            Chamado.prioridade,
+            Chamado.status,
+            Chamado.status_assumido_por_id,
+            InfoSLAChamado.percentual_resolucao,
+            InfoSLAChamado.tempo_resolucao_limite_horas,
+            InfoSLAChamado.tempo_resolucao_decorrido_horas,
+            InfoSLAChamado.tempo_resolucao_pausado_horas,
+        ).join(
+            Chamado, Chamado.id == InfoSLAChamado.chamado_id
+        ).filter(
+            coluna_flag.is_(True),
+            Chamado.deletado_em.is_(None),
+            Chamado.status.in_(_STATUS_ABERTOS_OU_PAUSADOS_LIST),
+        ).order_by(
+            InfoSLAChamado.percentual_resolucao.desc()
+        ).limit(limite).all()
+
+        return [self._linha_critica(r) for r in rows]
+
+    @staticmethod
+    def _linha_critica(r) -> Dict:
+        """Converte uma linha de chamado crítico no dict compacto dos widgets"""
+        trabalhado = max(
+            0.0,
+            (r.tempo_resolucao_decorrido_horas or 0.0)
+            - (r.tempo_resolucao_pausado_horas or 0.0)
+        )
+        limite_h = r.tempo_resolucao_limite_horas or 0.0
+        return {
+            "id": r.chamado_id,
+            "codigo": r.codigo,
+            "prioridade": r.prioridade,
+            "status": r.status,
+            "responsavel_id": r.status_assumido_por_id,
+            "percentual_resolucao": r.percentual_resolucao or 0.0,
+            "horas_restantes": round(limite_h - trabalhado, 2),
+        }
+
+    def obter_chamados_em_risco(self, limite: int = 50) -> List[Dict]:
+        """TOP chamados ativos com resolução em risco (pré-calculado)."""
+        from modules.sla.models import InfoSLAChamado
+        return self._top_criticos(InfoSLAChamado.resolucao_em_risco, limite)
+
+    def obter_chamados_vencidos(self, limite: int = 50) -> List[Dict]:
+        """TOP chamados ativos com resolução vencida (pré-calculado)."""
+        from modules.sla.models import InfoSLAChamado
+        return self._top_criticos(InfoSLAChamado.resolucao_vencida, limite)
+
+    def obter_dashboard_executivo(self) -> Dict:
+        """
+        Dashboard executivo consolidado (cacheado pelo refresh periódico):
+        métricas da janela de 30 dias mais os top-10 de chamados críticos.
+        """
+        now = datetime.utcnow()
+        metricas = self.obter_metricas_dashboard(now - timedelta(days=30), now)
+        em_risco, vencidos = self.obter_chamados_criticos(limite=10)
+        return {
+            "metricas_gerais": metricas,
+            "chamados_em_risco": em_risco,
+            "chamados_vencidos": vencidos,
+            "alertas": {
+                "total_em_risco": len(em_risco),
+                "total_vencidos": len(vencidos),
+            },
+            "gerado_em": now,
+        }
+
+    def obter_chamados_criticos(self, limite: int = 50) -> Tuple[List[Dict], List[Dict]]:
+        """
+        (em_risco, vencidos) em UMA consulta, para o refresh periódico que
+        precisa das duas listas.
+
+        Particiona por resolucao_vencida com ROW_NUMBER e corta o top-N de
+        cada partição ainda no banco, em vez de fazer duas varreduras quase
+        idênticas. Um chamado com as duas flags entra só na lista de
+        vencidos (a mais severa).
+        """
+        from sqlalchemy import func, or_
+        from ti.models.chamado import Chamado
+        from modules.sla.models import InfoSLAChamado
+
+        posicao = func.row_number().over(
+            partition_by=InfoSLAChamado.resolucao_vencida,
+            order_by=InfoSLAChamado.percentual_resolucao.desc(),
+        ).label("posicao")
+
+        base = self.db.query(
+            InfoSLAChamado.chamado_id,
+            Chamado.codigo,
+            Chamado.prioridade,
+            Chamado.status,
+            Chamado.status_assumido_por_id,
+            InfoSLAChamado.percentual_resolucao,
+            InfoSLAChamado.tempo_resolucao_limite_horas,
+            InfoSLAChamado.tempo_resolucao_decorrido_horas,
+            InfoSLAChamado.tempo_resolucao_pausado_horas,
+            InfoSLAChamado.resolucao_vencida,
+            posicao,
+        ).join(
+            Chamado, Chamado.id == InfoSLAChamado.chamado_id
+        ).filter(
+            or_(
+                InfoSLAChamado.resolucao_vencida.is_(True),
+                InfoSLAChamado.resolucao_em_risco.is_(True),
+            ),
+            Chamado.deletado_em.is_(None),
+            Chamado.status.in_(_STATUS_ABERTOS_OU_PAUSADOS_LIST),
+        ).subquery()
+
+        rows = self.db.query(base).filter(base.c.posicao <= limite).order_by(
+            base.c.percentual_resolucao.desc()
+        ).all()
+
+        em_risco: List[Dict] = []
+        vencidos: List[Dict] = []
+        for r in rows:
+            (vencidos if r.resolucao_vencida else em_risco).append(self._linha_critica(r))
+        return em_risco, vencidos
\ No newline at end of file
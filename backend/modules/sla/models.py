@@ -59,7 +59,7 @@ class HorarioComercial(Base):
     __tablename__ = "sla_horario_comercial"
 
     id = Column(Integer, primary_key=True, index=True)
-    dia_semana = Column(Integer, nullable=False, index=True)
+    dia_semana = Column(Integer, unique=True, nullable=False, index=True)
     hora_inicio = Column(Time, nullable=False)
     hora_fim = Column(Time, nullable=False)
     ativo = Column(Boolean, default=True)
@@ -12,6 +12,10 @@ try:
 except ImportError:
     SLAPausa = None
 
+# Forma exata gravada no banco; a comparação direta é o fast path e o
+# casefold cobre variações de caixa sem alocar string no caso comum
+_STATUS_EM_ANALISE = "Em análise"
+
 
 class SlaRepository:
     """Repositório para operações de SLA"""
@@ -119,7 +123,7 @@ class SlaRepository:
     
     def pausar_automaticamente_se_necessario(self, chamado_id: int, status: str) -> Optional[SLAPausa]:
         """Pausa automaticamente se status é 'Em análise'"""
-        if status.lower() != "em análise":
+        if status != _STATUS_EM_ANALISE and status.casefold() != "em análise":
             return None
         
         # Verifica se já tem pausa ativa
@@ -137,7 +141,7 @@ class SlaRepository:
     
     def retomar_pausas_se_necessario(self, chamado_id: int, status: str) -> List[SLAPausa]:
         """Retoma pausas se status mudou de 'Em análise'"""
-        if status.lower() == "em análise":
+        if status == _STATUS_EM_ANALISE or status.casefold() == "em análise":
             return []
         
         pausas_ativas = self.obter_pausas_ativas_chamado(chamado_id)
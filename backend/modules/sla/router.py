@@ -1,20 +1,30 @@
 """Endpoints da API de SLA"""
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import hashlib
+import logging
 from datetime import datetime
 from typing import Optional
-import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
 
 from core.db import get_db
 from .service import SlaService
 
+
+def gerar_etag_resumo(ultima_atualizacao) -> str:
+    """ETag fraco derivado do instante de cálculo do dashboard"""
+    digest = hashlib.blake2b(
+        str(ultima_atualizacao).encode(), digest_size=8
+    ).hexdigest()
+    return f'W/"{digest}"'
+
 logger = logging.getLogger("sla.router")
 
 router = APIRouter(prefix="/sla", tags=["SLA"])
 
 
 @router.get("/dashboard")
-async def obter_dashboard(
+def obter_dashboard(
     data_inicio: Optional[datetime] = Query(None),
     data_fim: Optional[datetime] = Query(None),
     db: Session = Depends(get_db)
@@ -37,10 +47,21 @@ async def obter_dashboard(
 
 
 @router.get("/dashboard/resumo")
-async def obter_resumo(db: Session = Depends(get_db)):
+def obter_resumo(request: Request, response: Response, db: Session = Depends(get_db)):
     """Resumo rapido para cards do painel admin"""
     try:
+        # Servido pelo cache TTL do dashboard (ver ServicoMetricasSLA):
+        # na maioria dos polls isto é só a projeção de um dict já pronto
         data = SlaService(db).obter_dashboard()
+
+        # O painel faz polling frequente e o payload só muda quando o
+        # dashboard é recalculado: 304 evita serialização e tráfego
+        etag = gerar_etag_resumo(data.get("ultima_atualizacao"))
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "max-age=10"
+
         return {
             "percentual_cumprimento": data.get("percentual_cumprimento", 0),
             "percentual_em_risco": data.get("percentual_em_risco", 0),
@@ -61,7 +82,7 @@ async def obter_resumo(db: Session = Depends(get_db)):
 
 
 @router.get("/chamado/{chamado_id}")
-async def obter_sla_chamado(chamado_id: int, db: Session = Depends(get_db)):
+def obter_sla_chamado(chamado_id: int, db: Session = Depends(get_db)):
     """SLA de um chamado especifico"""
     try:
         result = SlaService(db).calcular_sla_chamado(chamado_id)
@@ -79,7 +100,7 @@ async def obter_sla_chamado(chamado_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/chamado/{chamado_id}/pausar")
-async def pausar_sla(
+def pausar_sla(
     chamado_id: int,
     status: str = Query(...),
     db: Session = Depends(get_db)
@@ -2,11 +2,19 @@
 API FastAPI para o módulo SLA
 Endpoints para gerenciar configurações, feriados, pausas e cálculos de SLA
 """
-from datetime import date
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import threading
+import uuid
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional
+
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from core.db import get_db, SessionLocal
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, case
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 
 from .schemas import (
     ConfiguracaoSLACreate, ConfiguracaoSLAUpdate, ConfiguracaoSLAResponse,
@@ -21,21 +29,14 @@ from .models import (
     ConfiguracaoSLA, HorarioComercial, Feriado, PausaSLA,
     InfoSLAChamado, LogCalculoSLA, Chamado, StatusChamado
 )
+from .cache import SlaCache
 from .calculator import CalculadorSLA
 from .holidays import gerar_todos_feriados
+from .metrics import ServicoMetricasSLA
 
 router = APIRouter(prefix="/sla", tags=["SLA"])
 
 
-# Dependência para obter sessão do banco
-def get_db() -> Session:
-    """
-    Dependência para obter sessão do banco de dados.
-    Deve ser implementada no projeto principal.
-    """
-    raise NotImplementedError("Implemente get_db() no seu projeto")
-
-
 # ==================== Configurações de SLA ====================
 
 @router.post("/config", response_model=ConfiguracaoSLAResponse, status_code=status.HTTP_201_CREATED)
@@ -103,22 +104,32 @@ def atualizar_configuracao(
     db: Session = Depends(get_db)
 ):
     """Atualiza configuração de SLA"""
+    valores = config.dict(exclude_unset=True)
+
+    # UPDATE direto com checagem de rowcount: dispensa o SELECT prévio
+    if valores:
+        atualizados = db.query(ConfiguracaoSLA).filter(
+            ConfiguracaoSLA.id == config_id
+        ).update(valores, synchronize_session=False)
+
+        if not atualizados:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Configuração não encontrada"
+            )
+
+        db.commit()
+
     db_config = db.query(ConfiguracaoSLA).filter(
         ConfiguracaoSLA.id == config_id
     ).first()
-    
+
     if not db_config:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Configuração não encontrada"
         )
-    
-    for field, value in config.dict(exclude_unset=True).items():
-        setattr(db_config, field, value)
-    
-    db.commit()
-    db.refresh(db_config)
-    
+
     return db_config
 
 
@@ -128,17 +139,17 @@ def deletar_configuracao(
     db: Session = Depends(get_db)
 ):
     """Deleta configuração de SLA"""
-    db_config = db.query(ConfiguracaoSLA).filter(
+    # DELETE direto: uma ida ao banco em vez de SELECT + DELETE
+    removidos = db.query(ConfiguracaoSLA).filter(
         ConfiguracaoSLA.id == config_id
-    ).first()
-    
-    if not db_config:
+    ).delete(synchronize_session=False)
+
+    if not removidos:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Configuração não encontrada"
         )
-    
-    db.delete(db_config)
+
     db.commit()
 
 
@@ -165,7 +176,9 @@ def criar_horario(
     db.add(db_horario)
     db.commit()
     db.refresh(db_horario)
-    
+
+    SlaCache().invalidate_horarios()
+
     return db_horario
 
 
@@ -190,22 +203,32 @@ def atualizar_horario(
     db: Session = Depends(get_db)
 ):
     """Atualiza horário comercial"""
+    valores = horario.dict(exclude_unset=True)
+
+    if valores:
+        atualizados = db.query(HorarioComercial).filter(
+            HorarioComercial.id == horario_id
+        ).update(valores, synchronize_session=False)
+
+        if not atualizados:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Horário não encontrado"
+            )
+
+        db.commit()
+        SlaCache().invalidate_horarios()
+
     db_horario = db.query(HorarioComercial).filter(
         HorarioComercial.id == horario_id
     ).first()
-    
+
     if not db_horario:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Horário não encontrado"
         )
-    
-    for field, value in horario.dict(exclude_unset=True).items():
-        setattr(db_horario, field, value)
-    
-    db.commit()
-    db.refresh(db_horario)
-    
+
     return db_horario
 
 
@@ -215,18 +238,18 @@ def deletar_horario(
     db: Session = Depends(get_db)
 ):
     """Deleta horário comercial"""
-    db_horario = db.query(HorarioComercial).filter(
+    removidos = db.query(HorarioComercial).filter(
         HorarioComercial.id == horario_id
-    ).first()
-    
-    if not db_horario:
+    ).delete(synchronize_session=False)
+
+    if not removidos:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Horário não encontrado"
         )
-    
-    db.delete(db_horario)
+
     db.commit()
+    SlaCache().invalidate_horarios()
 
 
 # ==================== Feriados ====================
@@ -252,10 +275,10 @@ def criar_feriado(
     db.add(db_feriado)
     db.commit()
     db.refresh(db_feriado)
-    
-    # Invalida cache
-    # Você pode chamar calculator.invalidar_cache() se tiver uma instância global
-    
+
+    # Invalida o cache compartilhado consultado pelo calculador
+    SlaCache().invalidate_feriados()
+
     return db_feriado
 
 
@@ -273,11 +296,19 @@ def listar_feriados(
         query = query.filter(Feriado.ativo == True)
     
     if ano:
-        query = query.filter(func.extract('year', Feriado.data) == ano)
-    
-    if mes:
+        # Intervalo explícito em vez de extract(): o predicado continua
+        # sargable e o índice em `data` vira um range scan
+        if mes:
+            inicio = date(ano, mes, 1)
+            fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+        else:
+            inicio = date(ano, 1, 1)
+            fim = date(ano + 1, 1, 1)
+        query = query.filter(Feriado.data >= inicio, Feriado.data < fim)
+    elif mes:
+        # Mês sem ano não forma intervalo contíguo; caso raro, mantém extract
         query = query.filter(func.extract('month', Feriado.data) == mes)
-    
+
     return query.order_by(Feriado.data).all()
 
 
@@ -288,22 +319,32 @@ def atualizar_feriado(
     db: Session = Depends(get_db)
 ):
     """Atualiza feriado"""
+    valores = feriado.dict(exclude_unset=True)
+
+    if valores:
+        atualizados = db.query(Feriado).filter(
+            Feriado.id == feriado_id
+        ).update(valores, synchronize_session=False)
+
+        if not atualizados:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Feriado não encontrado"
+            )
+
+        db.commit()
+        SlaCache().invalidate_feriados()
+
     db_feriado = db.query(Feriado).filter(
         Feriado.id == feriado_id
     ).first()
-    
+
     if not db_feriado:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Feriado não encontrado"
         )
-    
-    for field, value in feriado.dict(exclude_unset=True).items():
-        setattr(db_feriado, field, value)
-    
-    db.commit()
-    db.refresh(db_feriado)
-    
+
     return db_feriado
 
 
@@ -313,18 +354,18 @@ def deletar_feriado(
     db: Session = Depends(get_db)
 ):
     """Deleta feriado"""
-    db_feriado = db.query(Feriado).filter(
+    removidos = db.query(Feriado).filter(
         Feriado.id == feriado_id
-    ).first()
-    
-    if not db_feriado:
+    ).delete(synchronize_session=False)
+
+    if not removidos:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Feriado não encontrado"
         )
-    
-    db.delete(db_feriado)
+
     db.commit()
+    SlaCache().invalidate_feriados()
 
 
 @router.post("/feriado/gerar/{ano}", response_model=FeriadosLoteResponse)
@@ -341,44 +382,56 @@ def gerar_feriados_automaticamente(
     - Feriados móveis baseados na Páscoa (Carnaval, Sexta Santa, Corpus Christi, etc)
     """
     feriados_gerados = gerar_todos_feriados(ano)
-    inseridos = 0
+    datas = [date.fromisoformat(f["data"]) for f in feriados_gerados]
+
+    # Datas já cadastradas em um único SELECT (em vez de um por feriado)
+    existentes = {
+        d for (d,) in db.query(Feriado.data).filter(Feriado.data.in_(datas)).all()
+    }
+
+    valores = []
     duplicados = 0
-    feriados_response = []
-    
-    for f in feriados_gerados:
-        data_obj = date.fromisoformat(f["data"])
-        
-        # Verifica se já existe
-        existe = db.query(Feriado).filter(
-            Feriado.data == data_obj
-        ).first()
-        
-        if existe:
-            if sobrescrever:
-                db.delete(existe)
-                db.flush()
-            else:
-                duplicados += 1
-                continue
-        
-        # Cria novo feriado
-        novo_feriado = Feriado(
-            data=data_obj,
-            nome=f["nome"],
-            descricao=f.get("descricao", ""),
-            tipo=f.get("tipo", "nacional"),
-            recorrente=f.get("recorrente", False),
-            ativo=True
-        )
-        
-        db.add(novo_feriado)
-        db.flush()
-        db.refresh(novo_feriado)
-        
-        feriados_response.append(FeriadoResponse.from_orm(novo_feriado))
-        inseridos += 1
-    
+    for f, data_obj in zip(feriados_gerados, datas):
+        if data_obj in existentes and not sobrescrever:
+            duplicados += 1
+            continue
+        valores.append({
+            "data": data_obj,
+            "nome": f["nome"],
+            "descricao": f.get("descricao", ""),
+            "tipo": f.get("tipo", "nacional"),
+            "recorrente": f.get("recorrente", False),
+            "ativo": True
+        })
+
+    inseridos = len(valores)
+
+    if valores:
+        # Upsert em lote apoiado na chave única de `data`: uma ida ao banco
+        # substitui o SELECT + DELETE + INSERT + flush por feriado
+        stmt = mysql_insert(Feriado.__table__).values(valores)
+        if sobrescrever:
+            stmt = stmt.on_duplicate_key_update(
+                {col: stmt.inserted[col] for col in valores[0] if col != "data"}
+            )
+        else:
+            # No-op em caso de corrida concorrente (equivalente do DO NOTHING)
+            stmt = stmt.on_duplicate_key_update(id=Feriado.__table__.c.id)
+        db.execute(stmt)
+
     db.commit()
+
+    if valores:
+        SlaCache().invalidate_feriados()
+
+    feriados_response = []
+    if valores:
+        feriados_response = [
+            FeriadoResponse.from_orm(f)
+            for f in db.query(Feriado).filter(
+                Feriado.data.in_([v["data"] for v in valores])
+            ).order_by(Feriado.data).all()
+        ]
     
     return FeriadosLoteResponse(
         ano=ano,
@@ -411,7 +464,7 @@ def criar_pausa(
     # Cria pausa
     db_pausa = PausaSLA(
         chamado_id=pausa.chamado_id,
-        inicio=__import__('datetime').datetime.utcnow(),
+        inicio=datetime.utcnow(),
         motivo=pausa.motivo,
         tipo="manual"
     )
@@ -419,7 +472,10 @@ def criar_pausa(
     db.add(db_pausa)
     db.commit()
     db.refresh(db_pausa)
-    
+
+    # Pausa afeta as métricas do dashboard: invalida o cache compartilhado
+    ServicoMetricasSLA.invalidar_dashboard_cache()
+
     return db_pausa
 
 
@@ -447,14 +503,15 @@ def retomar_pausa(
         )
     
     # Finaliza pausa
-    from datetime import datetime
     pausa.fim = datetime.utcnow()
     duracao = (pausa.fim - pausa.inicio).total_seconds() / 3600
     pausa.duracao_horas = duracao
-    
+
     db.commit()
     db.refresh(pausa)
-    
+
+    ServicoMetricasSLA.invalidar_dashboard_cache()
+
     return pausa
 
 
@@ -482,17 +539,16 @@ def deletar_pausa(
     db: Session = Depends(get_db)
 ):
     """Deleta pausa"""
-    pausa = db.query(PausaSLA).filter(
+    removidos = db.query(PausaSLA).filter(
         PausaSLA.id == pausa_id
-    ).first()
-    
-    if not pausa:
+    ).delete(synchronize_session=False)
+
+    if not removidos:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pausa não encontrada"
         )
-    
-    db.delete(pausa)
+
     db.commit()
 
 
@@ -514,10 +570,21 @@ def obter_sla_chamado(
             detail="Chamado não encontrado"
         )
     
+    # Agrega as pausas no banco: três escalares trafegam em vez de todas
+    # as linhas, e o mesmo SUM alimenta o cálculo de SLA e o relatório
+    total_pausas, tempo_pausado, pausas_abertas = db.query(
+        func.count(PausaSLA.id),
+        func.coalesce(func.sum(PausaSLA.duracao_horas), 0.0),
+        func.sum(case((PausaSLA.fim.is_(None), 1), else_=0))
+    ).filter(PausaSLA.chamado_id == chamado_id).one()
+
+    tempo_pausado = float(tempo_pausado or 0.0)
+    pausa_ativa = bool(pausas_abertas)
+
     # Calcula SLA
     calculator = CalculadorSLA(db)
-    resultado = calculator.calcular_sla(chamado)
-    
+    resultado = calculator.calcular_sla(chamado, tempo_pausado=tempo_pausado)
+
     # Determina status
     resposta_status = "em_dia"
     if resultado["resposta_vencida"]:
@@ -531,15 +598,6 @@ def obter_sla_chamado(
     elif resultado["resolucao_em_risco"]:
         resolucao_status = "em_risco"
     
-    # Obtém info de pausas
-    pausas = db.query(PausaSLA).filter(
-        PausaSLA.chamado_id == chamado_id
-    ).all()
-    
-    total_pausas = len(pausas)
-    tempo_pausado = sum(p.duracao_horas for p in pausas if p.duracao_horas)
-    pausa_ativa = any(p.fim is None for p in pausas)
-    
     return RelatorioChamadoSLA(
         chamado_id=chamado.id,
         codigo=chamado.codigo,
@@ -566,43 +624,125 @@ def obter_sla_chamado(
         total_pausas=total_pausas,
         tempo_total_pausado_horas=tempo_pausado,
         
-        ultima_atualizacao=__import__('datetime').datetime.utcnow()
+        ultima_atualizacao=datetime.utcnow()
     )
 
 
-@router.post("/recalcular")
+# Registro em memória dos jobs de recálculo (limitado para não crescer
+# indefinidamente; em deploy multi-worker cada worker enxerga os próprios jobs)
+_recalc_jobs: Dict[str, Dict] = {}
+_recalc_jobs_lock = threading.Lock()
+_RECALC_JOBS_MAX = 50
+
+
+def _executar_recalculo(job_id: str) -> None:
+    """Roda o recálculo em lote fora do ciclo da requisição"""
+    from core.db import SessionLocal
+
+    db = SessionLocal()
+    try:
+        stats = CalculadorSLA(db).recalcular_todos()
+
+        # O recálculo reescreve InfoSLAChamado em massa; dashboards em cache
+        # ficariam defasados até o TTL expirar
+        ServicoMetricasSLA.invalidar_dashboard_cache()
+
+        with _recalc_jobs_lock:
+            _recalc_jobs[job_id].update(
+                status="concluido",
+                stats=stats,
+                finalizado_em=datetime.utcnow()
+            )
+    except Exception as e:
+        with _recalc_jobs_lock:
+            _recalc_jobs[job_id].update(
+                status="erro",
+                erro=str(e),
+                finalizado_em=datetime.utcnow()
+            )
+    finally:
+        db.close()
+
+
+@router.post("/recalcular", status_code=status.HTTP_202_ACCEPTED)
 def recalcular_sla(
     request: RecalcularSLARequest,
+    background: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
-    """Recalcula SLA para todos os chamados"""
-    calculator = CalculadorSLA(db)
-    stats = calculator.recalcular_todos()
-    
+    """
+    Agenda o recálculo de SLA para todos os chamados
+
+    A recomputação completa pode levar vários segundos e não bloqueia mais
+    o worker: retorna 202 com um job_id que o cliente consulta em
+    GET /sla/recalcular/{job_id}.
+    """
+    job_id = uuid.uuid4().hex
+
+    with _recalc_jobs_lock:
+        # Expira os jobs mais antigos para manter o registro limitado
+        while len(_recalc_jobs) >= _RECALC_JOBS_MAX:
+            _recalc_jobs.pop(next(iter(_recalc_jobs)))
+        _recalc_jobs[job_id] = {
+            "status": "executando",
+            "iniciado_em": datetime.utcnow()
+        }
+
+    background.add_task(_executar_recalculo, job_id)
+
     return {
         "sucesso": True,
-        "mensagem": "SLA recalculado com sucesso",
-        "total_processados": stats["total_processados"],
-        "em_risco": stats["em_risco"],
-        "vencidos": stats["vencidos"],
-        "pausados": stats["pausados"],
-        "tempo_ms": stats["tempo_ms"]
+        "mensagem": "Recálculo de SLA agendado",
+        "job_id": job_id
     }
 
 
+@router.get("/recalcular/{job_id}")
+def obter_status_recalculo(job_id: str):
+    """Consulta o andamento/resultado de um recálculo agendado"""
+    with _recalc_jobs_lock:
+        job = _recalc_jobs.get(job_id)
+
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de recálculo não encontrado"
+        )
+
+    return {"job_id": job_id, **job}
+
+
 # ==================== Logs ====================
 
-@router.get("/logs", response_model=List[LogCalculoSLAResponse])
-def listar_logs(
-    limit: int = Query(50, le=500),
-    db: Session = Depends(get_db)
-):
-    """Lista logs de cálculos de SLA"""
-    logs = db.query(LogCalculoSLA).order_by(
-        LogCalculoSLA.data_execucao.desc()
-    ).limit(limit).all()
-    
-    return logs
+@router.get("/logs")
+def listar_logs(limit: int = Query(50, le=500)):
+    """
+    Lista logs de cálculos de SLA (resposta em streaming)
+
+    Os registros são serializados em blocos conforme chegam do banco
+    (yield_per), mantendo a memória em O(bloco) em vez de O(limit) e
+    sobrepondo a leitura do banco com a escrita na rede.
+    """
+    def _stream() -> Iterator[bytes]:
+        # Sessão própria do gerador: a sessão de Depends(get_db) é
+        # fechada no teardown da rota, antes do StreamingResponse iterar
+        # o corpo — capturá-la aqui deixaria uma conexão presa no pool
+        db = SessionLocal()
+        try:
+            yield b"["
+            primeiro = True
+            logs = db.query(LogCalculoSLA).order_by(
+                LogCalculoSLA.data_execucao.desc()
+            ).limit(limit).yield_per(100)
+            for log in logs:
+                chunk = orjson.dumps(LogCalculoSLAResponse.from_orm(log).dict())
+                yield chunk if primeiro else b"," + chunk
+                primeiro = False
+            yield b"]"
+        finally:
+            db.close()
+
+    return StreamingResponse(_stream(), media_type="application/json")
 
 
 # ==================== Health Check ====================
@@ -614,5 +754,5 @@ def health_check():
         "status": "ok",
         "versao": "2.0",
         "modulo": "sla",
-        "timestamp": __import__('datetime').datetime.utcnow()
+        "timestamp": datetime.utcnow()
     }
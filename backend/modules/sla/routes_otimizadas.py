@@ -3,9 +3,11 @@ Endpoints otimizados para SLA
 Retornam dados do cache para máxima performance
 Atualizados automaticamente a cada 15 minutos
 """
+import threading
+from collections import defaultdict
 from datetime import date, timedelta
-from typing import Optional
-from fastapi import APIRouter, Query, HTTPException, status, Depends
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Query, HTTPException, Response, status, Depends
 from sqlalchemy.orm import Session
 
 from .cache_service import get_cache_manager
@@ -16,50 +18,87 @@ from .schemas import MetricasSLA
 
 router_otimizado = APIRouter(prefix="/sla/cache", tags=["SLA - Cache Otimizado"])
 
+# Single-flight por chamado para o cache individual: evita que M requests
+# simultâneas ao mesmo ticket recalculem o SLA M vezes no miss. Locks são
+# pequenos e o universo de ids é limitado, então não há expiração.
+_locks_sla_chamado: defaultdict = defaultdict(threading.Lock)
+
 
 def get_db() -> Session:
     """Dependência para obter sessão - implementar no seu projeto"""
     raise NotImplementedError("Implemente get_db()")
 
 
+def _agendar_refresh(background: BackgroundTasks):
+    """
+    Reaquece o cache em segundo plano (stale-while-revalidate).
+
+    O single-flight lock do scheduler garante que disparos simultâneos
+    não dupliquem o recálculo.
+    """
+    from .scheduler import get_scheduler
+    from core.db import SessionLocal
+    background.add_task(get_scheduler()._atualizar_sla, SessionLocal)
+
+
+def _projetar_campos(chamados: List[dict], fields: Optional[str]) -> List[dict]:
+    """
+    Restringe cada chamado aos campos pedidos em ?fields=a,b,c
+
+    O cache já guarda a projeção mínima (ChamadoRiscoResumo); isto permite
+    ao frontend enxugar ainda mais o payload. Campos inexistentes são
+    ignorados silenciosamente.
+    """
+    if not fields:
+        return chamados
+    pedidos = {f.strip() for f in fields.split(",") if f.strip()}
+    if not pedidos:
+        return chamados
+    return [{k: v for k, v in c.items() if k in pedidos} for c in chamados]
+
+
 # ==================== Métricas Gerais (Rápido) ====================
 
 @router_otimizado.get("/metricas")
-def obter_metricas_cache(
+async def obter_metricas_cache(
+    background: BackgroundTasks,
     periodo_dias: int = Query(30, ge=7, le=90, description="Período em dias (7, 30, 60, 90)"),
 ):
     """
     Obtém métricas gerais de SLA do cache (MUITO RÁPIDO!)
-    
+
     Atualizado a cada 15 minutos automaticamente
-    
+    Se o cache venceu, serve o valor stale e reaquece em background
+
     Query params:
     - periodo_dias: 7, 30, 60 ou 90 dias
     """
     cache = get_cache_manager()
-    
-    data_fim = date.today()
-    data_inicio = data_fim - timedelta(days=periodo_dias)
-    
-    # Tenta obter do cache
-    metricas = cache.get_metricas_gerais(str(data_inicio), str(data_fim))
-    
-    if metricas is None:
-        # Se não tem cache, retorna erro instruindo a usar endpoint que calcula
+
+    # Chave por período canônico em dias: a janela concreta de datas vem
+    # dentro das métricas (periodo_inicio/periodo_fim)
+    entrada = cache.get_metricas_gerais(periodo_dias, com_estado=True)
+
+    if entrada is None:
+        # Nem stale existe (processo recém-subiu): 503 até o primeiro refresh
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Cache não disponível. Aguarde a próxima atualização automática (máx 15 min)"
         )
-    
+
+    metricas, fresco = entrada
+    if not fresco:
+        _agendar_refresh(background)
+
     return {
         "periodo": {
-            "inicio": str(data_inicio),
-            "fim": str(data_fim),
+            "inicio": metricas.get("periodo_inicio"),
+            "fim": metricas.get("periodo_fim"),
             "dias": periodo_dias
         },
         "metricas": metricas,
         "cache": {
-            "fonte": "cache",
+            "fonte": "cache" if fresco else "stale",
             "atualizado_em": metricas.get("cached_at", "desconhecido"),
             "tempo_resposta_ms": "<1ms"
         }
@@ -69,134 +108,163 @@ def obter_metricas_cache(
 # ==================== Métricas por Prioridade (Rápido) ====================
 
 @router_otimizado.get("/metricas/por-prioridade")
-def obter_metricas_prioridade_cache(
+async def obter_metricas_prioridade_cache(
+    background: BackgroundTasks,
     periodo_dias: int = Query(30, ge=7, le=90),
 ):
     """
     Obtém métricas agrupadas por prioridade do cache
-    
+
     Retorna dados em cache (ULTRA RÁPIDO!)
+    Se o cache venceu, serve o valor stale e reaquece em background
     """
     cache = get_cache_manager()
-    
-    data_fim = date.today()
-    data_inicio = data_fim - timedelta(days=periodo_dias)
-    
-    metricas = cache.get_metricas_por_prioridade(str(data_inicio), str(data_fim))
-    
-    if metricas is None:
+
+    entrada = cache.get_metricas_por_prioridade(periodo_dias, com_estado=True)
+
+    if entrada is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Cache não disponível"
         )
-    
+
+    metricas, fresco = entrada
+    if not fresco:
+        _agendar_refresh(background)
+
     return {
         "periodo_dias": periodo_dias,
         "por_prioridade": metricas,
-        "total_prioridades": len(metricas)
+        "total_prioridades": len(metricas),
+        "fonte": "cache" if fresco else "stale"
     }
 
 
 # ==================== Chamados em Risco (Rápido) ====================
 
 @router_otimizado.get("/chamados/em-risco")
-def obter_chamados_em_risco_cache():
+async def obter_chamados_em_risco_cache(
+    background: BackgroundTasks,
+    fields: Optional[str] = Query(None, description="Campos desejados, separados por vírgula (ex: id,codigo)"),
+):
     """
     Obtém TOP 50 chamados em risco do cache
-    
+
     MUITO RÁPIDO: retorna dados pré-calculados
     Atualizado a cada 15 minutos
+    Se o cache venceu, serve o valor stale e reaquece em background
     """
     cache = get_cache_manager()
-    
-    chamados = cache.get_chamados_em_risco()
-    
-    if chamados is None:
+
+    entrada = cache.get_chamados_em_risco(com_estado=True)
+
+    if entrada is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Cache não disponível"
         )
-    
+
+    chamados, fresco = entrada
+    if not fresco:
+        _agendar_refresh(background)
+
     return {
         "total": len(chamados),
-        "chamados": chamados,
+        "chamados": _projetar_campos(chamados, fields),
         "alerta": "⚠️ " if len(chamados) > 0 else "✅ ",
-        "mensagem": f"{len(chamados)} chamados precisam de atenção imediata"
+        "mensagem": f"{len(chamados)} chamados precisam de atenção imediata",
+        "fonte": "cache" if fresco else "stale"
     }
 
 
 # ==================== Chamados Vencidos (Rápido) ====================
 
 @router_otimizado.get("/chamados/vencidos")
-def obter_chamados_vencidos_cache():
+async def obter_chamados_vencidos_cache(
+    background: BackgroundTasks,
+    fields: Optional[str] = Query(None, description="Campos desejados, separados por vírgula (ex: id,codigo)"),
+):
     """
     Obtém TOP 50 chamados com SLA vencido do cache
-    
+
     CRÍTICO: estes chamados já passaram do prazo
     Retorna dados em cache (instantâneo)
+    Se o cache venceu, serve o valor stale e reaquece em background
     """
     cache = get_cache_manager()
-    
-    chamados = cache.get_chamados_vencidos()
-    
-    if chamados is None:
+
+    entrada = cache.get_chamados_vencidos(com_estado=True)
+
+    if entrada is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Cache não disponível"
         )
-    
+
+    chamados, fresco = entrada
+    if not fresco:
+        _agendar_refresh(background)
+
     return {
         "total": len(chamados),
-        "chamados": chamados,
+        "chamados": _projetar_campos(chamados, fields),
         "alerta": "🔴" if len(chamados) > 0 else "✅",
-        "severidade": "CRÍTICA" if len(chamados) > 0 else "OK"
+        "severidade": "CRÍTICA" if len(chamados) > 0 else "OK",
+        "fonte": "cache" if fresco else "stale"
     }
 
 
 # ==================== Dashboard Executivo (Rápido) ====================
 
 @router_otimizado.get("/dashboard")
-def obter_dashboard_cache():
+async def obter_dashboard_cache(background: BackgroundTasks):
     """
     Obtém dashboard executivo completo do cache
-    
+
     Inclui:
     - Métricas gerais
     - Métricas por prioridade
     - Chamados em risco
     - Chamados vencidos
     - Observações e alertas
-    
+
     Tempo de resposta: < 1ms (dados em cache)
+    Se o cache venceu, serve o valor stale e reaquece em background
     """
+    import json as _json
+
     cache = get_cache_manager()
-    
-    data_inicio = str(date.today() - timedelta(days=30))
-    data_fim = str(date.today())
-    
-    dashboard = cache.get_dashboard(data_inicio, data_fim)
-    
-    if dashboard is None:
+
+    # Bytes serializados na escrita do cache: nenhum encode por request
+    entrada = cache.get_dashboard_json(30, com_estado=True)
+
+    if entrada is None:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Dashboard não disponível em cache"
         )
-    
-    # Adiciona informações de cache
-    dashboard["cache_info"] = {
-        "fonte": "cache",
-        "atualizado_em": dashboard.get("cached_at", "desconhecido"),
+
+    corpo, fresco = entrada
+    if not fresco:
+        _agendar_refresh(background)
+
+    # Emenda o cache_info no JSON pronto (sem desserializar o payload nem
+    # mutar o dict cacheado, que é compartilhado entre requests)
+    cache_info = _json.dumps({
+        "fonte": "cache" if fresco else "stale",
         "proxima_atualizacao": "automática a cada 15 minutos",
         "tempo_resposta_ms": "<1"
-    }
-    
-    return dashboard
+    })
+    if len(corpo) > 2:
+        corpo = f'{corpo[:-1]},"cache_info":{cache_info}}}'
+
+    return Response(content=corpo, media_type="application/json")
 
 
 # ==================== Cache Status ====================
 
 @router_otimizado.get("/status")
-def obter_status_cache():
+async def obter_status_cache():
     """
     Obtém status do cache e estatísticas
     
@@ -229,15 +297,24 @@ def atualizar_sla_manualmente(db: Session = Depends(get_db)):
     """
     from .scheduler import get_scheduler
     import logging
-    
+
     logger = logging.getLogger("sla.api")
-    
+
+    # Single-flight: compartilha o lock do scheduler para que cliques
+    # simultâneos (ou clique + tick automático) não dupliquem o recálculo
+    refresh_lock = get_scheduler().refresh_lock
+    if not refresh_lock.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Atualização de SLA já em andamento. Aguarde a conclusão."
+        )
+
     try:
         logger.info("🔄 Atualização manual solicitada via API")
-        
+
         # Obtém factory de sessão (você precisa fornecer isso)
         # Por enquanto usa a sessão fornecida
-        
+
         # Atualiza tudo
         cache = get_cache_manager()
         servico = ServicoMetricasSLA(db)
@@ -245,38 +322,37 @@ def atualizar_sla_manualmente(db: Session = Depends(get_db)):
         
         # Recalcula SLAs
         stats = calculator.recalcular_todos()
-        
-        # Atualiza métricas
+
+        # "Hoje" resolvido UMA vez por refresh: todas as janelas saem da
+        # mesma data, mesmo se o refresh cruzar a meia-noite. As chaves de
+        # cache usam só o período em dias (7/30/60/90).
+        hoje = date.today()
+        hoje_s = hoje.isoformat()
+        dias_periodos = (7, 30, 60, 90)
         periodos = [
-            (date.today() - timedelta(days=7), date.today()),
-            (date.today() - timedelta(days=30), date.today()),
-            (date.today() - timedelta(days=60), date.today()),
-            (date.today() - timedelta(days=90), date.today()),
+            (hoje - timedelta(days=dias), hoje)
+            for dias in dias_periodos
         ]
-        
-        for data_inicio, data_fim in periodos:
-            metricas = servico.obter_metricas_gerais(data_inicio, data_fim)
-            cache.set_metricas_gerais(str(data_inicio), str(data_fim), metricas)
-        
-        # Atualiza alertas
-        em_risco = servico.obter_chamados_em_risco()
-        cache.set_chamados_em_risco(em_risco)
-        
-        vencidos = servico.obter_chamados_vencidos()
-        cache.set_chamados_vencidos(vencidos)
-        
-        # Atualiza dashboard
+
+        # Atualiza métricas: os 4 períodos saem de uma única passada
+        metricas_por_periodo = servico.obter_metricas_multi_periodos(periodos)
+
+        # Alertas (uma consulta para as duas listas) e dashboard
+        em_risco, vencidos = servico.obter_chamados_criticos()
         dashboard = servico.obter_dashboard_executivo()
-        cache.set_dashboard(
-            str(date.today() - timedelta(days=30)),
-            str(date.today()),
-            dashboard
-        )
-        
+
+        # Escritas agrupadas em um único envio ao backend
+        with cache.batch() as lote:
+            for dias, metricas in zip(dias_periodos, metricas_por_periodo):
+                lote.set_metricas_gerais(dias, metricas)
+            lote.set_chamados_em_risco(em_risco)
+            lote.set_chamados_vencidos(vencidos)
+            lote.set_dashboard(30, dashboard)
+
         return {
             "sucesso": True,
             "mensagem": "✅ SLA atualizado com sucesso",
-            "timestamp": date.today().isoformat(),
+            "timestamp": hoje_s,
             "dados_atualizados": {
                 "chamados_processados": stats["total_processados"],
                 "em_risco": stats["em_risco"],
@@ -291,6 +367,8 @@ def atualizar_sla_manualmente(db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao atualizar: {str(e)}"
         )
+    finally:
+        refresh_lock.release()
 
 
 # ==================== SLA Individual ====================
@@ -307,32 +385,43 @@ def obter_sla_chamado_cache(
     Cache: 5 minutos
     """
     cache = get_cache_manager()
-    
+
     # Tenta cache
     sla = cache.get_sla_chamado(chamado_id)
-    
+
     if sla:
         return {
             "chamado_id": chamado_id,
             "sla": sla,
             "fonte": "cache"
         }
-    
-    # Se não tem cache, calcula
-    chamado = db.query(Chamado).filter(Chamado.id == chamado_id).first()
-    
-    if not chamado:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Chamado {chamado_id} não encontrado"
-        )
-    
-    calculator = CalculadorSLA(db)
-    sla_info = calculator.calcular_sla(chamado)
-    
-    # Armazena em cache
-    cache.set_sla_chamado(chamado_id, sla_info)
-    
+
+    # Miss: single-flight por chamado. Em um ticket quente cujo cache
+    # acabou de expirar, só a primeira request paga o SELECT + cálculo;
+    # as demais esperam e releem o cache (double-checked locking)
+    with _locks_sla_chamado[chamado_id]:
+        sla = cache.get_sla_chamado(chamado_id)
+        if sla:
+            return {
+                "chamado_id": chamado_id,
+                "sla": sla,
+                "fonte": "cache"
+            }
+
+        chamado = db.query(Chamado).filter(Chamado.id == chamado_id).first()
+
+        if not chamado:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Chamado {chamado_id} não encontrado"
+            )
+
+        calculator = CalculadorSLA(db)
+        sla_info = calculator.calcular_sla(chamado)
+
+        # Armazena em cache
+        cache.set_sla_chamado(chamado_id, sla_info)
+
     return {
         "chamado_id": chamado_id,
         "sla": sla_info,
@@ -340,10 +429,41 @@ def obter_sla_chamado_cache(
     }
 
 
+@router_otimizado.post("/chamados/sla")
+def obter_sla_chamados_cache(
+    ids: List[int],
+    db: Session = Depends(get_db)
+):
+    """
+    Obtém SLA de vários chamados em uma única chamada
+
+    Evita o N+1 de HTTP do drill-down do dashboard (uma request por linha):
+    os cacheados saem direto da memória e os faltantes são buscados com um
+    único SELECT ... IN e calculados em lote.
+    """
+    cache = get_cache_manager()
+
+    slas = cache.get_many_sla_chamados(ids)
+    faltantes = [cid for cid in ids if cid not in slas]
+
+    if faltantes:
+        chamados = db.query(Chamado).filter(Chamado.id.in_(faltantes)).all()
+        calculator = CalculadorSLA(db)
+        novos = {c.id: calculator.calcular_sla(c) for c in chamados}
+        cache.set_many_sla_chamados(novos)
+        slas.update(novos)
+
+    return {
+        "total": len(slas),
+        "slas": slas,
+        "nao_encontrados": [cid for cid in faltantes if cid not in slas],
+    }
+
+
 # ==================== Limpar Cache ====================
 
 @router_otimizado.post("/limpar")
-def limpar_cache():
+async def limpar_cache():
     """
     Limpa todo o cache de SLA
     
@@ -3,6 +3,9 @@ Scheduler automático para atualizar SLA a cada 15 minutos
 Usa APScheduler para executar em background
 """
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
 from typing import Optional
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -12,6 +15,7 @@ from sqlalchemy.orm import Session
 from .calculator import CalculadorSLA
 from .metrics import ServicoMetricasSLA
 from .cache_service import get_cache_manager
+from .schemas import ChamadoRiscoResumo
 
 logger = logging.getLogger("sla.scheduler")
 
@@ -24,7 +28,24 @@ class SchedulerSLA:
         self.is_running = False
         self.job_id = "sla_update_job"
         self.update_interval_minutes = 15  # 15 minutos
-    
+        # Single-flight: garante que só um refresh completo roda por vez
+        # (tick do scheduler + botão "Atualizar" + múltiplas abas)
+        self.refresh_lock = threading.Lock()
+
+    @staticmethod
+    def eh_lider() -> bool:
+        """
+        Este processo deve rodar o scheduler?
+
+        Com vários workers (gunicorn/uvicorn), cada um iniciaria o próprio
+        BackgroundScheduler e o refresh rodaria N vezes. Defina
+        SLA_SCHEDULER_LEADER=0 nos workers seguidores (e 1 em exatamente
+        um); eles passam a depender do cache compartilhado (SLA_REDIS_URL).
+        Sem a variável, o processo é líder — preserva o comportamento de
+        deploy com worker único.
+        """
+        return os.getenv("SLA_SCHEDULER_LEADER", "1").strip().lower() not in ("0", "false")
+
     def iniciar(self, db_session_factory, update_interval: int = 15):
         """
         Inicia o scheduler
@@ -33,6 +54,10 @@ class SchedulerSLA:
             db_session_factory: Factory para criar sessões de banco
             update_interval: Intervalo em minutos (padrão 15)
         """
+        if not self.eh_lider():
+            logger.info("⏭️ SLA_SCHEDULER_LEADER=0: scheduler não iniciado neste worker")
+            return
+
         if self.is_running:
             logger.warning("Scheduler SLA já está em execução")
             return
@@ -79,12 +104,20 @@ class SchedulerSLA:
         """
         Função executada periodicamente para atualizar SLA
         Atualiza cache com novos cálculos
+
+        Se outro refresh já estiver em andamento, retorna imediatamente:
+        quem chegou depois reaproveita o cache que o refresh em curso vai
+        escrever, em vez de duplicar o recálculo completo.
         """
+        if not self.refresh_lock.acquire(blocking=False):
+            logger.info("⏭️ Atualização de SLA já em andamento, ignorando disparo concorrente")
+            return False
+
         inicio = datetime.utcnow()
         logger.info(f"🔄 Iniciando atualização de SLA...")
-        
+
         db = db_session_factory()
-        
+
         try:
             cache = get_cache_manager()
             
@@ -93,41 +126,61 @@ class SchedulerSLA:
             stats = calculator.recalcular_todos()
             logger.info(f"✅ SLAs recalculados: {stats['total_processados']} chamados em {stats['tempo_ms']}ms")
             
-            # 2. Atualiza cache de métricas
-            servico = ServicoMetricasSLA(db)
-            
-            # Múltiplos períodos
+            # "Hoje" resolvido UMA vez por refresh: todas as janelas saem
+            # da mesma data, mesmo se o refresh cruzar a meia-noite. As
+            # chaves de cache usam só o período em dias (7/30/60/90).
+            hoje = date.today()
             periodos = [
-                (date.today() - timedelta(days=7), date.today(), "7dias"),
-                (date.today() - timedelta(days=30), date.today(), "30dias"),
-                (date.today() - timedelta(days=60), date.today(), "60dias"),
-                (date.today() - timedelta(days=90), date.today(), "90dias"),
+                (hoje - timedelta(days=dias), hoje, dias)
+                for dias in (7, 30, 60, 90)
             ]
-            
-            for data_inicio, data_fim, label in periodos:
-                metricas = servico.obter_metricas_gerais(data_inicio, data_fim)
-                cache.set_metricas_gerais(
-                    str(data_inicio),
-                    str(data_fim),
-                    metricas
+
+            def _com_sessao(consulta):
+                """Roda a consulta em um serviço com sessão própria
+                (sessões SQLAlchemy não podem ser compartilhadas entre
+                threads)"""
+                sessao = db_session_factory()
+                try:
+                    return consulta(ServicoMetricasSLA(sessao))
+                finally:
+                    sessao.close()
+
+            # 2-5. Métricas multi-período, listas de críticos e dashboard
+            # são leituras independentes da tabela materializada: rodam em
+            # paralelo, cada uma na própria conexão. As métricas já saem de
+            # UMA passada para os 4 períodos (o de 90 dias é superconjunto
+            # dos demais).
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                fut_metricas = pool.submit(
+                    _com_sessao,
+                    lambda s: s.obter_metricas_multi_periodos(
+                        [(data_inicio, data_fim) for data_inicio, data_fim, _ in periodos]
+                    ),
                 )
-                logger.debug(f"📊 Métricas cacheadas: {label}")
-            
-            # 3. Atualiza cache de chamados em risco
-            em_risco = servico.obter_chamados_em_risco(limite=50)
-            cache.set_chamados_em_risco(em_risco)
-            
-            # 4. Atualiza cache de chamados vencidos
-            vencidos = servico.obter_chamados_vencidos(limite=50)
-            cache.set_chamados_vencidos(vencidos)
-            
-            # 5. Atualiza cache de dashboard
-            dashboard = servico.obter_dashboard_executivo()
-            cache.set_dashboard(
-                str(date.today() - timedelta(days=30)),
-                str(date.today()),
-                dashboard
-            )
+                fut_criticos = pool.submit(
+                    _com_sessao, lambda s: s.obter_chamados_criticos(limite=50)
+                )
+                fut_dashboard = pool.submit(
+                    _com_sessao, lambda s: s.obter_dashboard_executivo()
+                )
+                metricas_por_periodo = fut_metricas.result()
+                em_risco, vencidos = fut_criticos.result()
+                dashboard = fut_dashboard.result()
+
+            # Projeção para o schema mínimo na escrita: o cache guarda só
+            # o que os widgets de top-N exibem
+            em_risco = [ChamadoRiscoResumo.model_validate(c).model_dump() for c in em_risco]
+            vencidos = [ChamadoRiscoResumo.model_validate(c).model_dump() for c in vencidos]
+
+            # Escritas agrupadas: um único round-trip se o backend for
+            # remoto, e o cache nunca fica meio-atualizado
+            with cache.batch() as lote:
+                for (_, _, dias), metricas in zip(periodos, metricas_por_periodo):
+                    lote.set_metricas_gerais(dias, metricas)
+                    logger.debug(f"📊 Métricas cacheadas: {dias} dias")
+                lote.set_chamados_em_risco(em_risco)
+                lote.set_chamados_vencidos(vencidos)
+                lote.set_dashboard(30, dashboard)
             
             tempo_total = (datetime.utcnow() - inicio).total_seconds() * 1000
             logger.info(f"✅ Atualização concluída em {tempo_total:.0f}ms")
@@ -135,9 +188,13 @@ class SchedulerSLA:
         
         except Exception as e:
             logger.error(f"❌ Erro ao atualizar SLA: {e}", exc_info=True)
-        
+            return False
+
         finally:
             db.close()
+            self.refresh_lock.release()
+
+        return True
     
     def atualizar_manualmente(self, db_session_factory):
         """
@@ -164,6 +221,8 @@ class SchedulerSLA:
         
         return {
             "running": self.is_running,
+            "lider": self.eh_lider(),
+            "refresh_em_andamento": self.refresh_lock.locked(),
             "job_id": self.job_id,
             "interval_minutes": self.update_interval_minutes,
             "next_run": job.next_run_time.isoformat() if job.next_run_time else None,
@@ -171,6 +171,22 @@ class InfoSLAChamadoResponse(BaseModel):
         from_attributes = True
 
 
+# ==================== Chamados Críticos (cache) ====================
+class ChamadoRiscoResumo(BaseModel):
+    """
+    Projeção mínima de um chamado em risco/vencido para os widgets de top-N
+
+    Apenas o que o frontend exibe na lista: campos extras são descartados
+    na escrita do cache para reduzir payload e custo de serialização
+    """
+    id: int
+    codigo: str
+    prioridade: str
+    responsavel_id: Optional[int] = None
+    percentual_resolucao: float
+    horas_restantes: Optional[float] = None
+
+
 # ==================== Métricas ====================
 class MetricasSLA(BaseModel):
     """Métricas gerais de SLA"""
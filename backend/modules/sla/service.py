@@ -1,7 +1,8 @@
 """Camada de negócio para SLA"""
 import logging
 from datetime import datetime
-from typing import Optional, Dict
+from typing import List, Optional, Dict
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
 from core.db import SessionLocal
 from .metrics import ServicoMetricasSLA
@@ -38,17 +39,71 @@ class SlaService:
                         motivo=f"Pausa automática - {status}"
                     ))
                     self.db.commit()
+                    ServicoMetricasSLA.invalidar_dashboard_cache()
                     return True
             else:
-                pausas = self.db.query(SLAPausa).filter(
+                # UPDATE único com a duração calculada no banco: evita
+                # carregar e salvar pausa a pausa (índice (chamado_id, fim))
+                agora = datetime.utcnow()
+                fechadas = self.db.query(SLAPausa).filter(
                     SLAPausa.chamado_id == chamado_id, SLAPausa.fim.is_(None)
-                ).all()
-                for p in pausas:
-                    p.fim = datetime.utcnow()
-                    p.duracao_horas = (p.fim - p.inicio).total_seconds() / 3600
-                if pausas:
+                ).update({
+                    SLAPausa.fim: agora,
+                    SLAPausa.duracao_horas: func.timestampdiff(
+                        text("SECOND"), SLAPausa.inicio, agora
+                    ) / 3600.0,
+                }, synchronize_session=False)
+                if fechadas:
                     self.db.commit()
-                return bool(pausas)
+                    ServicoMetricasSLA.invalidar_dashboard_cache()
+                return bool(fechadas)
         except Exception as e:
             logger.error(f"Erro pausa SLA chamado {chamado_id}: {e}")
         return False
+
+    def pausar_sla_chamados(self, chamado_ids: List[int], status: str) -> int:
+        """
+        Aplica a transição de pausa/retomada a vários chamados de uma vez
+        (fechamentos em massa): uma query por direção em vez de N chamadas.
+        Retorna quantos chamados foram alterados.
+        """
+        if not chamado_ids:
+            return 0
+        try:
+            from ti.models.sla_pausa import SLAPausa
+            STATUS_PAUSADOS = {"Aguardando"}
+            agora = datetime.utcnow()
+            if status in STATUS_PAUSADOS:
+                ja_pausados = {
+                    cid for (cid,) in self.db.query(SLAPausa.chamado_id).filter(
+                        SLAPausa.chamado_id.in_(chamado_ids), SLAPausa.fim.is_(None)
+                    ).all()
+                }
+                novas = [
+                    SLAPausa(
+                        chamado_id=cid, inicio=agora,
+                        tipo="status", status_pausante=status,
+                        motivo=f"Pausa automática - {status}"
+                    )
+                    for cid in chamado_ids if cid not in ja_pausados
+                ]
+                if novas:
+                    self.db.add_all(novas)
+                    self.db.commit()
+                    ServicoMetricasSLA.invalidar_dashboard_cache()
+                return len(novas)
+            fechadas = self.db.query(SLAPausa).filter(
+                SLAPausa.chamado_id.in_(chamado_ids), SLAPausa.fim.is_(None)
+            ).update({
+                SLAPausa.fim: agora,
+                SLAPausa.duracao_horas: func.timestampdiff(
+                    text("SECOND"), SLAPausa.inicio, agora
+                ) / 3600.0,
+            }, synchronize_session=False)
+            if fechadas:
+                self.db.commit()
+                ServicoMetricasSLA.invalidar_dashboard_cache()
+            return fechadas
+        except Exception as e:
+            logger.error(f"Erro pausa SLA em lote ({len(chamado_ids)} chamados): {e}")
+        return 0
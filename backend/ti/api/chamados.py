@@ -1,7 +1,7 @@
 from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import and_, func
 from core.db import get_db, engine
 from ti.schemas.chamado import (
     ChamadoCreate,
@@ -14,7 +14,7 @@ from ti.services.chamados import criar_chamado as service_criar
 from core.realtime import sio
 from werkzeug.security import check_password_hash
 from ..models.notification import Notification
-import json
+import orjson
 from core.utils import now_brazil_naive
 from ..models import Chamado, User, TicketAnexo, ChamadoAnexo, HistoricoTicket, HistoricoStatus, HistoricoAnexo
 from ti.models.metrics_cache import MetricsCacheDB
@@ -23,10 +23,23 @@ from ti.schemas.ticket import HistoricoItem, HistoricoResponse
 from sqlalchemy import inspect, text
 from core.email_msgraph import send_async, send_chamado_abertura, send_chamado_status
 
-from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter
 from sqlalchemy import insert
-import json
-from datetime import datetime, timedelta
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from functools import lru_cache
+from datetime import date, datetime, timedelta
+
+# Logger das classes de cache: print() é I/O síncrono e serializa os
+# workers no lock do stdout sob carga; o logger respeita nível e handler
+_cache_log = logging.getLogger("ti.chamados.cache")
 
 # ============================================================================
 # UTILITY FUNCTIONS
@@ -88,6 +101,101 @@ def get_current_user_from_request(request: Request, db: Session) -> User | None:
 # CACHE MANAGER INLINED - Chamados de hoje com reset à meia-noite
 # ============================================================================
 
+# Cache local de processo na frente do metrics_cache_db: o valor só muda em
+# increment/decrement/invalidate, então um TTL curto elimina quase todos os
+# SELECTs do polling do dashboard (cache-aside)
+_AUSENTE = object()
+_LOCAL_CACHE: dict = {}
+_LOCAL_CACHE_LOCK = threading.Lock()
+_LOCAL_CACHE_TTL = 10.0  # segundos
+
+
+def _local_cache_get(key: str):
+    """Valor fresco do cache local, ou _AUSENTE"""
+    agora = time.monotonic()
+    with _LOCAL_CACHE_LOCK:
+        entrada = _LOCAL_CACHE.get(key)
+        if entrada is not None and entrada[1] > agora:
+            return entrada[0]
+    return _AUSENTE
+
+
+def _local_cache_set(key: str, valor) -> None:
+    with _LOCAL_CACHE_LOCK:
+        _LOCAL_CACHE[key] = (valor, time.monotonic() + _LOCAL_CACHE_TTL)
+
+
+def _local_cache_pop(key: str) -> None:
+    with _LOCAL_CACHE_LOCK:
+        _LOCAL_CACHE.pop(key, None)
+
+
+# Inspector único do módulo: cada inspect(engine) nasce com info_cache
+# vazio e reconsulta o information_schema; reaproveitando a mesma
+# instância, o cache de reflexão do dialeto vale entre requests
+_INSPECTOR = None
+
+
+def _get_inspector():
+    """Inspector compartilhado do engine (criado sob demanda)"""
+    global _INSPECTOR
+    if _INSPECTOR is None:
+        _INSPECTOR = inspect(engine)
+    return _INSPECTOR
+
+
+def clear_reflection_cache() -> None:
+    """Descarta o Inspector cacheado (chamar após DDL nas migrações)"""
+    global _INSPECTOR
+    _INSPECTOR = None
+    _cols_cached.cache_clear()
+    _SELECT_ANEXO_SQL.clear()
+    _SELECT_DOWNLOAD_SQL.clear()
+    _insert_sql.cache_clear()
+    _text_cached.cache_clear()
+
+
+_cache_value_int_ok = False
+
+
+def _garantir_coluna_cache_value_int() -> None:
+    """
+    Migração defensiva: garante a coluna numérica do contador
+    (cache_value_int) e afrouxa cache_value para NULL, no mesmo estilo da
+    migração de `retroativo` em listar_chamados.
+    """
+    global _cache_value_int_ok
+    if _cache_value_int_ok:
+        return
+    try:
+        insp = _get_inspector()
+        cols = [c["name"] for c in insp.get_columns("metrics_cache_db")]
+        if "cache_value_int" not in cols:
+            with engine.connect() as conn:
+                conn.execute(text(
+                    "ALTER TABLE metrics_cache_db ADD COLUMN cache_value_int BIGINT NULL"
+                ))
+                conn.execute(text(
+                    "ALTER TABLE metrics_cache_db MODIFY cache_value TEXT NULL"
+                ))
+                conn.commit()
+            clear_reflection_cache()
+            _cache_log.info("Coluna cache_value_int adicionada ao metrics_cache_db")
+        _cache_value_int_ok = True
+    except Exception:
+        _cache_log.warning("Aviso na migração de cache_value_int", exc_info=True)
+
+
+def _valor_contador(cached) -> int:
+    """Lê o contador da coluna numérica (ou do JSON legado, se anterior à migração)"""
+    if cached.cache_value_int is not None:
+        return cached.cache_value_int
+    try:
+        return int(orjson.loads(cached.cache_value))
+    except (orjson.JSONDecodeError, ValueError, TypeError):
+        return 0
+
+
 class ChamadosTodayCounter:
     """
     Counter para "chamados hoje" com reset automático à meia-noite.
@@ -96,11 +204,18 @@ class ChamadosTodayCounter:
     Permite recuperar valor mesmo após reinicialização do servidor.
     """
 
-    @staticmethod
-    def get_cache_key_today() -> str:
+    # Memoização da chave do dia: (data, chave pronta). A chave só muda
+    # na virada do dia; fora isso a comparação é entre objetos date e o
+    # isoformat() + f-string só rodam no miss
+    _cached_key: tuple[date | None, str] = (None, "")
+
+    @classmethod
+    def get_cache_key_today(cls, now: datetime | None = None) -> str:
         """Gera chave de cache baseada na data de hoje"""
-        hoje = now_brazil_naive().date().isoformat()
-        return f"chamados_hoje:{hoje}"
+        hoje = (now or now_brazil_naive()).date()
+        if hoje != cls._cached_key[0]:
+            cls._cached_key = (hoje, f"chamados_hoje:{hoje.isoformat()}")
+        return cls._cached_key[1]
 
     @staticmethod
     def get_cache_key_for_date(date: datetime) -> str:
@@ -111,169 +226,166 @@ class ChamadosTodayCounter:
     def get_count(db: Session) -> int:
         """Obtém contador de chamados de hoje"""
         try:
-            cache_key = ChamadosTodayCounter.get_cache_key_today()
+            _garantir_coluna_cache_value_int()
+            agora = now_brazil_naive()
+            cache_key = ChamadosTodayCounter.get_cache_key_today(agora)
+
+            # Cache local de processo: evita o SELECT no polling
+            local = _local_cache_get(cache_key)
+            if local is not _AUSENTE:
+                return local
 
             cached = db.query(MetricsCacheDB).filter(
                 MetricsCacheDB.cache_key == cache_key
             ).first()
 
-            if cached and cached.expires_at and cached.expires_at > now_brazil_naive():
-                try:
-                    return int(json.loads(cached.cache_value))
-                except:
-                    return 0
+            if cached and cached.expires_at and cached.expires_at > agora:
+                valor = _valor_contador(cached)
+                _local_cache_set(cache_key, valor)
+                return valor
 
             # Se expirou, recalcula (isso só deve acontecer após meia-noite)
-            return ChamadosTodayCounter._recalculate(db)
+            return ChamadosTodayCounter._recalculate(db, now=agora)
 
-        except Exception as e:
-            print(f"[CACHE] Erro ao obter contador de hoje: {e}")
+        except Exception:
+            _cache_log.exception("Erro ao obter contador de hoje")
             return 0
 
     @staticmethod
-    def increment(db: Session, count: int = 1) -> int:
+    def increment(db: Session, count: int = 1, now: datetime | None = None) -> int:
         """Incrementa contador de chamados de hoje"""
         try:
-            cache_key = ChamadosTodayCounter.get_cache_key_today()
-
-            # Obtém valor atual
-            cached = db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key == cache_key
-            ).first()
-
-            # Se expirou (passou meia-noite), recalcula
-            if not cached or (cached.expires_at and cached.expires_at <= now_brazil_naive()):
-                new_value = ChamadosTodayCounter._recalculate(db)
-                return new_value + count
-
-            # Incrementa o valor existente
-            try:
-                current_value = int(json.loads(cached.cache_value))
-            except:
-                current_value = 0
-
-            new_value = current_value + count
-
-            # Atualiza cache com expire à meia-noite
-            agora = now_brazil_naive()
+            _garantir_coluna_cache_value_int()
+            # "Agora" resolvido uma única vez e propagado: chave, filtro,
+            # timestamps e o eventual recálculo enxergam o mesmo instante
+            agora = now or now_brazil_naive()
+            cache_key = ChamadosTodayCounter.get_cache_key_today(agora)
             proximo_dia = (agora + timedelta(days=1)).replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
 
-            cached.cache_value = json.dumps(new_value)
-            cached.calculated_at = agora
-            cached.expires_at = proximo_dia
-            db.add(cached)
+            # UPDATE atômico com a aritmética no SQL: duas requests
+            # concorrentes somam +2 (o SELECT→soma→UPDATE anterior perdia
+            # um dos incrementos) e o caminho quente vira um round-trip
+            atualizado = db.query(MetricsCacheDB).filter(
+                MetricsCacheDB.cache_key == cache_key,
+                MetricsCacheDB.cache_value_int.isnot(None),
+                MetricsCacheDB.expires_at > agora,
+            ).update({
+                MetricsCacheDB.cache_value_int: MetricsCacheDB.cache_value_int + count,
+                MetricsCacheDB.calculated_at: agora,
+                MetricsCacheDB.expires_at: proximo_dia,
+            }, synchronize_session=False)
             db.commit()
 
-            return new_value
+            # Sem linha válida (virada do dia ou formato legado): recalcula
+            if not atualizado:
+                new_value = ChamadosTodayCounter._recalculate(db, now=agora)
+                return new_value + count
 
-        except Exception as e:
-            print(f"[CACHE] Erro ao incrementar contador: {e}")
-            try:
-                db.rollback()
-            except:
-                pass
+            valor = db.query(MetricsCacheDB.cache_value_int).filter(
+                MetricsCacheDB.cache_key == cache_key
+            ).scalar()
+            _local_cache_set(cache_key, int(valor or 0))
+            return int(valor or 0)
+
+        except Exception:
+            _cache_log.exception("Erro ao incrementar contador")
+            db.rollback()
             return ChamadosTodayCounter._recalculate(db)
 
     @staticmethod
-    def decrement(db: Session, count: int = 1) -> int:
+    def decrement(db: Session, count: int = 1, now: datetime | None = None) -> int:
         """Decrementa contador de chamados de hoje (para cancelamentos)"""
         try:
-            cache_key = ChamadosTodayCounter.get_cache_key_today()
-
-            cached = db.query(MetricsCacheDB).filter(
-                MetricsCacheDB.cache_key == cache_key
-            ).first()
-
-            if not cached or (cached.expires_at and cached.expires_at <= now_brazil_naive()):
-                return ChamadosTodayCounter._recalculate(db)
-
-            try:
-                current_value = int(json.loads(cached.cache_value))
-            except:
-                current_value = 0
-
-            new_value = max(0, current_value - count)
-
-            agora = now_brazil_naive()
+            _garantir_coluna_cache_value_int()
+            agora = now or now_brazil_naive()
+            cache_key = ChamadosTodayCounter.get_cache_key_today(agora)
             proximo_dia = (agora + timedelta(days=1)).replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
 
-            try:
-                cached.cache_value = json.dumps(new_value)
-                cached.calculated_at = agora
-                cached.expires_at = proximo_dia
-                db.add(cached)
-                db.commit()
-            except Exception as commit_error:
-                db.rollback()
-                print(f"[CACHE] Erro ao commit decrement: {commit_error}")
-                raise
+            # Mesmo UPDATE atômico do increment; GREATEST mantém o piso em 0
+            atualizado = db.query(MetricsCacheDB).filter(
+                MetricsCacheDB.cache_key == cache_key,
+                MetricsCacheDB.cache_value_int.isnot(None),
+                MetricsCacheDB.expires_at > agora,
+            ).update({
+                MetricsCacheDB.cache_value_int: func.greatest(
+                    MetricsCacheDB.cache_value_int - count, 0
+                ),
+                MetricsCacheDB.calculated_at: agora,
+                MetricsCacheDB.expires_at: proximo_dia,
+            }, synchronize_session=False)
+            db.commit()
 
-            return new_value
+            if not atualizado:
+                return ChamadosTodayCounter._recalculate(db, now=agora)
 
-        except Exception as e:
-            print(f"[CACHE] Erro ao decrementar contador: {e}")
-            try:
-                db.rollback()
-            except:
-                pass
+            valor = db.query(MetricsCacheDB.cache_value_int).filter(
+                MetricsCacheDB.cache_key == cache_key
+            ).scalar()
+            _local_cache_set(cache_key, int(valor or 0))
+            return int(valor or 0)
+
+        except Exception:
+            _cache_log.exception("Erro ao decrementar contador")
+            db.rollback()
             return ChamadosTodayCounter._recalculate(db)
 
     @staticmethod
-    def _recalculate(db: Session) -> int:
+    def _recalculate(db: Session, now: datetime | None = None) -> int:
         """Recalcula contador de hoje a partir do banco de dados"""
         try:
-            hoje = now_brazil_naive().replace(hour=0, minute=0, second=0, microsecond=0)
+            agora = now or now_brazil_naive()
+            hoje = agora.replace(hour=0, minute=0, second=0, microsecond=0)
 
-            count = db.query(Chamado).filter(
+            # COUNT direto como scalar: Query.count() embrulha o SELECT
+            # inteiro numa subquery (SELECT count(*) FROM (SELECT ...)),
+            # que o planner paga a cada recálculo
+            count = db.query(func.count(Chamado.id)).filter(
                 and_(
                     Chamado.data_abertura >= hoje,
                     Chamado.status != "Expirado"
                 )
-            ).count()
+            ).scalar() or 0
 
             # Salva no cache com expire à meia-noite
-            cache_key = ChamadosTodayCounter.get_cache_key_today()
-            agora = now_brazil_naive()
+            _garantir_coluna_cache_value_int()
+            cache_key = ChamadosTodayCounter.get_cache_key_today(agora)
             proximo_dia = (agora + timedelta(days=1)).replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
 
             try:
-                existing = db.query(MetricsCacheDB).filter(
-                    MetricsCacheDB.cache_key == cache_key
-                ).first()
-
-                if existing:
-                    existing.cache_value = json.dumps(count)
-                    existing.calculated_at = agora
-                    existing.expires_at = proximo_dia
-                    db.add(existing)
-                else:
-                    new_cache = MetricsCacheDB(
-                        cache_key=cache_key,
-                        cache_value=json.dumps(count),
-                        calculated_at=agora,
-                        expires_at=proximo_dia,
-                    )
-                    db.add(new_cache)
-
+                # Upsert em uma ida só: o SELECT + branch + UPDATE/INSERT
+                # via ORM custava dois round-trips por recálculo.
+                # cache_value=None limpa o blob do formato legado
+                stmt = mysql_insert(MetricsCacheDB.__table__).values(
+                    cache_key=cache_key,
+                    cache_value=None,
+                    cache_value_int=count,
+                    calculated_at=agora,
+                    expires_at=proximo_dia,
+                )
+                stmt = stmt.on_duplicate_key_update(
+                    cache_value=stmt.inserted.cache_value,
+                    cache_value_int=stmt.inserted.cache_value_int,
+                    calculated_at=stmt.inserted.calculated_at,
+                    expires_at=stmt.inserted.expires_at,
+                )
+                db.execute(stmt)
                 db.commit()
-            except Exception as commit_error:
+            except Exception:
                 db.rollback()
-                print(f"[CACHE] Erro ao commit recalculate: {commit_error}")
+                _cache_log.exception("Erro ao commit recalculate")
 
+            _local_cache_set(cache_key, count)
             return count
 
-        except Exception as e:
-            print(f"[CACHE] Erro ao recalcular contador: {e}")
-            try:
-                db.rollback()
-            except:
-                pass
+        except Exception:
+            _cache_log.exception("Erro ao recalcular contador")
+            db.rollback()
             return 0
 
 
@@ -288,12 +400,17 @@ class IncrementalMetricsCache:
     - Reset automático no dia 1º do próximo mês às 00:00
     """
 
-    @staticmethod
-    def get_cache_key_month() -> str:
+    # Mesma memoização da chave diária do contador, só que por (ano, mês)
+    _cached_key: tuple[tuple[int, int], str] = ((0, 0), "")
+
+    @classmethod
+    def get_cache_key_month(cls, now: datetime | None = None) -> str:
         """Gera chave de cache para o mês atual"""
-        agora = now_brazil_naive()
-        ano_mes = agora.strftime("%Y-%m")
-        return f"sla_metrics_mes:{ano_mes}"
+        agora = now or now_brazil_naive()
+        ano_mes = (agora.year, agora.month)
+        if ano_mes != cls._cached_key[0]:
+            cls._cached_key = (ano_mes, f"sla_metrics_mes:{agora.strftime('%Y-%m')}")
+        return cls._cached_key[1]
 
     @staticmethod
     def get_expire_time_for_month() -> datetime:
@@ -316,6 +433,11 @@ class IncrementalMetricsCache:
         try:
             cache_key = IncrementalMetricsCache.get_cache_key_month()
 
+            # Cache local de processo: evita o SELECT no polling
+            local = _local_cache_get(cache_key)
+            if local is not _AUSENTE:
+                return local
+
             # Tenta obter do cache
             try:
                 cached = db.query(MetricsCacheDB).filter(
@@ -324,22 +446,21 @@ class IncrementalMetricsCache:
 
                 if cached and cached.expires_at and cached.expires_at > now_brazil_naive():
                     try:
-                        metrics = json.loads(cached.cache_value)
+                        metrics = orjson.loads(cached.cache_value)
                         # Validação básica
                         if all(k in metrics for k in ["total", "dentro_sla", "fora_sla"]):
+                            _local_cache_set(cache_key, metrics)
                             return metrics
-                    except (json.JSONDecodeError, ValueError):
-                        print(f"[CACHE] Cache corrompido para {cache_key}, recalculando...")
-                        pass
-            except Exception as cache_error:
-                print(f"[CACHE] Erro ao buscar cache do banco: {cache_error}")
-                pass
+                    except (orjson.JSONDecodeError, ValueError, TypeError):
+                        _cache_log.warning("Cache corrompido para %s, recalculando...", cache_key)
+            except Exception:
+                _cache_log.warning("Erro ao buscar cache do banco", exc_info=True)
 
             # Cache não existe ou expirou, recalcula (de forma otimizada)
             return IncrementalMetricsCache._calculate_month(db)
 
-        except Exception as e:
-            print(f"[CACHE] Erro ao obter métricas mensais: {e}")
+        except Exception:
+            _cache_log.exception("Erro ao obter métricas mensais")
             # Retorna valores seguros
             return {
                 "total": 0,
@@ -351,25 +472,27 @@ class IncrementalMetricsCache:
 
     @staticmethod
     def update_for_chamado(db: Session, chamado_id: int) -> None:
+        """Atualiza métricas quando um chamado é alterado"""
+        IncrementalMetricsCache.update_for_chamados(db, [chamado_id])
+
+    @staticmethod
+    def update_for_chamados(db: Session, chamado_ids: list[int]) -> None:
         """
-        Atualiza métricas incrementalmente quando um chamado é alterado.
+        Versão em lote de update_for_chamado.
 
-        Em vez de recalcular TUDO, calcula apenas aquele chamado
-        e soma com as métricas em cache.
+        Como o SLA incremental foi removido, o efeito é só invalidar o
+        cache mensal — uma vez por lote. O SELECT do chamado e a leitura
+        das métricas que existiam aqui não alimentavam nada e viravam
+        N+1 em atualizações em massa.
         """
+        if not chamado_ids:
+            return
         try:
-            chamado = db.query(Chamado).filter(Chamado.id == chamado_id).first()
-            if not chamado:
-                return
-
-            # Obtém métricas atuais do cache
-            metricas_atuais = IncrementalMetricsCache.get_metrics(db)
-
-            # SLA foi removido - apenas invalida o cache
             IncrementalMetricsCache.invalidate_cache(db)
-
-        except Exception as e:
-            print(f"[CACHE] Erro ao atualizar métricas para chamado {chamado_id}: {e}")
+        except Exception:
+            _cache_log.exception(
+                "Erro ao atualizar métricas para chamados %s", chamado_ids
+            )
 
     @staticmethod
     def _calculate_month(db: Session) -> dict:
@@ -392,7 +515,7 @@ class IncrementalMetricsCache:
                 }
 
                 # Salva no cache
-                IncrementalMetricsCache._save_metrics(db, metricas)
+                IncrementalMetricsCache._save_metrics(db, metricas, now=agora)
 
                 return metricas
 
@@ -411,8 +534,8 @@ class IncrementalMetricsCache:
 
             return result
 
-        except Exception as e:
-            print(f"[CACHE] Erro ao calcular métricas mensais: {e}")
+        except Exception:
+            _cache_log.exception("Erro ao calcular métricas mensais")
             return {
                 "total": 0,
                 "dentro_sla": 0,
@@ -422,112 +545,208 @@ class IncrementalMetricsCache:
             }
 
     @staticmethod
-    def _save_metrics(db: Session, metricas: dict) -> None:
+    def _save_metrics(db: Session, metricas: dict, now: datetime | None = None) -> None:
         """Salva métricas no cache com expiração até fim do mês"""
         try:
             cache_key = IncrementalMetricsCache.get_cache_key_month()
             expire_time = IncrementalMetricsCache.get_expire_time_for_month()
 
-            agora = now_brazil_naive()
-            cache_value = json.dumps(metricas)
+            agora = now or now_brazil_naive()
+            cache_value = orjson.dumps(metricas).decode()
 
             try:
-                existing = db.query(MetricsCacheDB).filter(
-                    MetricsCacheDB.cache_key == cache_key
-                ).first()
-
-                if existing:
-                    existing.cache_value = cache_value
-                    existing.calculated_at = agora
-                    existing.expires_at = expire_time
-                    db.add(existing)
-                else:
-                    new_cache = MetricsCacheDB(
-                        cache_key=cache_key,
-                        cache_value=cache_value,
-                        calculated_at=agora,
-                        expires_at=expire_time,
-                    )
-                    db.add(new_cache)
-
+                # Mesmo upsert de uma ida só do _recalculate
+                stmt = mysql_insert(MetricsCacheDB.__table__).values(
+                    cache_key=cache_key,
+                    cache_value=cache_value,
+                    calculated_at=agora,
+                    expires_at=expire_time,
+                )
+                stmt = stmt.on_duplicate_key_update(
+                    cache_value=stmt.inserted.cache_value,
+                    calculated_at=stmt.inserted.calculated_at,
+                    expires_at=stmt.inserted.expires_at,
+                )
+                db.execute(stmt)
                 db.commit()
-            except Exception as commit_error:
+                _local_cache_set(cache_key, metricas)
+            except Exception:
                 db.rollback()
-                print(f"[CACHE] Erro ao commit métricas: {commit_error}")
+                _cache_log.exception("Erro ao commit métricas")
 
-        except Exception as e:
-            print(f"[CACHE] Erro ao salvar métricas: {e}")
-            try:
-                db.rollback()
-            except:
-                pass
+        except Exception:
+            _cache_log.exception("Erro ao salvar métricas")
+            db.rollback()
 
     @staticmethod
     def _save_chamado_status(
         db: Session,
         chamado_id: int,
-        dentro_sla: bool
+        dentro_sla: bool,
+        now: datetime | None = None,
     ) -> None:
-        """Salva status de SLA do chamado para referência incremental"""
-        try:
-            cache_key = f"chamado_sla_status:{chamado_id}"
+        """
+        Salva status de SLA do chamado para referência incremental
+        (caso unitário do upsert em lote)
+        """
+        IncrementalMetricsCache._save_chamado_statuses(
+            db, [(chamado_id, dentro_sla)], now=now
+        )
 
-            expire_time = IncrementalMetricsCache.get_expire_time_for_month()
-            agora = now_brazil_naive()
+    @staticmethod
+    def _save_chamado_statuses(
+        db: Session,
+        items: list[tuple[int, bool]],
+        now: datetime | None = None,
+    ) -> None:
+        """
+        Versão em lote de _save_chamado_status.
 
-            cache_value = json.dumps({"dentro_sla": dentro_sla})
+        Quando um recálculo toca muitos chamados, o caminho unitário vira
+        N vezes SELECT + INSERT/UPDATE + COMMIT. Aqui o upsert apoiado na
+        chave única de cache_key grava todos os status em uma ida ao banco
+        e um único commit.
+        """
+        if not items:
+            return
 
-            try:
-                existing = db.query(MetricsCacheDB).filter(
-                    MetricsCacheDB.cache_key == cache_key
-                ).first()
+        try:
+            expire_time = IncrementalMetricsCache.get_expire_time_for_month()
+            agora = now or now_brazil_naive()
 
-                if existing:
-                    existing.cache_value = cache_value
-                    existing.calculated_at = agora
-                    existing.expires_at = expire_time
-                    db.add(existing)
-                else:
-                    new_cache = MetricsCacheDB(
-                        cache_key=cache_key,
-                        cache_value=cache_value,
-                        calculated_at=agora,
-                        expires_at=expire_time,
-                    )
-                    db.add(new_cache)
+            valores = [
+                {
+                    "cache_key": f"chamado_sla_status:{chamado_id}",
+                    "cache_value": orjson.dumps({"dentro_sla": dentro_sla}).decode(),
+                    "calculated_at": agora,
+                    "expires_at": expire_time,
+                }
+                for chamado_id, dentro_sla in items
+            ]
 
-                db.commit()
-            except Exception as commit_error:
-                db.rollback()
-                print(f"[CACHE] Erro ao commit status do chamado: {commit_error}")
+            stmt = mysql_insert(MetricsCacheDB.__table__).values(valores)
+            stmt = stmt.on_duplicate_key_update(
+                cache_value=stmt.inserted.cache_value,
+                calculated_at=stmt.inserted.calculated_at,
+                expires_at=stmt.inserted.expires_at,
+            )
+            db.execute(stmt)
+            db.commit()
 
-        except Exception as e:
-            print(f"[CACHE] Erro ao salvar status do chamado: {e}")
-            try:
-                db.rollback()
-            except:
-                pass
+        except Exception:
+            _cache_log.exception("Erro ao salvar status em lote")
+            db.rollback()
 
     @staticmethod
     def invalidate_cache(db: Session) -> None:
         """Invalida o cache de métricas"""
         try:
             cache_key = IncrementalMetricsCache.get_cache_key_month()
-            cached = db.query(MetricsCacheDB).filter(
+            _local_cache_pop(cache_key)
+            # Expira a linha em vez de deletar: o próximo _save_metrics
+            # reaproveita a mesma linha via upsert, sem o churn de
+            # DELETE + INSERT na tabela a cada alteração de chamado
+            db.query(MetricsCacheDB).filter(
                 MetricsCacheDB.cache_key == cache_key
-            ).first()
-            if cached:
-                db.delete(cached)
-                db.commit()
-        except Exception as e:
-            print(f"[CACHE] Erro ao invalidar cache: {e}")
+            ).update(
+                {MetricsCacheDB.expires_at: now_brazil_naive() - timedelta(seconds=1)},
+                synchronize_session=False,
+            )
+            db.commit()
+        except Exception:
+            _cache_log.exception("Erro ao invalidar cache")
+            db.rollback()
 
 
 # ============================================================================
 # Imports necessários adicionados
 # ============================================================================
 
-router = APIRouter(prefix="/chamados", tags=["TI - Chamados"])
+# Purga periódica do metrics_cache_db: as chaves por chamado
+# (chamado_sla_status:{id}) e os contadores diários expiram mas nunca
+# eram removidos, inflando a tabela e o índice de cache_key sem limite
+_PURGE_INTERVALO_S = 15 * 60
+
+
+def purgar_cache_expirado(db: Session) -> int:
+    """Remove em um DELETE só as linhas expiradas do metrics_cache_db"""
+    apagados = db.query(MetricsCacheDB).filter(
+        MetricsCacheDB.expires_at < now_brazil_naive()
+    ).delete(synchronize_session=False)
+    db.commit()
+    return apagados
+
+
+async def purge_expired_loop() -> None:
+    """
+    Tarefa de fundo registrada no startup: purga as linhas expiradas a
+    cada 15 minutos. Só roda no worker líder (mesma flag
+    SLA_SCHEDULER_LEADER do scheduler de SLA), para a purga não disparar
+    N vezes em deploys multi-worker.
+    """
+    if os.getenv("SLA_SCHEDULER_LEADER", "1").strip().lower() in ("0", "false"):
+        _cache_log.info("SLA_SCHEDULER_LEADER=0: purga de cache não agendada neste worker")
+        return
+
+    from core.db import SessionLocal
+
+    def _purgar_uma_vez() -> int:
+        db = SessionLocal()
+        try:
+            return purgar_cache_expirado(db)
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(_PURGE_INTERVALO_S)
+        try:
+            apagados = await asyncio.to_thread(_purgar_uma_vez)
+            if apagados:
+                _cache_log.info("Purga de cache: %s linhas expiradas removidas", apagados)
+        except Exception:
+            _cache_log.exception("Erro na purga de cache expirado")
+
+
+# ORJSONResponse como padrão do router: serialização em Rust para todos os
+# endpoints de chamados, mesmo se o router for montado em outra aplicação
+router = APIRouter(
+    prefix="/chamados",
+    tags=["TI - Chamados"],
+    default_response_class=ORJSONResponse,
+)
+
+# Adapter construído uma vez no import: valida e serializa a lista
+# inteira dentro do pydantic-core, direto para bytes
+_CHAMADO_LIST_ADAPTER = TypeAdapter(list[ChamadoOut])
+
+# Guarda contra lazy load acidental na listagem: ChamadoOut só serializa
+# colunas, então nenhuma relationship deveria disparar durante a
+# resposta. Com CHAMADOS_RAISELOAD=1 (dev/CI), um acesso a relationship
+# vira erro em vez de N+1 silencioso; em produção fica desligado
+_RAISELOAD_LISTAGEM = os.getenv("CHAMADOS_RAISELOAD", "").strip().lower() in ("1", "true")
+
+
+# Mapeamento em lowercase, já com "_" colapsado em espaço via translate
+# (tabela pré-computada, um passo em C por chamada em vez de reconstruir
+# o dict literal a cada create/update)
+_STATUS_TRANS = str.maketrans({"_": " "})
+_STATUS_MAP = {
+    "aberto": "Aberto",
+    "em andamento": "Em atendimento",
+    "emandamento": "Em atendimento",
+    "em atendimento": "Em atendimento",
+    "aguardando": "Aguardando",
+    "analise": "Aguardando",
+    "emanalise": "Aguardando",
+    "em analise": "Aguardando",
+    "em análise": "Aguardando",
+    "análise": "Aguardando",
+    "concluído": "Concluído",
+    "concluido": "Concluído",
+    "finalizado": "Concluído",
+    "expirado": "Expirado",
+    "cancelado": "Expirado",
+}
 
 
 def _normalize_status(s: str) -> str:
@@ -537,48 +756,24 @@ def _normalize_status(s: str) -> str:
     """
     if not s:
         return "Aberto"
-    
-    # Remove espaços extras e converte para lowercase para comparação
-    s_lower = s.strip().lower()
-    
-    # Mapeamento direto baseado em lowercase
-    mapping_lower = {
-        "aberto": "Aberto",
-        "em andamento": "Em atendimento",
-        "emandamento": "Em atendimento",
-        "em_atendimento": "Em atendimento",
-        "em atendimento": "Em atendimento",
-        "aguardando": "Aguardando",
-        "analise": "Aguardando",
-        "emanalise": "Aguardando",
-        "em_analise": "Aguardando",
-        "em_análise": "Aguardando",
-        "análise": "Aguardando",
-        "concluído": "Concluído",
-        "concluido": "Concluído",
-        "finalizado": "Concluído",
-        "expirado": "Expirado",
-        "cancelado": "Expirado",
-    }
-    
-    if s_lower in mapping_lower:
-        return mapping_lower[s_lower]
-    
+
+    normalizado = _STATUS_MAP.get(s.strip().lower().translate(_STATUS_TRANS))
+    if normalizado:
+        return normalizado
+
     # Se não encontrou, verifica se já está no formato correto
     if s in ALLOWED_STATUSES:
         return s
-    
+
     # Caso padrão
     print(f"[NORMALIZE] Status não reconhecido: '{s}' - retornando 'Aberto'")
-    return "Aberto" 
+    return "Aberto"
 
 
 def _table_exists(table_name: str) -> bool:
     """Verifica se uma tabela existe no banco de dados"""
     try:
-        from sqlalchemy import inspect as sa_inspect
-        insp = sa_inspect(engine)
-        return insp.has_table(table_name)
+        return _get_inspector().has_table(table_name)
     except Exception:
         return False
 
@@ -594,28 +789,15 @@ def listar_chamados(db: Session = Depends(get_db), after_date: str = None):
     import logging
     _log = logging.getLogger("ti.api.chamados")
 
-    # Garantir que a tabela existe
-    try:
-        Chamado.__table__.create(bind=engine, checkfirst=True)
-    except Exception:
-        pass
-
-    # Garantir coluna retroativo existe (migracao defensiva)
-    try:
-        insp = inspect(engine)
-        cols = [c["name"] for c in insp.get_columns("chamado")]
-        if "retroativo" not in cols:
-            with engine.connect() as conn:
-                conn.execute(text("ALTER TABLE chamado ADD COLUMN retroativo BOOLEAN NOT NULL DEFAULT 0"))
-                conn.commit()
-            _log.info("[CHAMADOS] Coluna retroativo adicionada ao banco")
-    except Exception as mig_err:
-        _log.warning(f"[CHAMADOS] Aviso na migracao de retroativo: {mig_err}")
+    # Tabela e coluna retroativo garantidas uma vez (no-op após a 1ª)
+    ensure_schema()
 
     try:
         from datetime import datetime
 
         query = db.query(Chamado).filter(Chamado.deletado_em.is_(None))
+        if _RAISELOAD_LISTAGEM:
+            query = query.options(raiseload("*"))
 
         # Aplicar filtro de data se fornecido
         if after_date:
@@ -626,7 +808,16 @@ def listar_chamados(db: Session = Depends(get_db), after_date: str = None):
                 pass
 
         chamados = query.order_by(Chamado.id.desc()).all()
-        return chamados
+
+        # Resposta construída direto: devolver a lista faria o FastAPI
+        # passar tudo por jsonable_encoder + validação do response_model,
+        # que domina o tempo deste endpoint em listas grandes. O
+        # TypeAdapter valida e serializa a lista inteira em pydantic-core,
+        # sem o loop Python de model_validate/model_dump por item.
+        body = _CHAMADO_LIST_ADAPTER.dump_json(
+            _CHAMADO_LIST_ADAPTER.validate_python(chamados, from_attributes=True)
+        )
+        return Response(content=body, media_type="application/json")
 
     except Exception as e:
         _log.error(f"[CHAMADOS] Erro ao listar chamados: {e}", exc_info=True)
@@ -636,23 +827,19 @@ def listar_chamados(db: Session = Depends(get_db), after_date: str = None):
 @router.post("", response_model=ChamadoOut)
 def criar_chamado(payload: ChamadoCreate, db: Session = Depends(get_db)):
     try:
-        try:
-            Chamado.__table__.create(bind=engine, checkfirst=True)
-        except Exception:
-            pass
+        ensure_schema()
         ch = service_criar(db, payload)
 
         # ATUALIZAÇÃO REAL-TIME: Incrementa contador de "chamados hoje"
         chamados_hoje = ChamadosTodayCounter.increment(db)
 
         try:
-            Notification.__table__.create(bind=engine, checkfirst=True)
-            dados = json.dumps({
+            dados = orjson.dumps({
                 "id": ch.id,
                 "codigo": ch.codigo,
                 "protocolo": ch.protocolo,
                 "status": ch.status,
-            }, ensure_ascii=False)
+            }).decode()
             n = Notification(
                 tipo="chamado",
                 titulo=f"Novo chamado {ch.codigo}",
@@ -666,8 +853,7 @@ def criar_chamado(payload: ChamadoCreate, db: Session = Depends(get_db)):
             db.commit()
             db.refresh(n)
             import anyio
-            anyio.from_thread.run(sio.emit, "chamado:created", {"id": ch.id})
-            anyio.from_thread.run(sio.emit, "notification:new", {
+            payload_notificacao = {
                 "id": n.id,
                 "tipo": n.tipo,
                 "titulo": n.titulo,
@@ -678,13 +864,25 @@ def criar_chamado(payload: ChamadoCreate, db: Session = Depends(get_db)):
                 "dados": n.dados,
                 "lido": n.lido,
                 "criado_em": n.criado_em.isoformat() if n.criado_em else None,
-            })
+            }
             # EMITE ATUALIZAÇÃO DE MÉTRICAS EM TEMPO REAL
             metricas = IncrementalMetricsCache.get_metrics(db)
-            anyio.from_thread.run(sio.emit, "metrics:updated", {
+            payload_metricas = {
                 "chamados_hoje": chamados_hoje,
                 "timestamp": now_brazil_naive().isoformat(),
-            })
+            }
+
+            # Um único salto para o event loop: os três emits rodam em
+            # paralelo via gather em vez de três from_thread.run seriais
+            # (a thread espera o máximo dos emits, não a soma)
+            async def _notify() -> None:
+                await asyncio.gather(
+                    sio.emit("chamado:created", {"id": ch.id}),
+                    sio.emit("notification:new", payload_notificacao),
+                    sio.emit("metrics:updated", payload_metricas),
+                )
+
+            anyio.from_thread.run(_notify)
         except Exception as e:
             print(f"[WebSocket] Erro ao emitir eventos: {e}")
             pass
@@ -705,12 +903,20 @@ def criar_chamado(payload: ChamadoCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Erro ao criar chamado: {e}")
 
 
-def _cols(table: str) -> set[str]:
+@lru_cache(maxsize=32)
+def _cols_cached(table: str) -> frozenset[str]:
+    insp = _get_inspector()
+    return frozenset(c.get("name") for c in insp.get_columns(table))
+
+
+def _cols(table: str) -> frozenset[str]:
+    # O esquema é estático entre migrações: memoizar evita a reflexão a
+    # cada anexo do loop de upload. Falhas não entram no cache (senão um
+    # erro transitório de conexão viraria um conjunto vazio permanente)
     try:
-        insp = inspect(engine)
-        return {c.get("name") for c in insp.get_columns(table)}
+        return _cols_cached(table)
     except Exception:
-        return set()
+        return frozenset()
 
 
 def _ensure_column(table: str, column: str, ddl: str) -> None:
@@ -718,10 +924,79 @@ def _ensure_column(table: str, column: str, ddl: str) -> None:
         if column not in _cols(table):
             with engine.connect() as conn:
                 conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+            clear_reflection_cache()
     except Exception:
         pass
 
 
+_SCHEMA_READY = False
+
+
+def ensure_schema() -> None:
+    """
+    Migração one-shot das tabelas e colunas retroativas deste módulo.
+
+    Os endpoints chamavam __table__.create(checkfirst=True) e
+    inspect/ALTER defensivos a cada request — 2-3 idas ao
+    information_schema por chamada. Agora tudo roda uma vez (no startup
+    ou na primeira request) e as chamadas seguintes são um teste de flag.
+    """
+    global _SCHEMA_READY
+    if _SCHEMA_READY:
+        return
+    try:
+        for model in (
+            Chamado,
+            Notification,
+            HistoricoTicket,
+            HistoricoStatus,
+            ChamadoAnexo,
+            TicketAnexo,
+        ):
+            model.__table__.create(bind=engine, checkfirst=True)
+        _ensure_column("chamado", "retroativo", "BOOLEAN NOT NULL DEFAULT 0")
+        _ensure_column("chamado_anexo", "conteudo", "MEDIUMBLOB NULL")
+        _ensure_column("ticket_anexos", "conteudo", "MEDIUMBLOB NULL")
+        _garantir_coluna_cache_value_int()
+        _SCHEMA_READY = True
+    except Exception:
+        _cache_log.warning("Aviso na migração one-shot do schema", exc_info=True)
+
+
+def _hash_upload(f: UploadFile) -> tuple[str, int]:
+    """
+    SHA-256 e tamanho do upload em chunks de 1 MiB.
+
+    Alimentar o hash por partes evita uma passada única sobre o buffer
+    inteiro (hashlib solta o GIL a cada update) e lê direto do spool do
+    UploadFile; o arquivo volta ao início para a leitura do conteúdo.
+    """
+    h = hashlib.sha256()
+    tamanho = 0
+    while parte := f.file.read(1 << 20):
+        h.update(parte)
+        tamanho += len(parte)
+    f.file.seek(0)
+    return h.hexdigest(), tamanho
+
+
+@lru_cache(maxsize=16)
+def _insert_sql(table: str, cols_key: tuple[str, ...]):
+    """TextClause de INSERT memoizado por (tabela, conjunto de colunas).
+
+    Reaproveitar o mesmo objeto text() deixa o SQLAlchemy reutilizar a
+    compilação em vez de re-parsear a string a cada arquivo do upload"""
+    cols_sql = ", ".join(cols_key)
+    params_sql = ", ".join(f":{k}" for k in cols_key)
+    return text(f"INSERT INTO {table} ({cols_sql}) VALUES ({params_sql})")
+
+
+@lru_cache(maxsize=64)
+def _text_cached(sql: str):
+    """text() memoizado para os SELECTs gerados por tabela"""
+    return text(sql)
+
+
 def _insert_attachment(db: Session, table: str, values: dict) -> int:
     cols = _cols(table)
     # Map aliases to support legacy schemas
@@ -734,9 +1009,7 @@ def _insert_attachment(db: Session, table: str, values: dict) -> int:
     data = {k: v for k, v in values.items() if k in cols}
     if not data:
         raise HTTPException(status_code=500, detail="Estrutura da tabela de anexo inválida")
-    cols_sql = ", ".join(data.keys())
-    params_sql = ", ".join(f":{k}" for k in data.keys())
-    res = db.execute(text(f"INSERT INTO {table} ({cols_sql}) VALUES ({params_sql})"), data)
+    res = db.execute(_insert_sql(table, tuple(sorted(data))), data)
     rid = res.lastrowid  # type: ignore[attr-defined]
     db.flush()
     return int(rid or 0)
@@ -750,23 +1023,63 @@ def _update_path(db: Session, table: str, rid: int, path: str) -> None:
         db.execute(text(f"UPDATE {table} SET arquivo_caminho=:p WHERE id=:i"), {"p": path, "i": rid})
 
 
+def _resolver_caminhos_pendentes(db: Session, table: str, chamado_id: int, prefixo: str) -> None:
+    """
+    Resolve em UM UPDATE o caminho de todos os anexos recém-inseridos
+    (marcados 'pending'). O caminho é função determinística do id gerado,
+    então CONCAT no SQL substitui os até dois UPDATEs por arquivo que o
+    _update_path custava dentro do loop de upload.
+    """
+    cols = _cols(table)
+    sets = []
+    if "caminho_arquivo" in cols:
+        sets.append("caminho_arquivo=CONCAT(:p, id)")
+    if "arquivo_caminho" in cols:
+        sets.append("arquivo_caminho=CONCAT(:p, id)")
+    if not sets:
+        return
+    cond = "caminho_arquivo" if "caminho_arquivo" in cols else "arquivo_caminho"
+    db.execute(
+        text(f"UPDATE {table} SET {', '.join(sets)} WHERE chamado_id=:i AND {cond}='pending'"),
+        {"p": prefixo, "i": chamado_id},
+    )
+
+
+# SQL gerado memoizado por tabela: é função pura do esquema, que só muda
+# em migração (clear_reflection_cache limpa os dois dicts)
+_SELECT_ANEXO_SQL: dict[str, str] = {}
+_SELECT_DOWNLOAD_SQL: dict[str, str] = {}
+
+
 def _select_anexo_query(table: str) -> str:
+    sql = _SELECT_ANEXO_SQL.get(table)
+    if sql is not None:
+        return sql
     cols = _cols(table)
     name_expr = ("nome_original" if "nome_original" in cols else ("arquivo_nome" if "arquivo_nome" in cols else "NULL")) + " AS nome_original"
     path_expr = ("caminho_arquivo" if "caminho_arquivo" in cols else ("arquivo_caminho" if "arquivo_caminho" in cols else "NULL")) + " AS caminho_arquivo"
     mime_expr = ("tipo_mime" if "tipo_mime" in cols else ("mime_type" if "mime_type" in cols else "NULL")) + " AS tipo_mime"
     size_expr = ("tamanho_bytes" if "tamanho_bytes" in cols else "NULL") + " AS tamanho_bytes"
     date_expr = ("data_upload" if "data_upload" in cols else ("criado_em" if "criado_em" in cols else "NULL")) + " AS data_upload"
-    return f"SELECT id, {name_expr}, {path_expr}, {mime_expr}, {size_expr}, {date_expr} FROM {table}"
+    sql = f"SELECT id, {name_expr}, {path_expr}, {mime_expr}, {size_expr}, {date_expr} FROM {table}"
+    if cols:
+        _SELECT_ANEXO_SQL[table] = sql
+    return sql
 
 
 def _select_download_query(table: str) -> str:
+    sql = _SELECT_DOWNLOAD_SQL.get(table)
+    if sql is not None:
+        return sql
     cols = _cols(table)
     nome_arq = ("nome_arquivo" if "nome_arquivo" in cols else ("arquivo_nome" if "arquivo_nome" in cols else "NULL")) + " AS nome_arquivo"
     nome_orig = ("nome_original" if "nome_original" in cols else ("arquivo_nome" if "arquivo_nome" in cols else "NULL")) + " AS nome_original"
     mime_expr = ("tipo_mime" if "tipo_mime" in cols else ("mime_type" if "mime_type" in cols else "NULL")) + " AS tipo_mime"
     conteudo = ("conteudo" if "conteudo" in cols else "NULL") + " AS conteudo"
-    return f"SELECT id, {nome_arq}, {nome_orig}, {mime_expr}, {conteudo} FROM {table} WHERE id=:i"
+    sql = f"SELECT id, {nome_arq}, {nome_orig}, {mime_expr}, {conteudo} FROM {table} WHERE id=:i"
+    if cols:
+        _SELECT_DOWNLOAD_SQL[table] = sql
+    return sql
 
 
 @router.post("/with-attachments", response_model=ChamadoOut)
@@ -785,12 +1098,7 @@ def criar_chamado_com_anexos(
     db: Session = Depends(get_db),
 ):
     try:
-        try:
-            Chamado.__table__.create(bind=engine, checkfirst=True)
-            ChamadoAnexo.__table__.create(bind=engine, checkfirst=True)
-            _ensure_column("chamado_anexo", "conteudo", "MEDIUMBLOB NULL")
-        except Exception:
-            pass
+        ensure_schema()
         payload = ChamadoCreate(
             solicitante=solicitante,
             cargo=cargo,
@@ -824,14 +1132,19 @@ def criar_chamado_com_anexos(
                     user_id = user.id if user else None
                 except Exception:
                     user_id = None
-            import hashlib
             saved = 0
+            # Payload do email montado com os bytes já em mãos: o código
+            # antigo re-SELECTava cada blob recém-inserido do MySQL só
+            # para base64 — o dobro do tráfego de bytes por upload. O
+            # base64 em si roda na thread do worker de email (send_mail),
+            # não na thread da request
+            attachments_payload = []
             for f in files:
                 try:
                     safe_name = (f.filename or "arquivo")
-                    content = f.file.read()
                     ext = safe_name.rsplit(".", 1)[-1].lower() if "." in safe_name else None
-                    sha = hashlib.sha256(content).hexdigest()
+                    sha, tamanho = _hash_upload(f)
+                    content = f.file.read()
                     now = now_brazil_naive()
                     rid = _insert_attachment(db, "chamado_anexo", {
                         "chamado_id": ch.id,
@@ -840,7 +1153,7 @@ def criar_chamado_com_anexos(
                         "arquivo_nome": safe_name,
                         "caminho_arquivo": "pending",
                         "arquivo_caminho": "pending",
-                        "tamanho_bytes": len(content),
+                        "tamanho_bytes": tamanho,
                         "tipo_mime": f.content_type or None,
                         "extensao": ext or None,
                         "hash_arquivo": sha,
@@ -852,35 +1165,23 @@ def criar_chamado_com_anexos(
                         "conteudo": content,
                     })
                     if rid:
-                        _update_path(db, "chamado_anexo", rid, f"api/chamados/anexos/chamado/{rid}")
                         saved += 1
+                        attachments_payload.append({
+                            "name": safe_name,
+                            "contentType": f.content_type or "application/octet-stream",
+                            "bytes": content,
+                        })
                 except Exception:
                     continue
+            if saved:
+                _resolver_caminhos_pendentes(
+                    db, "chamado_anexo", ch.id, "api/chamados/anexos/chamado/"
+                )
             db.commit()
             if files and saved == 0:
                 raise HTTPException(status_code=500, detail="Falha ao salvar anexos da abertura")
-            # Try to gather saved attachments and send them with the opening email
+            # Send saved attachments with the opening email
             try:
-                attach_rows = db.execute(text("SELECT id, nome_original, tipo_mime FROM chamado_anexo WHERE chamado_id=:i"), {"i": ch.id}).fetchall()
-                attachments_payload = []
-                import base64
-                for ar in attach_rows:
-                    try:
-                        aid = int(ar[0])
-                        nome = ar[1] or f"anexo_{aid}"
-                        mime = ar[2] or "application/octet-stream"
-                        res = db.execute(text(_select_download_query("chamado_anexo")), {"i": aid}).fetchone()
-                        if res and res[4]:
-                            content = res[4]
-                            b64 = base64.b64encode(content).decode("ascii")
-                            attachments_payload.append({
-                                "name": nome,
-                                "contentType": mime,
-                                "contentBytes": b64,
-                            })
-                    except Exception:
-                        continue
-                # send async email with attachments
                 try:
                     print(f"[CHAMADOS] 📧 Chamado {ch.codigo} criado com anexos. Disparando envio de email...")
                     if attachments_payload:
@@ -935,12 +1236,12 @@ def criar_chamado_com_anexos(
 @router.post("/{chamado_id}/ticket")
 def enviar_ticket(
     chamado_id: int,
+    request: Request,
     assunto: str = Form(...),
     mensagem: str = Form(...),
     destinatarios: str = Form(...),
     autor_email: str | None = Form(None),
     files: list[UploadFile] = File(default=[]),
-    request: Request,
     db: Session = Depends(get_db),
 ):
     try:
@@ -952,8 +1253,7 @@ def enviar_ticket(
             raise HTTPException(status_code=404, detail="Chamado não encontrado")
 
         # garantir tabelas necessárias para anexos de ticket
-        TicketAnexo.__table__.create(bind=engine, checkfirst=True)
-        _ensure_column("ticket_anexos", "conteudo", "MEDIUMBLOB NULL")
+        ensure_schema()
 
         # Se não foi fornecido author_email no formulário, tenta extrair da sessão Azure ou JWT
         if not autor_email:
@@ -984,14 +1284,13 @@ def enviar_ticket(
         h_id = h.id
         # salvar anexos em tickets_anexos com metadados e caminho
         if files:
-            import hashlib
             saved = 0
             for f in files:
                 try:
                     safe_name = (f.filename or "arquivo")
-                    content = f.file.read()
                     ext = safe_name.rsplit(".", 1)[-1].lower() if "." in safe_name else None
-                    sha = hashlib.sha256(content).hexdigest()
+                    sha, tamanho = _hash_upload(f)
+                    content = f.file.read()
                     now = now_brazil_naive()
                     rid = _insert_attachment(db, "ticket_anexos", {
                         "chamado_id": chamado_id,
@@ -1000,7 +1299,7 @@ def enviar_ticket(
                         "arquivo_nome": safe_name,
                         "caminho_arquivo": "pending",
                         "arquivo_caminho": "pending",
-                        "tamanho_bytes": len(content),
+                        "tamanho_bytes": tamanho,
                         "tipo_mime": f.content_type or None,
                         "extensao": ext or None,
                         "hash_arquivo": sha,
@@ -1013,10 +1312,13 @@ def enviar_ticket(
                         "conteudo": content,
                     })
                     if rid:
-                        _update_path(db, "ticket_anexos", rid, f"api/chamados/anexos/ticket/{rid}")
                         saved += 1
                 except Exception:
                     continue
+            if saved:
+                _resolver_caminhos_pendentes(
+                    db, "ticket_anexos", chamado_id, "api/chamados/anexos/ticket/"
+                )
             db.commit()
             if files and saved == 0:
                 raise HTTPException(status_code=500, detail="Falha ao salvar anexos do ticket")
@@ -1049,9 +1351,13 @@ def enviar_ticket(
 
 
 @router.get("/anexos/chamado/{anexo_id}")
-def baixar_anexo_chamado(anexo_id: int, db: Session = Depends(get_db)):
+async def baixar_anexo_chamado(anexo_id: int, db: Session = Depends(get_db)):
+    # Handler async: a leitura do blob (pymysql, bloqueante) vai para o
+    # threadpool e o event loop fica livre durante downloads concorrentes
     sql = _select_download_query("chamado_anexo")
-    res = db.execute(text(sql), {"i": anexo_id}).fetchone()
+    res = await run_in_threadpool(
+        lambda: db.execute(_text_cached(sql), {"i": anexo_id}).fetchone()
+    )
     if not res or not res[4]:
         raise HTTPException(status_code=404, detail="Anexo não encontrado")
     nome = res[1] or res[2] or f"anexo_{anexo_id}"
@@ -1061,9 +1367,11 @@ def baixar_anexo_chamado(anexo_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/anexos/ticket/{anexo_id}")
-def baixar_anexo_ticket(anexo_id: int, db: Session = Depends(get_db)):
+async def baixar_anexo_ticket(anexo_id: int, db: Session = Depends(get_db)):
     sql = _select_download_query("ticket_anexos")
-    res = db.execute(text(sql), {"i": anexo_id}).fetchone()
+    res = await run_in_threadpool(
+        lambda: db.execute(_text_cached(sql), {"i": anexo_id}).fetchone()
+    )
     if not res or not res[4]:
         raise HTTPException(status_code=404, detail="Anexo não encontrado")
     nome = res[1] or res[2] or f"anexo_{anexo_id}"
@@ -1083,7 +1391,7 @@ def obter_historico(chamado_id: int, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Chamado não encontrado")
         # anexos enviados na abertura (chamado_anexo) e descrição do chamado
         sql_an = _select_anexo_query("chamado_anexo") + " WHERE chamado_id=:i ORDER BY data_upload ASC"
-        rows = db.execute(text(sql_an), {"i": chamado_id}).fetchall()
+        rows = db.execute(_text_cached(sql_an), {"i": chamado_id}).fetchall()
         anexos_abertura = None
         first_dt = ch.data_abertura or now_brazil_naive()
         if rows:
@@ -1092,12 +1400,60 @@ def obter_historico(chamado_id: int, db: Session = Depends(get_db)):
                 def __init__(self, r):
                     self.id, self.nome_original, self.caminho_arquivo, self.mime_type, self.tamanho_bytes, self.data_upload = r
             anexos_abertura = [AnexoOut.model_validate(_CA(r)) for r in rows]
+        # Linhas de status e autores extras lidos adiantado: os usuários
+        # da abertura e de todas as linhas saem em UMA consulta IN, em
+        # vez de um SELECT de User por registro dentro do loop
+        hs_rows = []
+        autor_extras: dict[int, dict] = {}
+        try:
+            ensure_schema()
+            # Priorize historico_status for status events
+            hs_rows = db.query(HistoricoStatus).filter(HistoricoStatus.chamado_id == chamado_id).order_by(HistoricoStatus.created_at.asc()).all()
+            print(f"[HISTORICO] chamado_id={chamado_id}: encontrado(s) {len(hs_rows)} registro(s) em historico_status")
+
+            # Ler também autor_email e autor_nome via SQL direto (caso colunas existam)
+            try:
+                rows_extra = db.execute(text(
+                    "SELECT id, autor_email, autor_nome FROM historico_status WHERE chamado_id = :cid"
+                ), {"cid": chamado_id}).fetchall()
+                for row in rows_extra:
+                    autor_extras[row[0]] = {"autor_email": row[1], "autor_nome": row[2]}
+            except Exception:
+                pass  # Colunas ainda não existem — fallback normal
+        except Exception as e:
+            import traceback
+            print(f"[HISTORICO] ❌ ERRO ao buscar historico_status: {e}")
+            print(traceback.format_exc())
+
+        ids_usuarios = {r.usuario_id for r in hs_rows if r.usuario_id}
+        if ch.usuario_id:
+            ids_usuarios.add(ch.usuario_id)
+        emails_extras = {
+            extra["autor_email"].lower()
+            for extra in autor_extras.values()
+            if extra.get("autor_email") and not extra.get("autor_nome")
+        }
+        usuarios_por_id: dict[int, User] = {}
+        usuarios_por_email: dict[str, User] = {}
+        if ids_usuarios or emails_extras:
+            try:
+                from sqlalchemy import func as sa_func, or_ as sa_or
+                filtros = []
+                if ids_usuarios:
+                    filtros.append(User.id.in_(ids_usuarios))
+                if emails_extras:
+                    filtros.append(sa_func.lower(User.email).in_(emails_extras))
+                for u in db.query(User).filter(sa_or(*filtros)).all():
+                    usuarios_por_id[u.id] = u
+                    if u.email:
+                        usuarios_por_email[u.email.lower()] = u
+            except Exception:
+                pass
+
         # Busca o usuário que abriu o chamado
-        usuario_abertura = None
+        usuario_abertura = usuarios_por_id.get(ch.usuario_id) if ch.usuario_id else None
         usuario_abertura_nome = None
         usuario_abertura_email = None
-        if ch.usuario_id:
-            usuario_abertura = db.query(User).filter(User.id == ch.usuario_id).first()
         if usuario_abertura:
             usuario_abertura_nome = f"{usuario_abertura.nome} {usuario_abertura.sobrenome}".strip()
             usuario_abertura_email = usuario_abertura.email
@@ -1128,31 +1484,12 @@ def obter_historico(chamado_id: int, db: Session = Depends(get_db)):
                 usuario_email=usuario_abertura_email,
             ))
         try:
-            Notification.__table__.create(bind=engine, checkfirst=True)
-            HistoricoStatus.__table__.create(bind=engine, checkfirst=True)
-            # Priorize historico_status for status events
-            hs_rows = db.query(HistoricoStatus).filter(HistoricoStatus.chamado_id == chamado_id).order_by(HistoricoStatus.created_at.asc()).all()
-            print(f"[HISTORICO] chamado_id={chamado_id}: encontrado(s) {len(hs_rows)} registro(s) em historico_status")
-
-            # Ler também autor_email e autor_nome via SQL direto (caso colunas existam)
-            autor_extras: dict[int, dict] = {}
-            try:
-                rows_extra = db.execute(text(
-                    "SELECT id, autor_email, autor_nome FROM historico_status WHERE chamado_id = :cid"
-                ), {"cid": chamado_id}).fetchall()
-                for row in rows_extra:
-                    autor_extras[row[0]] = {"autor_email": row[1], "autor_nome": row[2]}
-            except Exception:
-                pass  # Colunas ainda não existem — fallback normal
-
             for r in hs_rows:
-                usuario = None
                 nome_display = None
                 email_display = None
 
                 # 1) Tenta via usuario_id (mais confiável — dado no banco)
-                if r.usuario_id:
-                    usuario = db.query(User).filter(User.id == r.usuario_id).first()
+                usuario = usuarios_por_id.get(r.usuario_id) if r.usuario_id else None
 
                 if usuario:
                     nome_display = f"{usuario.nome} {usuario.sobrenome}".strip()
@@ -1167,20 +1504,13 @@ def obter_historico(chamado_id: int, db: Session = Depends(get_db)):
                         nome_display = autor_nome_extra
                         email_display = autor_email_extra
                     elif autor_email_extra:
-                        # Tenta achar o user pelo email salvo
-                        try:
-                            from sqlalchemy import func as sa_func
-                            u2 = db.query(User).filter(
-                                sa_func.lower(User.email) == autor_email_extra.lower()
-                            ).first()
-                            if u2:
-                                nome_display = f"{u2.nome} {u2.sobrenome}".strip()
-                                email_display = u2.email
-                            else:
-                                # Sem nome, mas temos email — usa email como nome
-                                nome_display = autor_email_extra
-                                email_display = autor_email_extra
-                        except Exception:
+                        # Tenta achar o user pelo email salvo (já carregado no lote)
+                        u2 = usuarios_por_email.get(autor_email_extra.lower())
+                        if u2:
+                            nome_display = f"{u2.nome} {u2.sobrenome}".strip()
+                            email_display = u2.email
+                        else:
+                            # Sem nome, mas temos email — usa email como nome
                             nome_display = autor_email_extra
                             email_display = autor_email_extra
                     else:
@@ -1235,7 +1565,7 @@ def obter_historico(chamado_id: int, db: Session = Depends(get_db)):
                         ))
         except Exception as e:
             import traceback
-            print(f"[HISTORICO] ❌ ERRO ao buscar historico_status: {e}")
+            print(f"[HISTORICO] ❌ ERRO ao montar itens de status: {e}")
             print(traceback.format_exc())
         # histórico (historico_tickets via ORM) - ignora se tabela não existir
         try:
@@ -1249,7 +1579,7 @@ def obter_historico(chamado_id: int, db: Session = Depends(get_db)):
                 start = (h.data_envio or now_brazil_naive()) - timedelta(minutes=3)
                 end = (h.data_envio or now_brazil_naive()) + timedelta(minutes=3)
                 sql_ta = _select_anexo_query("ticket_anexos") + " WHERE chamado_id=:i"
-                tas = db.execute(text(sql_ta), {"i": chamado_id}).fetchall()
+                tas = db.execute(_text_cached(sql_ta), {"i": chamado_id}).fetchall()
                 for ta in tas:
                     dt = ta[5]
                     if dt and start <= dt <= end:
@@ -1353,9 +1683,7 @@ def atualizar_status(chamado_id: int, payload: ChamadoStatusUpdate, request: Req
 
         # ── Histórico e notificações (nunca bloqueiam o retorno) ──────────────
         try:
-            Notification.__table__.create(bind=engine, checkfirst=True)
-            HistoricoTicket.__table__.create(bind=engine, checkfirst=True)
-            HistoricoStatus.__table__.create(bind=engine, checkfirst=True)
+            ensure_schema()
 
             agora = now_brazil_naive()
 
@@ -1373,13 +1701,13 @@ def atualizar_status(chamado_id: int, payload: ChamadoStatusUpdate, request: Req
                 db.rollback()
 
             # Criar notificação
-            dados = json.dumps({
+            dados = orjson.dumps({
                 "id": ch.id,
                 "codigo": ch.codigo,
                 "protocolo": ch.protocolo,
                 "status": ch.status,
                 "status_anterior": prev,
-            }, ensure_ascii=False)
+            }).decode()
             n = Notification(
                 tipo="chamado",
                 titulo=f"Status atualizado: {ch.codigo}",
@@ -1501,13 +1829,13 @@ def atribuir_chamado(chamado_id: int, payload: dict = Body(...), db: Session = D
 
         # Criar notificação
         try:
-            Notification.__table__.create(bind=engine, checkfirst=True)
-            dados = json.dumps({
+            ensure_schema()
+            dados = orjson.dumps({
                 "id": ch.id,
                 "codigo": ch.codigo,
                 "agente_id": agent_id,
                 "agente_nome": agent.nome,
-            }, ensure_ascii=False)
+            }).decode()
 
             n = Notification(
                 tipo="chamado",
@@ -1578,12 +1906,12 @@ def deletar_chamado(chamado_id: int, payload: ChamadoDeleteRequest = Body(...),
 
         # Criar notificação de exclusão
         try:
-            Notification.__table__.create(bind=engine, checkfirst=True)
-            dados = json.dumps({
+            ensure_schema()
+            dados = orjson.dumps({
                 "id": chamado_info['id'],
                 "codigo": chamado_info['codigo'],
                 "protocolo": chamado_info['protocolo'],
-            }, ensure_ascii=False)
+            }).decode()
 
             n = Notification(
                 tipo="chamado",
@@ -1656,10 +1984,7 @@ def get_last_30_days_attended_tickets(db: Session = Depends(get_db)):
     Inclui: ID, Código, Nome do Solicitante, Problema, Status, Data de Abertura, Data da Última Atualização
     """
     try:
-        try:
-            Chamado.__table__.create(bind=engine, checkfirst=True)
-        except Exception:
-            pass
+        ensure_schema()
 
         from datetime import timedelta
 
@@ -1720,10 +2045,7 @@ def get_attended_tickets_report(start_date: str = "", end_date: str = "", db: Se
     Inclui: ID, Código, Nome do Solicitante, Problema, Status, Data de Abertura, Data da Última Atualização
     """
     try:
-        try:
-            Chamado.__table__.create(bind=engine, checkfirst=True)
-        except Exception:
-            pass
+        ensure_schema()
 
         from datetime import timedelta, datetime
 
@@ -469,3 +469,18 @@ def metrics_health_check(db: Session = Depends(get_db)):
             "error": str(e),
             "timestamp": now_brazil_naive().isoformat()
         }
+
+
+@router.get("/latency")
+def get_latency_metrics():
+    """
+    Retorna a instrumentação de latência acumulada do processo.
+
+    - http: histograma de duração por rota (ids colapsados em {id})
+    - eventos: durações de operações internas (ex.: recálculo de SLA)
+    - contadores: contadores nomeados (ex.: hits/misses do cache do dashboard)
+
+    Útil para identificar qual endpoint concentra a latência de cauda.
+    """
+    from core import observability
+    return observability.snapshot()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import datetime
-from sqlalchemy import Integer, String, DateTime, Text
+from sqlalchemy import BigInteger, Integer, String, DateTime, Text
 from sqlalchemy.orm import Mapped, mapped_column
 from core.db import Base
 
@@ -9,7 +9,12 @@ class MetricsCacheDB(Base):
     __tablename__ = "metrics_cache_db"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Índice único: alvo do ON DUPLICATE KEY dos upserts e busca O(log n)
+    # nas leituras por chave (a tabela cresce com chaves por chamado)
     cache_key: Mapped[str] = mapped_column(String(100), nullable=False, unique=True, index=True)
-    cache_value: Mapped[str] = mapped_column(Text, nullable=False)
+    # Blobs JSON (métricas) usam cache_value; contadores inteiros usam
+    # cache_value_int direto, sem serialização
+    cache_value: Mapped[str | None] = mapped_column(Text, nullable=True)
+    cache_value_int: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     calculated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
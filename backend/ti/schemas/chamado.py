@@ -2,7 +2,7 @@ from __future__ import annotations
 from datetime import date, datetime
 from pydantic import BaseModel, EmailStr, Field
 
-ALLOWED_STATUSES = {"Aberto", "Em atendimento", "Aguardando", "Concluído", "Expirado"}
+ALLOWED_STATUSES = frozenset({"Aberto", "Em atendimento", "Aguardando", "Concluído", "Expirado"})
 
 class ChamadoCreate(BaseModel):
     solicitante: str
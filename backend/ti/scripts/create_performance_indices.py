@@ -12,9 +12,28 @@ INDICES = [
     "CREATE INDEX IF NOT EXISTS ix_chamado_prioridade ON chamado(prioridade)",
     "CREATE INDEX IF NOT EXISTS ix_chamado_data_conclusao ON chamado(data_conclusao)",
     "CREATE INDEX IF NOT EXISTS ix_chamado_data_primeira_resposta ON chamado(data_primeira_resposta)",
+    # Contador de chamados do dia (data_abertura >= hoje AND status != ...):
+    # a faixa de data filtra primeiro e o status vem junto no índice,
+    # tornando a contagem index-only
+    "CREATE INDEX IF NOT EXISTS ix_chamado_abertura_status ON chamado(data_abertura, status)",
+    # Índice composto cobrindo o predicado do dashboard de SLA
+    # (deletado_em IS NULL + status IN (...) + faixa de data_abertura)
+    "CREATE INDEX IF NOT EXISTS ix_chamado_sla_dashboard ON chamado(deletado_em, status, data_abertura)",
     "CREATE INDEX IF NOT EXISTS ix_historico_status_chamado_id ON historico_status(chamado_id)",
     "CREATE INDEX IF NOT EXISTS ix_historico_status_data_inicio ON historico_status(data_inicio)",
     "CREATE INDEX IF NOT EXISTS ix_sla_pausa_chamado_id ON sla_pausa(chamado_id)",
+    # Compostos para as consultas quentes de SLA: pausas ordenadas por início
+    # e busca de pausa ativa (fim IS NULL) por chamado
+    "CREATE INDEX IF NOT EXISTS ix_sla_pausa_chamado_inicio ON sla_pausa(chamado_id, inicio)",
+    "CREATE INDEX IF NOT EXISTS ix_sla_pausa_chamado_fim ON sla_pausa(chamado_id, fim)",
+    # Feriados ativos por intervalo de data (predicado do calculador)
+    "CREATE INDEX IF NOT EXISTS ix_sla_feriado_ativo_data ON sla_feriado(ativo, data)",
+    # TOP-N de chamados críticos: flag + percentual DESC casando com o
+    # ORDER BY ... DESC LIMIT N — o banco lê as N primeiras entradas do
+    # índice na ordem final, sem ordenar o restante (MySQL não tem índice
+    # parcial; a flag como primeira coluna faz o papel do predicado)
+    "CREATE INDEX IF NOT EXISTS ix_sla_info_risco_pct ON sla_info_chamado(resolucao_em_risco, percentual_resolucao DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_sla_info_venc_pct ON sla_info_chamado(resolucao_vencida, percentual_resolucao DESC)",
 ]
 
 def create_indices():